@@ -1,4 +1,9 @@
+from django.conf import settings
 from django.http import HttpResponseForbidden
+from whitenoise.base import WhiteNoise
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+from appcoder.prerender import desactualizado
 
 class OnlyFsosaAdminMiddleware:
     """
@@ -15,3 +20,40 @@ class OnlyFsosaAdminMiddleware:
             if not (user and user.is_authenticated and user.username.lower() == "fsosa"):
                 return HttpResponseForbidden("Acceso a admin restringido")
         return self.get_response(request)
+
+
+class PrerenderMiddleware:
+    """
+    Sirve con WhiteNoise las páginas generadas por `manage.py prerender_catalog`
+    (settings.PRERENDER_ROOT), sólo para visitas anónimas "limpias":
+    GET/HEAD, sin query string, sin cookie de sesión y sin mensajes pendientes.
+    Todo lo demás sigue de largo a las vistas de Django, igual que mientras
+    final.xlsx sea más nuevo que las páginas (se programa su regeneración).
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.whitenoise = None
+        root = getattr(settings, "PRERENDER_ROOT", None)
+        if root:
+            # autorefresh: los archivos se buscan en cada request, así una
+            # nueva versión (o su borrado) se ve sin reiniciar.
+            self.whitenoise = WhiteNoise(
+                None,
+                autorefresh=True,
+                max_age=getattr(settings, "PRERENDER_MAX_AGE", 300),
+                index_file=True,
+            )
+            self.whitenoise.add_files(str(root), prefix="/")
+
+    def _es_cacheable(self, request):
+        if request.method not in ("GET", "HEAD") or request.META.get("QUERY_STRING"):
+            return False
+        cookies = request.COOKIES
+        return settings.SESSION_COOKIE_NAME not in cookies and "messages" not in cookies
+
+    def __call__(self, request):
+        if self.whitenoise is not None and self._es_cacheable(request) and not desactualizado():
+            static_file = self.whitenoise.find_file(request.path_info)
+            if static_file is not None:
+                return WhiteNoiseMiddleware.serve(static_file, request)
+        return self.get_response(request)
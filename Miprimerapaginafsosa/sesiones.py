@@ -0,0 +1,60 @@
+"""
+Backend de sesiones en DB que sólo escribe cuando hace falta.
+
+Con SESSION_SAVE_EVERY_REQUEST cada request que lee la sesión terminaba en
+un UPDATE a django_session (en SQLite eso serializa a todos los workers).
+Este backend compara los datos con lo que se leyó de la fila y no escribe si
+no cambiaron, salvo que al vencimiento guardado le quede menos de
+SESSION_REFRESH_THRESHOLD segundos. Así la expiración sigue "deslizándose"
+para quien navega, pero con una escritura cada tanto y no una por página.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.sessions.backends.db import SessionStore as DBSessionStore
+from django.utils import timezone
+
+
+class SessionStore(DBSessionStore):
+
+    def __init__(self, session_key=None):
+        super().__init__(session_key)
+        # (datos serializados, expire_date) de la fila tal como está en la DB
+        self._guardado = None
+
+    def _serializar(self, data) -> bytes:
+        return self.serializer().dumps(data)
+
+    def load(self):
+        s = self._get_session_from_db()
+        if s is None:
+            self._guardado = None
+            return {}
+        data = self.decode(s.session_data)
+        self._guardado = (self._serializar(data), s.expire_date)
+        return data
+
+    def _umbral_refresco(self) -> int:
+        umbral = getattr(settings, "SESSION_REFRESH_THRESHOLD", None)
+        if umbral is None:
+            umbral = self.get_session_cookie_age() // 2
+        return int(umbral)
+
+    def _sin_cambios(self) -> bool:
+        """True si la fila de la DB ya tiene estos datos y no hace falta renovar el vencimiento."""
+        if self._guardado is None and not hasattr(self, "_session_cache"):
+            # Nadie leyó la sesión en este request: se lee ahora (un SELECT)
+            # en vez de reescribirla a ciegas
+            self._get_session()
+        if self._guardado is None:
+            return False
+        datos, vence = self._guardado
+        if self._serializar(self._get_session()) != datos:
+            return False
+        return vence - timezone.now() > timedelta(seconds=self._umbral_refresco())
+
+    def save(self, must_create=False):
+        if not must_create and self.session_key is not None and self._sin_cambios():
+            return
+        super().save(must_create=must_create)
+        self._guardado = (self._serializar(self._get_session(no_load=must_create)), self.get_expiry_date())
@@ -1,5 +1,6 @@
 from pathlib import Path
 import os
+import tempfile
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -35,6 +36,7 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
+    "Miprimerapaginafsosa.middleware.PrerenderMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -91,6 +93,13 @@ if DEBUG:
 else:
     STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 
+# Páginas del catálogo pre-renderizadas (manage.py prerender_catalog)
+PRERENDER_ROOT = BASE_DIR / "prerender"
+PRERENDER_MAX_AGE = 300
+# Segundos que se espera después de un cambio de producto antes de regenerar
+# (los cambios que llegan mientras tanto se juntan en una sola pasada)
+PRERENDER_DEMORA = 5
+
 # ============================================
 # CONFIGURACIÓN DE ARCHIVOS MEDIA (Subidas)
 # ============================================
@@ -122,11 +131,34 @@ LOGIN_URL = "login"
 LOGIN_REDIRECT_URL = "sahumerios_lista"
 LOGOUT_REDIRECT_URL = "sahumerios_lista"
 
+# ============================================
+# CACHE
+# ============================================
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    # Datos de producto del carrito (cart.cart.productos_carrito): en disco
+    # para que todos los workers de gunicorn vean las mismas invalidaciones
+    "carrito": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": os.environ.get(
+            "CARRITO_CACHE_DIR", os.path.join(tempfile.gettempdir(), "fuegodeatenea-carrito")
+        ),
+        "TIMEOUT": 120,
+        "OPTIONS": {"MAX_ENTRIES": 5000},
+    },
+}
+
 # ============================================
 # CONFIGURACIÓN DE SESIONES
 # ============================================
+SESSION_ENGINE = "Miprimerapaginafsosa.sesiones"
 SESSION_COOKIE_AGE = 1209600
 SESSION_SAVE_EVERY_REQUEST = True
+# Sesiones sin cambios: sólo se reescriben para renovar el vencimiento
+# cuando le quedan menos de estos segundos (la mitad de SESSION_COOKIE_AGE)
+SESSION_REFRESH_THRESHOLD = SESSION_COOKIE_AGE // 2
 SESSION_EXPIRE_AT_BROWSER_CLOSE = False
 SESSION_COOKIE_NAME = "sessionid"
 SESSION_COOKIE_HTTPONLY = True
@@ -3,3 +3,8 @@ from django.apps import AppConfig
 class AppcoderConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "appcoder"
+
+    def ready(self):
+        # Índice de static/img/productos armado al arrancar (lo usan catálogo y carrito)
+        from .imagenes import indice_productos
+        indice_productos()
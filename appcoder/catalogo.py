@@ -0,0 +1,235 @@
+"""
+Catálogo en columnas (NumPy) para filtrar y ordenar sin recorrer dicts.
+
+Cada producto es una posición en varios arrays (precio, stock, activo, código
+de marca, ...). Los filtros son máscaras booleanas y el orden base
+(marca, título) se calcula una sola vez al construir. Las filas (dicts para
+el template) se arman sólo para los índices que se van a mostrar.
+
+El store se guarda por proceso y se reconstruye cuando cambia la "firma"
+del catálogo (ver appcoder.views._catalogo_store).
+"""
+import sys
+import threading
+
+import numpy as np
+
+from cart.ventas import clave_producto
+
+# Strings de largo variable: no reservan el ancho del texto más largo por fila
+TEXTO = np.dtypes.StringDType()
+
+SIN_ID = -1
+
+
+def _a_float(valor) -> float:
+    try:
+        return float(str(valor).replace(",", "."))
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _a_id(valor) -> int:
+    return SIN_ID if valor in (None, "") else int(valor)
+
+
+def _texto(valor) -> str:
+    return sys.intern(str(valor or ""))
+
+
+class ItemExcel:
+    """
+    Producto leído de final.xlsx (lo que devuelve appcoder.views._leer_excel).
+
+    Usa __slots__ en vez de un dict por ítem y los textos quedan internados:
+    marcas, duraciones y URLs repetidas (placeholder, misma foto) son un solo
+    string por proceso. Los templates lo usan igual que antes ({{ it.titulo }}).
+    """
+
+    __slots__ = (
+        "idx", "marca", "titulo", "descripcion", "precio", "duracion",
+        "img_file", "img_abs", "img_url", "raw", "stock", "activo",
+    )
+
+    # Comunes a todos los ítems del Excel: atributos de clase, no por instancia
+    origen = "XLSX"
+    pk = None
+
+    def __init__(self, idx, marca, titulo, descripcion, precio, duracion,
+                 img_file, img_abs, img_url, raw, stock, activo):
+        self.idx = int(idx)
+        self.marca = _texto(marca)
+        self.titulo = _texto(titulo)
+        self.descripcion = _texto(descripcion)
+        # El precio original se conserva tal cual (número o texto de la planilla)
+        self.precio = precio
+        self.duracion = _texto(duracion)
+        self.img_file = _texto(img_file)
+        self.img_abs = _texto(img_abs)
+        self.img_url = _texto(img_url)
+        self.raw = _texto(raw)
+        self.stock = int(stock)
+        self.activo = bool(activo)
+
+    def __reduce__(self):
+        # En el cache se guarda como tupla de valores; al leerlo pasa por
+        # __init__ y los strings se vuelven a internar en este proceso.
+        return (ItemExcel, tuple(getattr(self, c) for c in self.__slots__))
+
+    def __repr__(self):
+        return f"<ItemExcel {self.idx}: {self.titulo}>"
+
+    def a_dict(self) -> dict:
+        return {c: getattr(self, c) for c in self.__slots__}
+
+
+class CatalogoColumnar:
+    """
+    Store columnar del catálogo combinado (Excel + DB).
+    Recibe la lista de dicts que arma appcoder.views._items_catalogo().
+    """
+
+    COLUMNAS_TEXTO = ("titulo", "descripcion", "duracion", "img_file", "img_abs", "img_url", "raw")
+
+    def __init__(self, items: list[dict]):
+        n = len(items)
+        self.n = n
+
+        # ---- columnas numéricas ----
+        self.es_db = np.fromiter((it.get("origen") == "DB" for it in items), dtype=bool, count=n)
+        self.pk = np.fromiter((_a_id(it.get("pk")) for it in items), dtype=np.int64, count=n)
+        self.idx = np.fromiter((_a_id(it.get("idx")) for it in items), dtype=np.int64, count=n)
+        self.match_id = np.fromiter((_a_id(it.get("match_id")) for it in items), dtype=np.int64, count=n)
+        self.precio = np.fromiter((_a_float(it.get("precio")) for it in items), dtype=np.float64, count=n)
+        self.stock = np.fromiter((int(it.get("stock") or 0) for it in items), dtype=np.int64, count=n)
+        self.activo = np.fromiter((bool(it.get("activo", True)) for it in items), dtype=bool, count=n)
+
+        # ---- marcas: pool de strings + códigos ----
+        self.marcas_pool: list[str] = []
+        codigos: dict[str, int] = {}
+        marca = np.empty(n, dtype=np.int32)
+        for i, it in enumerate(items):
+            m = _texto(it.get("marca"))
+            code = codigos.get(m)
+            if code is None:
+                code = codigos[m] = len(self.marcas_pool)
+                self.marcas_pool.append(m)
+            marca[i] = code
+        self.marca = marca
+        self._marcas_lower = np.array([m.lower() for m in self.marcas_pool], dtype=TEXTO)
+
+        # ---- texto (strings internados) ----
+        # El precio original se conserva tal cual: el template lo postea al carrito.
+        self.precio_raw = [it.get("precio") for it in items]
+        for col in self.COLUMNAS_TEXTO:
+            setattr(self, col, [_texto(it.get(col)) for it in items])
+
+        self._busqueda = np.array(
+            [
+                f"{self.titulo[i]}\0{self.marcas_pool[marca[i]]}\0{self.descripcion[i]}".lower()
+                for i in range(n)
+            ],
+            dtype=TEXTO,
+        )
+
+        # ---- orden base (marca, título), calculado una sola vez ----
+        self._orden_base = np.array(
+            sorted(range(n), key=lambda i: (self.marcas_pool[marca[i]].lower(), self.titulo[i].lower())),
+            dtype=np.int64,
+        )
+
+        # ---- clave de estadísticas -> posiciones (para ordenar por ventas) ----
+        self._pos_clave: dict[str, list[int]] = {}
+        for i in range(n):
+            if self.es_db[i] and self.pk[i] != SIN_ID:
+                clave = clave_producto("DB", int(self.pk[i]))
+            elif self.match_id[i] != SIN_ID:
+                clave = clave_producto("DB", int(self.match_id[i]))
+            else:
+                clave = clave_producto("XLS", int(self.idx[i]))
+            self._pos_clave.setdefault(clave, []).append(i)
+
+    def __len__(self):
+        return self.n
+
+    # ------------------------------ consultas -------------------------------
+
+    def marcas(self) -> list[str]:
+        """Marcas distintas (sin vacías), ordenadas."""
+        return sorted({m.strip() for m in self.marcas_pool if m.strip()})
+
+    def mascara(self, busqueda: str = "", marca: str = "") -> np.ndarray:
+        """Máscara booleana para búsqueda por texto (título/marca/descr.) y marca exacta."""
+        mask = np.ones(self.n, dtype=bool)
+        if marca:
+            # Tabla código -> bool: un solo lookup vectorizado sobre los códigos
+            mask &= (self._marcas_lower == marca.lower())[self.marca]
+        busqueda = busqueda.replace("\0", "").lower()
+        if busqueda:
+            mask &= np.strings.find(self._busqueda, busqueda) >= 0
+        return mask
+
+    def ordenar(self, mask: np.ndarray, popularidad: dict | None = None) -> np.ndarray:
+        """
+        Índices que pasan la máscara, en el orden base. Con `popularidad`
+        (clave -> (unidades 30d, unidades totales)) los más vendidos primero;
+        el orden base se mantiene entre empates.
+        """
+        indices = self._orden_base[mask[self._orden_base]]
+        if popularidad:
+            u30 = np.zeros(self.n, dtype=np.int64)
+            total = np.zeros(self.n, dtype=np.int64)
+            for clave, (unidades_30d, unidades) in popularidad.items():
+                for i in self._pos_clave.get(clave, ()):
+                    u30[i] = unidades_30d
+                    total[i] = unidades
+            # lexsort es estable: la última clave es la principal
+            indices = indices[np.lexsort((-total[indices], -u30[indices]))]
+        return indices
+
+    def filas(self, indices) -> list[dict]:
+        """Materializa como dicts (formato del template) sólo los índices pedidos."""
+        return [self.fila(int(i)) for i in indices]
+
+    def fila(self, i: int) -> dict:
+        es_db = bool(self.es_db[i])
+        pk = int(self.pk[i]) if self.pk[i] != SIN_ID else None
+        idx = int(self.idx[i]) if self.idx[i] != SIN_ID else None
+        match_id = int(self.match_id[i]) if self.match_id[i] != SIN_ID else None
+        return {
+            "origen": "DB" if es_db else "XLSX",
+            "pk": pk,
+            "id": pk,
+            "idx": idx,
+            "match_id": match_id,
+            "marca": self.marcas_pool[self.marca[i]],
+            "titulo": self.titulo[i],
+            "descripcion": self.descripcion[i],
+            "precio": self.precio_raw[i],
+            "duracion": self.duracion[i],
+            "img_file": self.img_file[i],
+            "img_abs": self.img_abs[i],
+            "img_url": self.img_url[i],
+            "raw": self.raw[i],
+            "stock": int(self.stock[i]),
+            "activo": bool(self.activo[i]),
+        }
+
+
+# ------------------------- store por proceso ---------------------------------
+
+_lock = threading.Lock()
+_memo = {"firma": None, "store": None}
+
+
+def obtener_store(firma, construir) -> CatalogoColumnar:
+    """
+    Devuelve el store del proceso; lo reconstruye con `construir()` (que
+    devuelve la lista de dicts) sólo si cambió la firma del catálogo.
+    """
+    with _lock:
+        if _memo["store"] is None or _memo["firma"] != firma:
+            _memo["store"] = CatalogoColumnar(construir())
+            _memo["firma"] = firma
+        return _memo["store"]
+
@@ -0,0 +1,58 @@
+"""
+Índice en memoria de static/img/productos.
+
+Se arma una sola vez por proceso (AppcoderConfig.ready) y lo usa la lectura
+del Excel (appcoder.views) para resolver las imágenes de cada fila, que antes
+probaba decenas de rutas con finders.find() en cada render. El carrito toma
+esas URLs ya resueltas (ItemExcel.img_url).
+Con DEBUG se rehace si cambia la carpeta, para no reiniciar al sumar fotos.
+"""
+import re
+import threading
+import unicodedata
+from pathlib import Path
+
+from django.conf import settings
+
+
+def norm_text(s: str) -> str:
+    s = str(s or "").strip().lower()
+    s = unicodedata.normalize("NFKD", s).encode("ascii", "ignore").decode("ascii")
+    return re.sub(r"[^a-z0-9]+", "", s)
+
+
+def carpeta_productos() -> Path:
+    return Path(settings.BASE_DIR) / "static" / "img" / "productos"
+
+
+class IndiceImagenes:
+    """
+    name_lut: nombre en minúsculas -> nombre real del archivo
+    stem_lut: nombre normalizado (sin extensión ni signos) -> nombre real
+    """
+
+    def __init__(self, carpeta: Path):
+        self.name_lut: dict[str, str] = {}
+        self.stem_lut: dict[str, str] = {}
+        archivos = sorted(p for p in carpeta.iterdir() if p.is_file()) if carpeta.exists() else []
+        for p in archivos:
+            self.name_lut[p.name.lower()] = p.name
+            self.stem_lut[norm_text(p.stem)] = p.name
+
+
+_lock = threading.Lock()
+_memo = {"mtime": None, "indice": None}
+
+
+def indice_productos() -> IndiceImagenes:
+    carpeta = carpeta_productos()
+    indice = _memo["indice"]
+    if indice is not None and not settings.DEBUG:
+        return indice
+
+    mtime = carpeta.stat().st_mtime if carpeta.exists() else None
+    with _lock:
+        if _memo["indice"] is None or _memo["mtime"] != mtime:
+            _memo["indice"] = IndiceImagenes(carpeta)
+            _memo["mtime"] = mtime
+        return _memo["indice"]
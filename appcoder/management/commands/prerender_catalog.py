@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from appcoder.prerender import invalidar, prerenderizar
+
+
+class Command(BaseCommand):
+    help = (
+        "Genera HTML estático del catálogo, las páginas por marca y el detalle de cada producto "
+        "(servido por PrerenderMiddleware). Después se regenera solo cuando cambian los productos o final.xlsx."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--borrar",
+            action="store_true",
+            help="Sólo borra las páginas generadas (vuelven a atender las vistas dinámicas).",
+        )
+
+    def handle(self, *args, **options):
+        if options["borrar"]:
+            invalidar()
+            self.stdout.write(self.style.SUCCESS("Páginas pre-renderizadas borradas."))
+            return
+
+        res = prerenderizar()
+        self.stdout.write(self.style.SUCCESS(
+            f"{res['generadas']} página(s) generadas en {res['destino']}"
+            + (f" ({res['omitidas']} omitidas)" if res["omitidas"] else "")
+        ))
@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 
 class Sahumerio(models.Model):
     marca = models.CharField(max_length=80, blank=True, default='')
@@ -18,6 +18,18 @@ class Sahumerio(models.Model):
     def __str__(self):
         return f'{self.marca} {self.nombre}'
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # El catálogo pre-renderizado quedó viejo: se regenera después del commit
+        from .prerender import programar_regeneracion
+        transaction.on_commit(programar_regeneracion)
+
+    def delete(self, *args, **kwargs):
+        res = super().delete(*args, **kwargs)
+        from .prerender import programar_regeneracion
+        transaction.on_commit(programar_regeneracion)
+        return res
+
     def imagen_resuelta(self):
         if self.imagen_file:
             return self.imagen_file.url
@@ -0,0 +1,256 @@
+"""
+Pre-renderizado del catálogo a HTML estático.
+
+`manage.py prerender_catalog` genera un `<url>/index.html` (+ .gz) por cada
+página de catálogo y de detalle. PrerenderMiddleware los sirve con WhiteNoise
+a las visitas anónimas sin sesión; el widget del carrito se completa del lado
+del cliente con `cart:summary` y el stock de la DB con `cart:stock`, así que
+el HTML no tiene nada propio de cada usuario ni se vuelve viejo con cada venta.
+
+Cada generación va a un directorio nuevo (`<PRERENDER_ROOT>.v<milisegundos>`)
+y PRERENDER_ROOT es un symlink que se cambia de una sola vez (os.replace), así
+que nunca se sirve un árbol a medio escribir ni hay un momento sin páginas.
+
+Cuando cambia un Sahumerio (o final.xlsx, lo detecta el middleware) se
+programa una regeneración en segundo plano con demora (PRERENDER_DEMORA
+segundos): varios cambios seguidos terminan en una sola pasada. Un lock de
+archivo evita que dos workers generen a la vez.
+"""
+import gzip
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.sessions.backends.base import SessionBase
+from django.db import connection
+from django.test import RequestFactory
+from django.urls import resolve, reverse
+from django.utils.text import slugify
+
+logger = logging.getLogger(__name__)
+
+PREFIJO_VERSION = ".v"
+
+
+def _root() -> Path | None:
+    root = getattr(settings, "PRERENDER_ROOT", None)
+    return Path(root) if root else None
+
+
+def _ruta_excel() -> Path:
+    return Path(settings.BASE_DIR) / "final.xlsx"
+
+
+def urls_a_prerenderizar() -> list[str]:
+    """Catálogo, una página por marca y el detalle de cada producto."""
+    from .models import Sahumerio
+    from .views import _leer_excel
+
+    x_items = _leer_excel()
+    db_items = list(Sahumerio.objects.filter(activo=True).values("pk", "marca"))
+
+    urls = [reverse("catalogo"), reverse("sahumerios_lista")]
+
+    marcas = sorted({
+        m.strip()
+        for m in [it.marca for it in x_items] + [o["marca"] or "" for o in db_items]
+        if m.strip()
+    })
+    slugs = {slugify(m) for m in marcas}
+    urls += [reverse("catalogo_marca", args=[s]) for s in sorted(slugs) if s]
+
+    urls += [reverse("excel_detalle", args=[it.idx]) for it in x_items]
+    urls += [reverse("sahumerio_detalle", args=[o["pk"]]) for o in db_items]
+    return urls
+
+
+def _renderizar(url: str) -> bytes | None:
+    """Renderiza una URL como la vería un visitante anónimo sin carrito."""
+    request = RequestFactory().get(url)
+    request.user = AnonymousUser()
+    request.session = SessionBase()  # vacía y nunca se guarda
+
+    match = resolve(url)
+    response = match.func(request, *match.args, **match.kwargs)
+    if hasattr(response, "render"):
+        response = response.render()
+    if response.status_code != 200:
+        return None
+    return response.content
+
+
+# =====================================================================
+# Versiones en disco
+# =====================================================================
+
+def _versiones(root: Path) -> list[Path]:
+    return sorted(root.parent.glob(root.name + PREFIJO_VERSION + "*"))
+
+
+def generado_en(root: Path | None = None) -> float | None:
+    """Momento (time.time()) en que empezó la generación que se está sirviendo."""
+    root = root or _root()
+    if root is None or not root.is_symlink():
+        return None
+    nombre = Path(os.readlink(root)).name
+    try:
+        return int(nombre.rsplit(PREFIJO_VERSION, 1)[1]) / 1000
+    except (IndexError, ValueError):
+        return None
+
+
+@contextmanager
+def _lock(root: Path):
+    """Un solo pre-renderizado a la vez entre procesos (flock; sin lock donde no existe)."""
+    try:
+        import fcntl
+    except ImportError:
+        yield
+        return
+    with open(root.parent / f".{root.name}.lock", "w") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _publicar(root: Path, version: Path):
+    """Apunta `root` a `version` de una sola vez y borra las versiones anteriores."""
+    if root.exists() and not root.is_symlink():
+        # Árbol de antes de usar versiones: se reemplaza una única vez
+        shutil.rmtree(root, ignore_errors=True)
+    enlace = root.with_name(f".{root.name}.enlace")
+    if enlace.is_symlink() or enlace.exists():
+        enlace.unlink()
+    try:
+        enlace.symlink_to(version.name, target_is_directory=True)
+    except (OSError, NotImplementedError):
+        # Sin symlinks (Windows sin permisos): reemplazo de directorio
+        if root.exists():
+            shutil.rmtree(root, ignore_errors=True)
+        os.replace(version, root)
+        return
+    os.replace(enlace, root)
+    for vieja in _versiones(root):
+        if vieja != version:
+            shutil.rmtree(vieja, ignore_errors=True)
+
+
+def prerenderizar() -> dict:
+    """
+    Genera todas las páginas en un directorio temporal, lo convierte en una
+    versión nueva y recién ahí lo publica (ver _publicar).
+    """
+    root = _root()
+    if root is None:
+        raise RuntimeError("Falta configurar PRERENDER_ROOT en settings.")
+
+    root.parent.mkdir(parents=True, exist_ok=True)
+    with _lock(root):
+        inicio = time.time()
+        tmp = Path(tempfile.mkdtemp(prefix=".prerender-", dir=root.parent))
+
+        generadas, omitidas = 0, 0
+        try:
+            for url in urls_a_prerenderizar():
+                html = _renderizar(url)
+                if html is None:
+                    omitidas += 1
+                    continue
+                destino = tmp / url.strip("/") / "index.html"
+                destino.parent.mkdir(parents=True, exist_ok=True)
+                destino.write_bytes(html)
+                # WhiteNoise sirve la variante comprimida si el cliente la acepta
+                destino.with_name("index.html.gz").write_bytes(gzip.compress(html))
+                generadas += 1
+
+            version = root.with_name(f"{root.name}{PREFIJO_VERSION}{int(inicio * 1000)}")
+            os.replace(tmp, version)
+            _publicar(root, version)
+        except Exception:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+
+    return {"generadas": generadas, "omitidas": omitidas, "destino": str(root)}
+
+
+def invalidar():
+    """Borra las páginas pre-renderizadas (se vuelve a las vistas dinámicas)."""
+    root = _root()
+    if root is None:
+        return
+    if root.is_symlink():
+        root.unlink()
+    elif root.exists():
+        shutil.rmtree(root, ignore_errors=True)
+    for vieja in _versiones(root):
+        shutil.rmtree(vieja, ignore_errors=True)
+
+
+# =====================================================================
+# Regeneración en segundo plano
+# =====================================================================
+
+_timer = None
+_timer_lock = threading.Lock()
+# mtime de final.xlsx para el que este proceso ya programó una regeneración
+_excel_programado = None
+
+
+def _regenerar():
+    try:
+        prerenderizar()
+    except Exception:
+        logger.exception("No se pudo regenerar el catálogo pre-renderizado")
+    finally:
+        connection.close()  # la conexión de este hilo
+
+
+def programar_regeneracion():
+    """
+    Regenera las páginas dentro de PRERENDER_DEMORA segundos; si llega otro
+    cambio antes, se vuelve a esperar. Con demora 0 se genera en el momento.
+    Pensada para llamarse con transaction.on_commit (ver Sahumerio.save).
+    """
+    global _timer
+    if _root() is None:
+        return
+    demora = getattr(settings, "PRERENDER_DEMORA", 5)
+    if demora <= 0:
+        prerenderizar()
+        return
+    with _timer_lock:
+        if _timer is not None:
+            _timer.cancel()
+        _timer = threading.Timer(demora, _regenerar)
+        _timer.daemon = True
+        _timer.start()
+
+
+def desactualizado() -> bool:
+    """
+    True si final.xlsx cambió después de la generación que se está sirviendo;
+    la primera vez por cada cambio programa la regeneración.
+    """
+    global _excel_programado
+    desde = generado_en()
+    if desde is None:
+        return False
+    try:
+        mtime = _ruta_excel().stat().st_mtime
+    except OSError:
+        return False
+    if mtime <= desde:
+        return False
+    if _excel_programado != mtime:
+        _excel_programado = mtime
+        programar_regeneracion()
+    return True
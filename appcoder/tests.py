@@ -1 +1,166 @@
-from django.test import TestCase
+import os
+import shutil
+import tempfile
+import time
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from cart.stock import reservar_stock
+
+from .catalogo import CatalogoColumnar
+from .imagenes import IndiceImagenes
+from .models import Sahumerio
+from .prerender import programar_regeneracion
+from .views import _resolve_local_image
+
+
+class PrerenderCatalogoTests(TestCase):
+
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.tmp, ignore_errors=True)
+        self.root = self.tmp / "prerender"
+        self.sahumerio = Sahumerio.objects.create(marca="Satya", nombre="Nag Champa", precio=1500, stock=3)
+        ajustes = override_settings(PRERENDER_ROOT=self.root)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+    def test_genera_y_sirve_paginas_estaticas(self):
+        call_command("prerender_catalog", stdout=StringIO())
+
+        self.assertTrue((self.root / "catalogo" / "index.html").exists())
+        self.assertTrue((self.root / "catalogo" / "marca" / "satya" / "index.html").exists())
+        self.assertTrue((self.root / "sahumerios" / str(self.sahumerio.pk) / "index.html").exists())
+
+        resp = Client().get("/catalogo/")
+        self.assertEqual(resp.status_code, 200)
+        self.assertIn("max-age=300", resp["Cache-Control"])
+        self.assertIn(b"Nag Champa", b"".join(resp.streaming_content))
+
+    def test_con_query_string_o_sesion_va_a_la_vista(self):
+        call_command("prerender_catalog", stdout=StringIO())
+
+        resp = Client().get("/catalogo/", {"search": "champa"})
+        self.assertFalse(resp.streaming)
+
+        cliente = Client()
+        cliente.cookies["sessionid"] = "abc"
+        self.assertFalse(cliente.get("/catalogo/").streaming)
+
+    def _pagina(self, url="/catalogo/"):
+        resp = Client().get(url)
+        self.assertTrue(resp.streaming)
+        return b"".join(resp.streaming_content).decode()
+
+    @override_settings(PRERENDER_DEMORA=0)
+    def test_guardar_producto_regenera(self):
+        call_command("prerender_catalog", stdout=StringIO())
+        version = self.root.resolve()
+        self.sahumerio.nombre = "Nag Champa Gold"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.sahumerio.save()
+        self.assertNotEqual(self.root.resolve(), version)
+        self.assertFalse(version.exists())
+        self.assertIn("Nag Champa Gold", self._pagina())
+
+    def test_programar_regeneracion_junta_los_cambios(self):
+        call_command("prerender_catalog", stdout=StringIO())
+        with mock.patch("appcoder.prerender.threading.Timer") as timer:
+            programar_regeneracion()
+            programar_regeneracion()
+        self.assertEqual(timer.call_count, 2)
+        timer.return_value.cancel.assert_called_once()
+
+    def test_reservar_stock_no_toca_las_paginas(self):
+        call_command("prerender_catalog", stdout=StringIO())
+        version = self.root.resolve()
+        with self.captureOnCommitCallbacks(execute=True):
+            reservar_stock([{"id": str(self.sahumerio.pk), "name": "Nag Champa", "quantity": 2, "is_db": True}])
+        self.assertEqual(self.root.resolve(), version)
+        self.assertIn(f'data-stock-id="{self.sahumerio.pk}"', self._pagina())
+        stock = Client().get(reverse("cart:stock"), {"ids": f"{self.sahumerio.pk},999999"}).json()
+        self.assertEqual(stock, {str(self.sahumerio.pk): 1, "999999": 0})
+
+    def test_excel_mas_nuevo_que_las_paginas(self):
+        call_command("prerender_catalog", stdout=StringIO())
+        excel = self.tmp / "final.xlsx"
+        excel.touch()
+        futuro = time.time() + 60
+        os.utime(excel, (futuro, futuro))
+        with mock.patch("appcoder.prerender._ruta_excel", return_value=excel), \
+                mock.patch("appcoder.prerender.programar_regeneracion") as programar:
+            self.assertFalse(Client().get("/catalogo/").streaming)
+            self.assertFalse(Client().get("/catalogo/").streaming)
+        programar.assert_called_once()
+
+
+class CatalogoColumnarTests(TestCase):
+
+    def setUp(self):
+        self.store = CatalogoColumnar([
+            {"origen": "XLSX", "idx": 0, "marca": "Satya", "titulo": "Nag Champa", "descripcion": "clásico", "precio": 1200, "stock": 5},
+            {"origen": "XLSX", "idx": 1, "marca": "Alaukik", "titulo": "Lavanda", "descripcion": "relajante", "precio": "900", "stock": 0},
+            {"origen": "DB", "pk": 7, "marca": "satya", "titulo": "Benjuí", "descripcion": "", "precio": 1500.0, "stock": 2},
+            {"origen": "XLSX", "idx": 2, "marca": "Alaukik", "titulo": "Canela", "descripcion": "", "precio": 800, "stock": 1, "match_id": 7},
+        ])
+
+    def titulos(self, indices):
+        return [f["titulo"] for f in self.store.filas(indices)]
+
+    def test_orden_base_por_marca_y_titulo(self):
+        indices = self.store.ordenar(self.store.mascara())
+        self.assertEqual(self.titulos(indices), ["Canela", "Lavanda", "Benjuí", "Nag Champa"])
+
+    def test_filtros(self):
+        self.assertEqual(self.titulos(self.store.ordenar(self.store.mascara(marca="SATYA"))), ["Benjuí", "Nag Champa"])
+        self.assertEqual(self.titulos(self.store.ordenar(self.store.mascara(busqueda="relaj"))), ["Lavanda"])
+        self.assertEqual(self.titulos(self.store.ordenar(self.store.mascara(busqueda="alaukik", marca="satya"))), [])
+
+    def test_orden_por_popularidad(self):
+        indices = self.store.ordenar(self.store.mascara(), popularidad={"XLS:0": (3, 3), "DB:7": (1, 10)})
+        # Canela comparte clave con el producto DB 7 (match_id)
+        self.assertEqual(self.titulos(indices), ["Nag Champa", "Canela", "Benjuí", "Lavanda"])
+
+    def test_fila_conserva_precio_original(self):
+        fila = self.store.fila(1)
+        self.assertEqual(fila["precio"], "900")
+        self.assertEqual(fila["origen"], "XLSX")
+        self.assertIsNone(fila["pk"])
+
+    @mock.patch("appcoder.views.PRODUCTOS_POR_PAGINA", 2)
+    def test_pagina_antes_de_armar_filas(self):
+        for i in range(5):
+            Sahumerio.objects.create(marca="Zzpaginado", nombre=f"Paginado {i}", precio=100, stock=1)
+
+        with mock.patch("appcoder.catalogo.CatalogoColumnar.fila", autospec=True,
+                        side_effect=CatalogoColumnar.fila) as fila:
+            resp = Client().get("/catalogo/", {"marca": "Zzpaginado", "page": 2})
+
+        self.assertEqual(fila.call_count, 2)
+        self.assertEqual([it["titulo"] for it in resp.context["items"]], ["Paginado 2", "Paginado 3"])
+        self.assertEqual(resp.context["page_obj"].paginator.count, 5)
+        self.assertContains(resp, "page=3")
+
+
+class IndiceImagenesTests(TestCase):
+
+    def test_busca_sin_tocar_disco(self):
+        carpeta = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, carpeta, ignore_errors=True)
+        for nombre in ("Canela.png", "canela.jpg", "Palo_Santo.webp"):
+            (carpeta / nombre).write_bytes(b"")
+
+        indice = IndiceImagenes(carpeta)
+        shutil.rmtree(carpeta)
+
+        def resolver(nombre):
+            return _resolve_local_image(nombre, indice.name_lut, indice.stem_lut)
+
+        self.assertEqual(resolver("CANELA.PNG"), "Canela.png")
+        self.assertEqual(resolver("img/productos/canela"), "canela.jpg")  # .jpg antes que .png
+        self.assertEqual(resolver("palo santo"), "Palo_Santo.webp")
@@ -8,6 +8,7 @@ from .views import (
 urlpatterns = [
     path("catalogo/", CatalogoExcelView.as_view(), name="catalogo"),
     path("sahumerios/", CatalogoExcelView.as_view(), name="sahumerios_lista"),
+    path("catalogo/marca/<slug:marca_slug>/", CatalogoExcelView.as_view(), name="catalogo_marca"),
     path("catalogo/x/<int:idx>/", ExcelDetalleView.as_view(), name="excel_detalle"),
 
     path("sahumerios/<int:pk>/", SahumerioDetalle.as_view(), name="sahumerio_detalle"),
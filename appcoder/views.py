@@ -4,11 +4,18 @@ from django.views.generic import TemplateView, DetailView, CreateView, UpdateVie
 from django.conf import settings
 from django.templatetags.static import static
 from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.http import Http404
+from django.db.models import Count, Max
+from django.utils.text import slugify
 from pathlib import Path
 from .models import Sahumerio
+from .catalogo import CatalogoColumnar, ItemExcel, obtener_store
+from .imagenes import indice_productos, norm_text as _norm_text
 from .forms import SahumerioForm
+from cart.recomendaciones import relacionados_de
+from cart.ventas import clave_producto, popularidad, ranking
 import pandas as pd
-import unicodedata, re
 import random
 from difflib import SequenceMatcher
 
@@ -19,12 +26,6 @@ class SoloFsosaMixin(UserPassesTestMixin):
         return u.is_authenticated and u.username.lower() == "fsosa"
 
 
-def _norm_text(s: str) -> str:
-    s = str(s or "").strip().lower()
-    s = unicodedata.normalize("NFKD", s).encode("ascii", "ignore").decode("ascii")
-    return re.sub(r"[^a-z0-9]+", "", s)
-
-
 def _pick_col(cols, *needles):
     norm_cols = { _norm_text(c): c for c in cols }
     for n in needles:
@@ -38,15 +39,9 @@ def _pick_col(cols, *needles):
 
 
 def _index_product_files():
-    prod_dir = Path(settings.BASE_DIR) / "static" / "img" / "productos"
-    name_lut = {}
-    stem_lut = {}
-    if prod_dir.exists():
-        for p in prod_dir.iterdir():
-            if p.is_file():
-                name_lut[p.name.lower()] = p.name
-                stem_lut[_norm_text(p.stem)] = p.name
-    return name_lut, stem_lut
+    # Índice compartido con el carrito (se arma una vez por proceso)
+    indice = indice_productos()
+    return indice.name_lut, indice.stem_lut
 
 
 def _resolve_local_image(name: str, name_lut: dict, stem_lut: dict) -> str:
@@ -226,178 +221,247 @@ def _leer_excel():
         else:
             img_url = static("img/placeholder.png")
         
-        items.append({
-            "idx": i,
-            "marca": marca,
-            "titulo": titulo,
-            "descripcion": descripcion,
-            "precio": precio,
-            "duracion": duracion,
-            "img_file": img_file,
-            "img_abs": img_abs,
-            "img_url": img_url,
-            "raw": nombre_imagen_completo,
-            "stock": stock,
-            "activo": activo,
-        })
+        items.append(ItemExcel(
+            idx=i,
+            marca=marca,
+            titulo=titulo,
+            descripcion=descripcion,
+            precio=precio,
+            duracion=duracion,
+            img_file=img_file,
+            img_abs=img_abs,
+            img_url=img_url,
+            raw=nombre_imagen_completo,
+            stock=stock,
+            activo=activo,
+        ))
     
     # Guardar en cache
     cache.set('productos_excel', items, 3600)
     return items
 
 
-class CatalogoExcelView(TemplateView):
-    template_name = "catalogo.html"
+def _items_db() -> list[dict]:
+    """Productos activos de la DB con el mismo formato que los del Excel."""
+    db_qs = Sahumerio.objects.filter(activo=True)
+    db_items = []
     
-    def get_context_data(self, **kwargs):
-        ctx = super().get_context_data(**kwargs)
-        
-        # Leer productos del Excel (con cache)
-        x_items = _leer_excel()
+    for o in db_qs:
+        img_url = ""
+        if hasattr(o, 'imagen_resuelta'):
+            img_url = o.imagen_resuelta()
+        elif hasattr(o, 'imagen') and o.imagen:
+            img_url = str(o.imagen.url) if hasattr(o.imagen, 'url') else str(o.imagen)
         
-        # Leer productos de la DB (Optimizado: solo activos)
-        db_qs = Sahumerio.objects.filter(activo=True)
-        db_items = []
+        img_file = ""
+        img_abs = ""
         
-        for o in db_qs:
-            img_url = ""
-            if hasattr(o, 'imagen_resuelta'):
-                img_url = o.imagen_resuelta()
-            elif hasattr(o, 'imagen') and o.imagen:
-                img_url = str(o.imagen.url) if hasattr(o.imagen, 'url') else str(o.imagen)
-            
-            img_file = ""
-            img_abs = ""
-            
-            if img_url:
-                if img_url.startswith(('http://', 'https://')):
-                    img_abs = img_url
-                elif img_url.startswith('/media/') or img_url.startswith(settings.MEDIA_URL):
-                    img_abs = img_url
-                else:
-                    img_file = img_url
-            
-            stock = getattr(o, "stock", 0) or 0
-            
-            final_img_url = ""
-            if img_abs:
-                final_img_url = img_abs
-            elif img_file:
-                final_img_url = static(f"img/productos/{img_file}")
+        if img_url:
+            if img_url.startswith(('http://', 'https://')):
+                img_abs = img_url
+            elif img_url.startswith('/media/') or img_url.startswith(settings.MEDIA_URL):
+                img_abs = img_url
             else:
-                final_img_url = static("img/placeholder.png")
-            
-            db_items.append({
-                "origen": "DB",
-                "pk": o.pk,
-                "id": o.pk,
-                "idx": None,
-                "titulo": getattr(o, "nombre", "") or "",
-                "descripcion": getattr(o, "descripcion", "") or "",
-                "precio": float(getattr(o, "precio", 0) or 0),
-                "duracion": "",
-                "img_file": img_file,
-                "img_abs": img_abs,
-                "img_url": final_img_url,
-                "raw": "",
-                "marca": getattr(o, "marca", "") or "",
-                "stock": stock,
-                "activo": True,
-            })
+                img_file = img_url
+        
+        stock = getattr(o, "stock", 0) or 0
         
-        # Lookup para matching
-        if x_items and db_items:
-            lut = { _norm_text(q["nombre"]): q["id"] for q in db_qs.values("id", "nombre", "marca") }
-            for it in x_items:
-                it["origen"] = "XLSX"
-                it["pk"] = None
-                it["match_id"] = lut.get(_norm_text(it["titulo"]))
+        final_img_url = ""
+        if img_abs:
+            final_img_url = img_abs
+        elif img_file:
+            final_img_url = static(f"img/productos/{img_file}")
         else:
-             for it in x_items:
-                it["origen"] = "XLSX"
-                it["pk"] = None
-                it["match_id"] = None
+            final_img_url = static("img/placeholder.png")
+        
+        db_items.append({
+            "origen": "DB",
+            "pk": o.pk,
+            "id": o.pk,
+            "idx": None,
+            "titulo": getattr(o, "nombre", "") or "",
+            "descripcion": getattr(o, "descripcion", "") or "",
+            "precio": float(getattr(o, "precio", 0) or 0),
+            "duracion": "",
+            "img_file": img_file,
+            "img_abs": img_abs,
+            "img_url": final_img_url,
+            "raw": "",
+            "marca": getattr(o, "marca", "") or "",
+            "stock": stock,
+            "activo": True,
+        })
+    return db_items
+
+
+def _items_catalogo() -> list[dict]:
+    """Excel + DB combinados, con origen y match contra la DB para los del Excel."""
+    x_items = _leer_excel()
+    db_items = _items_db()
+    
+    # Lookup para matching
+    lut = {}
+    if x_items and db_items:
+        lut = { _norm_text(q["nombre"]): q["id"] for q in Sahumerio.objects.filter(activo=True).values("id", "nombre") }
+    x_items = [
+        {**it.a_dict(), "origen": "XLSX", "pk": None, "match_id": lut.get(_norm_text(it.titulo))}
+        for it in x_items
+    ]
+    return x_items + db_items
+
+
+def _firma_catalogo():
+    """Cambia cuando cambia final.xlsx o algún Sahumerio (alta, baja o edición)."""
+    ruta = Path(settings.BASE_DIR) / "final.xlsx"
+    mtime = ruta.stat().st_mtime if ruta.exists() else None
+    db = Sahumerio.objects.aggregate(n=Count("pk"), ultimo=Max("actualizado"))
+    return (mtime, db["n"], db["ultimo"])
+
+
+_catalogo_memo = {}
+
 
-        # Combinar
-        combinados = x_items + db_items
+def _catalogo_store() -> CatalogoColumnar:
+    """Store columnar del catálogo (por proceso, se rehace sólo si cambió la firma)."""
+    firma = _firma_catalogo()
+
+    def construir():
+        if _catalogo_memo.get("mtime") != firma[0]:
+            # El Excel cambió: no usar la lectura cacheada vieja
+            cache.delete('productos_excel')
+            _catalogo_memo["mtime"] = firma[0]
+        return _items_catalogo()
+
+    return obtener_store(firma, construir)
+
+
+PRODUCTOS_POR_PAGINA = 48
+
+
+class CatalogoExcelView(TemplateView):
+    template_name = "catalogo.html"
+    
+    def get_context_data(self, **kwargs):
+        ctx = super().get_context_data(**kwargs)
         
-        # 1. BÚSQUEDA por texto
-        busqueda = self.request.GET.get('search', '').strip()
-        if busqueda:
-            busqueda_lower = busqueda.lower()
-            combinados = [
-                item for item in combinados
-                if (busqueda_lower in item.get('titulo', '').lower() or
-                    busqueda_lower in item.get('marca', '').lower() or
-                    busqueda_lower in item.get('descripcion', '').lower())
-            ]
+        # Catálogo combinado (Excel + DB) en columnas
+        store = _catalogo_store()
         
-        # 2. FILTRO por marca
+        # 1. EXTRAER TODAS LAS MARCAS
+        todas_las_marcas = store.marcas()
+        
+        # 2. FILTRO por marca (?marca=... o /catalogo/marca/<slug>/)
         marca_activa = self.request.GET.get('marca', '').strip()
-        if marca_activa:
-            combinados = [
-                item for item in combinados 
-                if item.get('marca', '').lower() == marca_activa.lower()
-            ]
+        marca_slug = self.kwargs.get('marca_slug')
+        if marca_slug:
+            marca_activa = next((m for m in todas_las_marcas if slugify(m) == marca_slug), None)
+            if marca_activa is None:
+                raise Http404("Marca inexistente")
         
-        # 3. EXTRAER TODAS LAS MARCAS
-        all_items_unfiltered = x_items + db_items
-        todas_las_marcas = sorted({
-            item.get('marca', '').strip()
-            for item in all_items_unfiltered
-            if item.get('marca', '').strip()
-        })
+        # 3. BÚSQUEDA por texto (título, marca o descripción)
+        busqueda = self.request.GET.get('search', '').strip()
+        mask = store.mascara(busqueda=busqueda, marca=marca_activa)
         
-        # Ordenar items
-        combinados.sort(key=lambda x: ((x.get("marca") or "").lower(), (x.get("titulo") or "").lower()))
+        # 4. ORDEN: marca y título, o por popularidad (ranking de ventas real, una sola consulta)
+        orden = self.request.GET.get('orden', '').strip()
+        indices = store.ordenar(mask, popularidad=popularidad() if orden == 'populares' else None)
         
-        ctx["items"] = combinados
+        # 5. PAGINACIÓN sobre los índices: sólo se arman filas para la página actual
+        page_obj = Paginator(indices, PRODUCTOS_POR_PAGINA).get_page(self.request.GET.get('page'))
+        ctx["items"] = store.filas(page_obj.object_list)
+        ctx["page_obj"] = page_obj
         ctx["marcas"] = todas_las_marcas
         ctx["marca_activa"] = marca_activa
         ctx["search"] = busqueda
+        ctx["orden"] = orden
         
         return ctx
 
 
+def _item_home(o) -> dict:
+    """Convierte un Sahumerio en el dict que usa la grilla de la home."""
+    img_url = ""
+    if hasattr(o, 'imagen_resuelta'): img_url = o.imagen_resuelta()
+    elif hasattr(o, 'imagen') and o.imagen: img_url = o.imagen.url
+    
+    final_img = img_url if img_url else static("img/placeholder.png")
+    
+    return {
+        "pk": o.pk,
+        "titulo": o.nombre,
+        "precio": float(o.precio or 0),
+        "img_url": final_img,
+        "marca": o.marca,
+        "origen": "DB",
+        "stock": o.stock or 0
+    }
+
+
+def productos_por_clave(claves) -> list:
+    """
+    Convierte claves 'DB:<pk>' / 'XLS:<idx>' en ítems listos para las grillas
+    (dicts de la DB o ItemExcel, como la home), respetando el orden recibido.
+    Omite los productos que ya no existen, están inactivos o sin stock (Excel).
+    """
+    partes = [c.partition(":")[::2] for c in claves]
+    db_ids = [int(pid) for origen, pid in partes if origen == "DB" and pid.isdigit()]
+    db_lut = Sahumerio.objects.filter(activo=True).in_bulk(db_ids) if db_ids else {}
+    x_lut = None
+    
+    res = []
+    for origen, pid in partes:
+        if origen == "DB":
+            o = db_lut.get(int(pid)) if pid.isdigit() else None
+            if o:
+                res.append(_item_home(o))
+        else:
+            if x_lut is None:
+                x_lut = {str(x.idx): x for x in _leer_excel()}
+            it = x_lut.get(pid)
+            if it and it.stock > 0:
+                res.append(it)
+    return res
+
+
 class HomeView(TemplateView):
     template_name = "home.html"
+    cantidad_bestsellers = 4
 
     def get_context_data(self, **kwargs):
         ctx = super().get_context_data(**kwargs)
+        cantidad = self.cantidad_bestsellers
         
         # Obtener candidatos para bestsellers
         # 1. Cache
         items = _leer_excel()
         
-        # 2. DB (limitado)
-        db_promoted = Sahumerio.objects.filter(activo=True).order_by('?')[:4]
-        
-        # Mezclamos
         bestsellers = []
         
-        for o in db_promoted:
-            img_url = ""
-            if hasattr(o, 'imagen_resuelta'): img_url = o.imagen_resuelta()
-            elif hasattr(o, 'imagen') and o.imagen: img_url = o.imagen.url
-            
-            final_img = img_url if img_url else static("img/placeholder.png")
-            
-            bestsellers.append({
-                "pk": o.pk,
-                "titulo": o.nombre,
-                "precio": float(o.precio or 0),
-                "img_url": final_img,
-                "marca": o.marca,
-                "origen": "DB",
-                "stock": o.stock or 0
-            })
+        # 2. Ranking real de ventas (EstadisticaProducto, una consulta indexada)
+        top = list(ranking(limite=cantidad * 3).values_list("clave", flat=True))
+        vistos = set(top)
+        if top:
+            bestsellers.extend(productos_por_clave(top)[:cantidad])
+        
+        # 3. DB (limitado) si todavía no hay suficientes ventas
+        if len(bestsellers) < cantidad:
+            db_promoted = Sahumerio.objects.filter(activo=True).order_by('?')[:cantidad]
+            for o in db_promoted:
+                if len(bestsellers) >= cantidad:
+                    break
+                if clave_producto("DB", o.pk) not in vistos:
+                    bestsellers.append(_item_home(o))
             
         # Rellenar con Excel si faltan
-        if len(bestsellers) < 4:
+        if len(bestsellers) < cantidad:
             # Tomar algunos aleatorios del Excel que tengan foto
-            excel_cands = [x for x in items if (x.get('img_file') or x.get('img_abs')) and x.get('stock',0) > 0]
+            excel_cands = [
+                x for x in items
+                if (x.img_file or x.img_abs) and x.stock > 0
+                and clave_producto("XLS", x.idx) not in vistos
+            ]
             if excel_cands:
-                sample = random.sample(excel_cands, min(4 - len(bestsellers), len(excel_cands)))
+                sample = random.sample(excel_cands, min(cantidad - len(bestsellers), len(excel_cands)))
                 bestsellers.extend(sample)
         
         ctx['bestsellers'] = bestsellers
@@ -411,7 +475,7 @@ class ExcelDetalleView(TemplateView):
         ctx = super().get_context_data(**kwargs)
         items = _leer_excel()
         idx = kwargs.get("idx")
-        it = next((x for x in items if x["idx"] == idx), None)
+        it = next((x for x in items if x.idx == idx), None)
         ctx["it"] = it
         
         match_id = None
@@ -423,9 +487,16 @@ class ExcelDetalleView(TemplateView):
                 m = q["marca"] or ""
                 for k in {_norm_text(n), _norm_text(f"{m} {n}"), _norm_text(f"{n} {m}")}:
                     lut[k] = q["id"]
-            match_id = lut.get(_norm_text(it["titulo"]))
+            match_id = lut.get(_norm_text(it.titulo))
         
         ctx["match_id"] = match_id
+        
+        # Comprados juntos (precalculado, una lectura por clave)
+        relacionados = []
+        if it:
+            clave = clave_producto("DB", match_id) if match_id else clave_producto("XLS", idx)
+            relacionados = productos_por_clave(relacionados_de(clave))
+        ctx["relacionados"] = relacionados
         return ctx
 
 
@@ -434,6 +505,11 @@ class SahumerioDetalle(DetailView):
     template_name = "sahumerio_detalle.html"
     context_object_name = "object"
 
+    def get_context_data(self, **kwargs):
+        ctx = super().get_context_data(**kwargs)
+        ctx["relacionados"] = productos_por_clave(relacionados_de(clave_producto("DB", self.object.pk)))
+        return ctx
+
 
 class SahumerioCrear(LoginRequiredMixin, SoloFsosaMixin, CreateView):
     model = Sahumerio
@@ -1,17 +1,73 @@
+import hashlib
+import re
+
 from django.contrib import admin
-from .models import Orden
-import json
+from django.core.cache import cache
+from django.core.exceptions import PermissionDenied
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.http import HttpResponseBadRequest, StreamingHttpResponse
+from django.template.response import TemplateResponse
+from django.urls import path
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from django.utils.functional import cached_property
+from django.utils.html import format_html, format_html_join
+
+from .exportar import ordenes_filtradas, stream_csv, stream_xlsx
+from .models import EstadisticaProducto, Orden, OrdenArchivada, ResumenVentasDiario
+from .reportes import resumen
+
+CACHE_CONTEO = 300  # segundos
+
+
+class PaginadorConteoCacheado(Paginator):
+    """
+    El COUNT(*) de la lista es lo más caro con muchas órdenes: se guarda unos
+    minutos por consulta (mismos filtros y búsqueda = misma clave). El total
+    que muestra la paginación puede atrasar hasta CACHE_CONTEO segundos.
+    """
+
+    @cached_property
+    def count(self):
+        try:
+            sql, params = self.object_list.query.sql_with_params()
+        except Exception:
+            return super().count
+        clave = "admin_conteo:" + hashlib.md5(f"{sql}|{params}".encode()).hexdigest()
+        n = cache.get(clave)
+        if n is None:
+            n = super().count
+            cache.set(clave, n, CACHE_CONTEO)
+        return n
+
+
+def _lista_items(items):
+    """<ul> con cantidad, nombre, precio y subtotal de cada ítem (escapado)."""
+    return format_html(
+        "<ul>{}</ul>",
+        format_html_join(
+            "", "<li><strong>{}x</strong> {} - ${} = <strong>${}</strong></li>",
+            ((it['quantity'], it['name'], it['price'], it['subtotal']) for it in items),
+        ),
+    )
+
 
 @admin.register(Orden)
 class OrdenAdmin(admin.ModelAdmin):
-    # Qué columnas se ven en la lista principal
-    list_display = ['id', 'nombre', 'telefono', 'total', 'modalidad', 'medio_pago', 'estado', 'fecha_creacion']
+    # Qué columnas se ven en la lista principal (resumen_items se guarda al crear la orden)
+    list_display = ['id', 'nombre', 'telefono', 'resumen_items', 'total', 'modalidad', 'medio_pago', 'estado', 'fecha_creacion']
     
-    # Filtros en la barra lateral
+    # Filtros en la barra lateral (choices fijos: no consultan la base)
     list_filter = ['estado', 'modalidad', 'medio_pago', 'fecha_creacion']
     
-    # Buscador
-    search_fields = ['nombre', 'telefono', 'email']
+    # Buscador (los números van por telefono_digitos, ver get_search_results)
+    search_fields = ['nombre', 'email']
+    search_help_text = "Nombre o email; con sólo números, teléfono (cualquier parte, con o sin espacios) o n° de orden."
+
+    # Con muchas órdenes: sin el segundo COUNT(*) del total y con el conteo cacheado
+    show_full_result_count = False
+    paginator = PaginadorConteoCacheado
     
     # Poder editar el estado directamente desde la lista
     list_editable = ['estado']
@@ -46,19 +102,138 @@ class OrdenAdmin(admin.ModelAdmin):
     
     # Función para ver los items de forma linda
     def ver_items(self, obj):
-        try:
-            items = json.loads(obj.items_json)
-            html = "<ul>"
-            for item in items:
-                nombre = item.get('name', 'Producto')
-                cantidad = item.get('quantity', 0)
-                precio = item.get('price', 0)
-                subtotal = item.get('subtotal', 0)
-                html += f"<li><strong>{cantidad}x</strong> {nombre} - ${precio} = <strong>${subtotal}</strong></li>"
-            html += "</ul>"
-            return html
-        except:
-            return "Error al cargar items"
+        return _lista_items(obj.items())
     
     ver_items.short_description = "Productos del pedido"
-    ver_items.allow_tags = True
\ No newline at end of file
+
+    def get_search_results(self, request, queryset, search_term):
+        """
+        Si se buscan sólo números (teléfono o n° de orden) se busca en
+        telefono_digitos en vez de icontains sobre nombre, teléfono y email:
+        el rango por prefijo usa el índice y `contains` cubre los finales de
+        número o los números sin característica (recorre sólo esa columna corta).
+        """
+        termino = search_term.strip().lstrip('#')
+        digitos = re.sub(r'\D', '', termino)
+        if digitos and not re.sub(r'[\d\s\-+().]', '', termino):
+            filtro = Q(telefono_digitos__gte=digitos, telefono_digitos__lt=digitos + ':')  # ':' va después de '9'
+            filtro |= Q(telefono_digitos__contains=digitos)
+            if len(digitos) <= 9:
+                filtro |= Q(pk=int(digitos))
+            return queryset.filter(filtro), False
+        return super().get_search_results(request, queryset, search_term)
+
+    # Exportación para contabilidad: /admin/cart/orden/exportar/?formato=csv&desde=2026-01-01&hasta=...&estado=...
+    def get_urls(self):
+        urls = [
+            path('exportar/', self.admin_site.admin_view(self.exportar_view), name='cart_orden_exportar'),
+        ]
+        return urls + super().get_urls()
+
+    def exportar_view(self, request):
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+
+        try:
+            desde = parse_date(request.GET.get('desde') or '')
+            hasta = parse_date(request.GET.get('hasta') or '')
+        except ValueError:
+            return HttpResponseBadRequest("Fecha inexistente")
+        if (request.GET.get('desde') and not desde) or (request.GET.get('hasta') and not hasta):
+            return HttpResponseBadRequest("Fechas con formato AAAA-MM-DD")
+        estado = request.GET.get('estado') or None
+        formato = request.GET.get('formato', 'csv')
+        if estado and estado not in dict(Orden.ESTADO_CHOICES):
+            return HttpResponseBadRequest("Estado inválido")
+        if formato not in ('csv', 'xlsx'):
+            return HttpResponseBadRequest("Formato inválido (csv o xlsx)")
+
+        # Las archivadas también van a contabilidad
+        querysets = [
+            ordenes_filtradas(desde, hasta, estado, modelo=OrdenArchivada),
+            ordenes_filtradas(desde, hasta, estado),
+        ]
+        nombre = f"ordenes_{timezone.localdate():%Y%m%d}.{formato}"
+        if formato == 'xlsx':
+            response = StreamingHttpResponse(
+                stream_xlsx(querysets),
+                content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+            )
+        else:
+            response = StreamingHttpResponse(stream_csv(querysets), content_type='text/csv; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="{nombre}"'
+        return response
+
+
+@admin.register(OrdenArchivada)
+class OrdenArchivadaAdmin(admin.ModelAdmin):
+    # Sólo lectura: las mueve `manage.py archivar_ordenes` desde Orden
+    list_display = ['id', 'nombre', 'telefono', 'total', 'modalidad', 'medio_pago', 'estado', 'fecha_creacion']
+    list_filter = ['estado', 'modalidad', 'medio_pago']
+    search_fields = ['=id', 'nombre', 'telefono', 'email']
+    date_hierarchy = 'fecha_creacion'
+    readonly_fields = [f.name for f in OrdenArchivada._meta.fields] + ['ver_items']
+    exclude = ['items_json', 'whatsapp_mensaje']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def ver_items(self, obj):
+        return _lista_items(obj.items())
+
+    ver_items.short_description = "Productos del pedido"
+
+
+@admin.register(EstadisticaProducto)
+class EstadisticaProductoAdmin(admin.ModelAdmin):
+    # Sólo lectura: se completa desde Orden.save() y `manage.py backfill_ventas`
+    list_display = ['nombre', 'clave', 'unidades_7d', 'unidades_30d', 'unidades', 'ingresos_30d', 'ingresos', 'ultima_venta']
+    list_filter = ['origen']
+    search_fields = ['nombre', 'clave']
+    readonly_fields = [f.name for f in EstadisticaProducto._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ResumenVentasDiario)
+class ResumenVentasDiarioAdmin(admin.ModelAdmin):
+    """
+    Tablero de ventas: lee sólo los resúmenes diarios (los llena `manage.py sales_report`).
+    ?desde=AAAA-MM-DD&hasta=AAAA-MM-DD; por defecto, el mes en curso.
+    """
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+    def changelist_view(self, request, extra_context=None):
+        hoy = timezone.localdate()
+        try:
+            hasta = parse_date(request.GET.get('hasta') or '') or hoy
+            desde = parse_date(request.GET.get('desde') or '') or hasta.replace(day=1)
+        except ValueError:
+            hasta, desde = hoy, hoy.replace(day=1)
+
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': "Ventas",
+            'desde': desde,
+            'hasta': hasta,
+            'datos': resumen(desde, hasta),
+            'ultimo_calculo': ResumenVentasDiario.objects.order_by('-calculado').values_list('calculado', flat=True).first(),
+            **(extra_context or {}),
+        }
+        return TemplateResponse(request, 'admin/cart/resumenventasdiario/tablero.html', context)
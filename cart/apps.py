@@ -0,0 +1,23 @@
+from django.apps import AppConfig
+from django.db.models.signals import post_delete, post_save
+
+
+class CartConfig(AppConfig):
+    default_auto_field = "django.db.models.BigAutoField"
+    name = "cart"
+
+    def ready(self):
+        # Modelo de producto resuelto una vez; sus altas/bajas/cambios limpian
+        # el cache de producto_carrito()
+        from .cart import _producto_cambiado, get_product_model
+
+        Product = get_product_model()
+        post_save.connect(_producto_cambiado, sender=Product, dispatch_uid="cart_producto_guardado")
+        post_delete.connect(_producto_cambiado, sender=Product, dispatch_uid="cart_producto_borrado")
+
+        # Borrar o archivar una orden deja viejo el resumen de ventas de su día
+        from .models import Orden, OrdenArchivada
+        from .reportes import marcar_dia_pendiente
+
+        for modelo in (Orden, OrdenArchivada):
+            post_delete.connect(marcar_dia_pendiente, sender=modelo, dispatch_uid=f"cart_dia_pendiente_{modelo.__name__}")
@@ -0,0 +1,53 @@
+"""
+Archivo de órdenes viejas.
+
+La tabla Orden sólo crece, y con ella la lista del admin, las búsquedas por
+nombre/teléfono/email y los filtros por estado. Las órdenes ya cerradas
+(entregadas o canceladas) con más de N días se mueven a OrdenArchivada en
+lotes: cada lote copia las filas y sus líneas (OrdenItem -> OrdenArchivadaItem)
+y borra las originales en una misma transacción, así que cortar el comando a
+mitad no pierde nada.
+
+Las estadísticas ya acumuladas (EstadisticaProducto, VentaDiariaProducto,
+ResumenVentasDiario) no se tocan, y lo que se recalcula desde cero
+(`backfill_ventas`, `sales_report --reconstruir`) suma las órdenes vigentes
+y las archivadas.
+"""
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+ESTADOS_ARCHIVABLES = ('entregada', 'cancelada')
+DIAS_ARCHIVO = 180
+LOTE = 500
+
+
+def archivables(dias=DIAS_ARCHIVO):
+    from .models import Orden
+
+    limite = timezone.now() - timedelta(days=dias)
+    return Orden.objects.filter(estado__in=ESTADOS_ARCHIVABLES, fecha_creacion__lt=limite)
+
+
+def archivar_ordenes(dias=DIAS_ARCHIVO, lote=LOTE) -> int:
+    """Mueve a OrdenArchivada las órdenes cerradas con más de `dias` días. Devuelve cuántas movió."""
+    from .models import Orden, OrdenArchivada, OrdenArchivadaItem, OrdenItem
+
+    movidas = 0
+    while True:
+        with transaction.atomic():
+            ordenes = list(archivables(dias).order_by('pk').only(*OrdenArchivada.CAMPOS)[:lote])
+            if not ordenes:
+                return movidas
+            OrdenArchivada.objects.bulk_create([
+                OrdenArchivada(**{campo: getattr(o, campo) for campo in OrdenArchivada.CAMPOS})
+                for o in ordenes
+            ])
+            ids = [o.pk for o in ordenes]
+            OrdenArchivadaItem.objects.bulk_create([
+                OrdenArchivadaItem(orden_id=linea.orden_id, **{campo: getattr(linea, campo) for campo in OrdenItem.CAMPOS})
+                for linea in OrdenItem.objects.filter(orden_id__in=ids).iterator(chunk_size=2000)
+            ])
+            Orden.objects.filter(pk__in=ids).delete()
+        movidas += len(ordenes)
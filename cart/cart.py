@@ -1,40 +1,204 @@
 from __future__ import annotations
-from decimal import Decimal
-from django.conf import settings
-from django.templatetags.static import static
-from django.contrib.staticfiles import finders
+from dataclasses import dataclass
+import json
+import time
+from functools import lru_cache
+from decimal import Decimal, InvalidOperation
+from numbers import Number
+from types import MappingProxyType
+from typing import Mapping
+from django.apps import apps
+from django.core.cache import caches
+from django.db import transaction
+
+
+from .dinero import Dinero
+
+
+# BUG #3 CORREGIDO: Data URI SVG para evitar 404 (no depende de archivos)
+PLACEHOLDER_IMG = (
+    "data:image/svg+xml,%3Csvg xmlns='http://www.w3.org/2000/svg' "
+    "width='200' height='200' viewBox='0 0 200 200'%3E"
+    "%3Crect width='200' height='200' fill='%23f0f0f0'/%3E"
+    "%3Ctext x='50%25' y='50%25' dominant-baseline='middle' "
+    "text-anchor='middle' font-family='sans-serif' font-size='14' "
+    "fill='%23999'%3ESin imagen%3C/text%3E%3C/svg%3E"
+)
+
+
+@dataclass(frozen=True)
+class CartSnapshot:
+    """
+    Foto del carrito para un request: se calcula una vez y la comparten
+    vistas, templates y el context processor (ver Cart.snapshot()).
+    Los ítems son de sólo lectura; para cambiar algo se usa Cart.
+    """
+    items: tuple
+    count: int
+    total: Dinero
+    por_id: Mapping[str, dict]
+
+    def items_json(self) -> str:
+        """Ítems para Orden.items_json (precios en pesos, como siempre)."""
+        return json.dumps([
+            {**it, "price": float(it["price"]), "subtotal": float(it["subtotal"])}
+            for it in self.items
+        ])
+
+
+@lru_cache(maxsize=None)
+def get_product_model():
+    """
+    Permite usar Sahumerio (appcoder) o Producto (productos) según exista.
+    Se resuelve una sola vez por proceso (CartConfig.ready lo llama al arrancar).
+    """
+    try:
+        return apps.get_model("appcoder", "Sahumerio")
+    except LookupError:
+        return apps.get_model("productos", "Producto")
+
+
+# =====================================================================
+# Datos de producto para agregar al carrito (cacheados por id)
+# =====================================================================
+
+# Cache compartido entre workers (ver CACHES["carrito"] en settings): una
+# invalidación en un proceso la ven todos, y el TIMEOUT corto acota lo que
+# pueda quedar viejo por un cambio que no pasó por invalidar_productos_carrito
+CACHE_CARRITO = "carrito"
+
+
+@dataclass(frozen=True)
+class ProductoCarrito:
+    """
+    Lo que el carrito usa de un producto de la DB (agregar y mostrar).
+    Sirve como `product` en Cart.add() y en Cart._datos_db().
+    """
+    id: int
+    nombre: str
+    marca: str
+    precio: Decimal
+    stock: int
+    activo: bool
+    imagen: str | None
+
+    def __str__(self):
+        return f"{self.marca} {self.nombre}".strip()
+
+    def imagen_resuelta(self):
+        return self.imagen
+
+    @classmethod
+    def de(cls, product) -> "ProductoCarrito":
+        return cls(
+            id=product.pk,
+            nombre=getattr(product, "nombre", None) or str(product),
+            marca=(getattr(product, "marca", "") or "").strip(),
+            precio=getattr(product, "precio", None) or Decimal("0"),
+            stock=getattr(product, "stock", 0) or 0,
+            activo=getattr(product, "activo", True),
+            imagen=Cart._guess_image_url_from_product(product),
+        )
+
+
+def _clave_producto_carrito(pk) -> str:
+    return f"cart:producto:{get_product_model()._meta.label_lower}:{pk}"
+
+
+def productos_carrito(pks) -> dict[int, ProductoCarrito]:
+    """
+    Productos `pks` desde el cache; los que falten se leen en una sola
+    consulta y se guardan. Los ids inexistentes no aparecen en el resultado.
+    Las altas, cambios y bajas borran la entrada (ver invalidar_productos_carrito).
+    """
+    claves = {_clave_producto_carrito(pk): pk for pk in {int(pk) for pk in pks}}
+    if not claves:
+        return {}
+    cache = caches[CACHE_CARRITO]
+    encontrados = {claves[c]: p for c, p in cache.get_many(list(claves)).items()}
+    faltan = [pk for pk in claves.values() if pk not in encontrados]
+    if faltan:
+        nuevos = {pk: ProductoCarrito.de(o) for pk, o in get_product_model().objects.in_bulk(faltan).items()}
+        cache.set_many({_clave_producto_carrito(pk): p for pk, p in nuevos.items()})
+        encontrados.update(nuevos)
+    return encontrados
+
+
+def producto_carrito(pk) -> ProductoCarrito | None:
+    """Un producto para cart_add: None si el id no es válido o no existe."""
+    if not str(pk).isdigit():
+        return None
+    return productos_carrito([pk]).get(int(pk))
+
+
+def invalidar_productos_carrito(pks, modelo=None) -> None:
+    """
+    Borra del cache los productos `pks`. Hay que llamarlo después de un
+    update()/bulk_update(), que no disparan señales. `modelo` permite a
+    otras apps avisar sin saber si su modelo es el del carrito.
+    """
+    if modelo is not None and modelo is not get_product_model():
+        return
+    claves = [_clave_producto_carrito(pk) for pk in pks]
+    if not claves:
+        return
+    cache = caches[CACHE_CARRITO]
+    cache.delete_many(claves)
+    if transaction.get_connection().in_atomic_block:
+        # Un request que lea antes del commit volvería a guardar el valor viejo
+        transaction.on_commit(lambda: cache.delete_many(claves))
+
+
+def _producto_cambiado(sender, instance, **kwargs):
+    invalidar_productos_carrito([instance.pk])
+
+
+def precio_excel(raw) -> Decimal:
+    """
+    Precio de una fila del Excel: los números se toman tal cual (2800.0 no
+    es "28000") y el texto con formato AR (1.234,56).
+    """
+    if isinstance(raw, Number):
+        return Decimal(str(raw))
+    s = str(raw or "").strip().replace(".", "").replace(",", ".")
+    try:
+        return Decimal(s) if s else Decimal("0")
+    except InvalidOperation:
+        return Decimal("0")
+
+
+CART_VACIO = CartSnapshot(items=(), count=0, total=Dinero(0), por_id=MappingProxyType({}))
 
 
 class Cart:
     """
     Carrito almacenado en sesión.
 
-    Estructura en session[self.SESSION_KEY]:
+    Estructura en session[self.SESSION_KEY] (formato compacto):
     {
-        "<id>": {
-            "id": "<id>",
-            "name": "Nombre",
-            "price": 2800.0,
-            "quantity": 2,
-            "img": "canela.jpg" | "img/productos/canela.jpg" | "https://...",
-            "image_url": "/static/img/productos/canela.jpg" | "https://..." | "/media/...",
-            "origin": "DB" | "XLS",
-            "is_db": True | False,
-        },
+        "<id>": ["D" | "X", <cantidad>, <precio al agregar, en centavos (int)>],
         ...
     }
+
+    Sólo se guarda la referencia al producto ("D" = Sahumerio de la DB,
+    "X" = fila del Excel), la cantidad y el precio con el que se agregó.
+    Nombre e imagen se rearman al leer, desde productos_carrito() y la
+    lectura cacheada del Excel. Los carritos viejos (un dict por ítem con
+    name/img/image_url/...) se convierten solos la primera vez que se leen.
     """
 
     SESSION_KEY = "cart"
+    # Número que sube con cada cambio del carrito (ETag de cart_summary)
+    VERSION_KEY = "cart_version"
 
     # --------------------------- utils internas -----------------------------
 
     @staticmethod
-    def _to_decimal(val) -> Decimal:
-        try:
-            return Decimal(str(val))
-        except Exception:
-            return Decimal("0")
+    def _precio_guardado(valor) -> Dinero:
+        # int = centavos; float = pesos (carritos guardados antes de usar centavos)
+        if isinstance(valor, int):
+            return Dinero(valor)
+        return Dinero.de(valor)
 
     @staticmethod
     def _guess_image_url_from_product(product) -> str | None:
@@ -77,151 +241,74 @@ class Cart:
                     return url
         return None
 
-    @staticmethod
-    def _resolve_payload_image_url(img: str | None) -> str | None:
-        """
-        Normaliza la URL para imágenes que vienen desde Excel/payload.
-
-        Soporta:
-          - URLs absolutas (http/https)
-          - Rutas /media/... o MEDIA_URL
-          - Rutas /static/... o "static/..."
-          - Rutas relativas tipo "img/productos/canela.jpg"
-          - Solo nombre -> prueba en /static/img/productos/ con extensiones comunes
-            y variantes (lowercase, guiones, underscores).
-        """
-        if not img:
-            return None
-
-        s = str(img).strip().replace("\\", "/")
-        if not s:
-            return None
-
-        # Absoluta
-        if s.startswith(("http://", "https://")):
-            return s
-
-        # Media
-        media_url = getattr(settings, "MEDIA_URL", "/media/")
-        if s.startswith("/media/") or (media_url and s.startswith(media_url)):
-            return s
-
-        # Static directos
-        if s.startswith("/static/"):
-            return s
-        if s.startswith("static/"):
-            return "/" + s
-
-        # Construir lista de candidatos relativos a STATIC
-        candidates: list[str] = []
-
-        # Si trae subcarpetas, probar tal cual y variantes
-        if "/" in s:
-            rel = s.lstrip("/")
-            candidates.append(rel)
-            candidates.append(rel.lower())
-        else:
-            # Solo nombre -> empezar por carpeta productos
-            candidates.append(f"img/productos/{s}")
-            candidates.append(f"img/productos/{s.lower()}")
-
-        # Si no tiene extensión, probar varias + variantes
-        name = s.split("/")[-1]
-        has_ext = "." in name
-        if not has_ext:
-            bases = {
-                name,
-                name.lower(),
-                name.replace(" ", "-"),
-                name.replace(" ", "_"),
-                name.lower().replace(" ", "-"),
-                name.lower().replace(" ", "_"),
-            }
-            exts = [".jpg", ".jpeg", ".png", ".webp", ".gif"]
-            for b in bases:
-                candidates.append(f"img/productos/{b}")
-                for ext in exts:
-                    candidates.append(f"img/productos/{b}{ext}")
-
-        # Quitar duplicados preservando orden
-        seen = set()
-        uniq: list[str] = []
-        for rel in candidates:
-            rel = rel.replace("\\", "/")
-            if rel not in seen:
-                seen.add(rel)
-                uniq.append(rel)
-
-        # Buscar en el finder de estáticos
-        for rel in uniq:
-            if finders.find(rel):
-                return static(rel)
-
-        # Si no lo encontró, devolver el primero como estático
-        return static(uniq[0]) if uniq else None
-
     # ------------------------------ núcleo ----------------------------------
 
     def __init__(self, request):
+        # Perezoso: no toca la sesión hasta que se lee o se modifica el carrito.
+        # Un visitante sin carrito no genera ninguna fila de sesión.
+        self.request = request
         self.session = request.session
-        cart = self.session.get(self.SESSION_KEY)
-        if cart is None:
-            cart = {}
-            self.session[self.SESSION_KEY] = cart
-        self.cart = cart
+        self._cart = None
 
-    def _save(self):
-        self.session[self.SESSION_KEY] = self.cart
-        self.session.modified = True
+    @property
+    def cart(self) -> dict:
+        if self._cart is None:
+            self._cart = self.session.get(self.SESSION_KEY) or {}
+            if any(isinstance(v, dict) for v in self._cart.values()):
+                # Carrito guardado con el formato viejo: se pasa al compacto
+                self._cart = {pid: self._migrar_item(v) for pid, v in self._cart.items()}
+                self._save()
+        return self._cart
 
-    def add(self, product, quantity: int = 1, replace_quantity: bool = False):
-        pid = str(getattr(product, "id"))
-        
-        # ✅ SOLUCIÓN: Concatenar marca + nombre
-        marca = getattr(product, "marca", "").strip()
-        nombre = getattr(product, "nombre", None) or getattr(product, "name", None) or str(product)
-        
-        # Si tiene marca, agregar al nombre
-        if marca:
-            name = f"{marca} - {nombre}"
-        else:
-            name = nombre
-        
-        price = self._to_decimal(getattr(product, "precio", None) or getattr(product, "price", None) or 0)
-        
-        # Usar el método mejorado que busca imagen_file e imagen_url
-        image_url = self._guess_image_url_from_product(product)
+    @staticmethod
+    def _migrar_item(item) -> list:
+        """Ítem del formato viejo (dict completo) -> [origen, cantidad, precio]."""
+        if not isinstance(item, dict):
+            return item
+        es_db = bool(item.get("is_db")) or str(item.get("origin", "")).upper() == "DB"
+        try:
+            cantidad = int(item.get("quantity", 0))
+        except (TypeError, ValueError):
+            cantidad = 0
+        return ["D" if es_db else "X", cantidad, Dinero.de(item.get("price", 0)).centavos]
 
-        item = self.cart.get(pid)
-        if item is None:
-            item = {
-                "id": pid,
-                "name": name,
-                "price": float(price),
-                "quantity": 0,
-                "img": None,
-                "image_url": image_url,
-                "origin": "DB",
-                "is_db": True,
-            }
-            self.cart[pid] = item
-
-        if replace_quantity:
-            item["quantity"] = max(0, int(quantity))
+    def _save(self):
+        # Sólo se escribe al modificar. Un carrito vacío sale de la sesión con
+        # su versión (pop no marca la sesión si no estaban): vaciar o quitar
+        # sin carrito no crea una fila de sesión.
+        if self.cart:
+            self.session[self.SESSION_KEY] = self.cart
+            # Arranca en la hora en ms: una sesión nueva no repite versiones de otra
+            self.session[self.VERSION_KEY] = max(self.version + 1, int(time.time() * 1000))
         else:
-            item["quantity"] = max(0, int(item["quantity"]) + int(quantity))
+            self.session.pop(self.SESSION_KEY, None)
+            self.session.pop(self.VERSION_KEY, None)
+        # La foto del request queda vieja
+        self.request.__dict__.pop(self.REQUEST_ATTR, None)
 
-        # refresca datos por si cambiaron
-        item["name"] = name
-        item["price"] = float(price)
-        if image_url:
-            item["image_url"] = image_url
+    @property
+    def version(self) -> int:
+        """Versión del carrito guardado (0 = carrito vacío, no se guarda nada)."""
+        return int(self.session.get(self.VERSION_KEY) or 0)
 
-        if item["quantity"] <= 0:
+    def _poner(self, pid: str, origen: str, quantity: int, replace_quantity: bool, price):
+        actual = self.cart.get(pid)
+        previa = int(actual[1]) if actual else 0
+        cantidad = max(0, int(quantity)) if replace_quantity else max(0, previa + int(quantity))
+
+        if cantidad <= 0:
             self.cart.pop(pid, None)
+        else:
+            # refresca el precio por si cambió
+            self.cart[pid] = [origen, cantidad, Dinero.de(price).centavos]
 
         self._save()
 
+    def add(self, product, quantity: int = 1, replace_quantity: bool = False):
+        pid = str(getattr(product, "id"))
+        price = getattr(product, "precio", None) or getattr(product, "price", None) or 0
+        self._poner(pid, "D", quantity, replace_quantity, price)
+
     def add_payload(
         self,
         *,
@@ -233,45 +320,21 @@ class Cart:
         replace_quantity: bool = False,
         marca: str | None = None,  # ✅ NUEVO: Parámetro opcional para marca
     ):
-        pid = str(product_id)
-        price = self._to_decimal(price)
-        image_url = self._resolve_payload_image_url(img)
-        
-        # ✅ SOLUCIÓN: Si viene marca, concatenar con nombre
-        if marca and marca.strip():
-            display_name = f"{marca.strip()} - {name}"
-        else:
-            display_name = name
-
-        item = self.cart.get(pid)
-        if item is None:
-            item = {
-                "id": pid,
-                "name": display_name,
-                "price": float(price),
-                "quantity": 0,
-                "img": img,
-                "image_url": image_url,
-                "origin": "XLS",
-                "is_db": False,
-            }
-            self.cart[pid] = item
-
-        if replace_quantity:
-            item["quantity"] = max(0, int(quantity))
-        else:
-            item["quantity"] = max(0, int(item["quantity"]) + int(quantity))
-
-        # refresca datos
-        item["name"] = display_name or item["name"]
-        item["price"] = float(price)
-        item["img"] = img
-        if image_url:
-            item["image_url"] = image_url
-
-        if item["quantity"] <= 0:
-            self.cart.pop(pid, None)
+        # Nombre, marca e imagen ya no se guardan: se leen del Excel por idx
+        self._poner(str(product_id), "X", quantity, replace_quantity, price)
 
+    def actualizar(self, cambios):
+        """
+        Aplica varias cantidades finales de una vez y guarda la sesión una sola vez.
+        `cambios`: iterable de (product_id, origen "D"/"X", cantidad, precio);
+        cantidad <= 0 quita el ítem.
+        """
+        for pid, origen, cantidad, price in cambios:
+            pid = str(pid)
+            if int(cantidad) <= 0:
+                self.cart.pop(pid, None)
+            else:
+                self.cart[pid] = [origen, int(cantidad), Dinero.de(price).centavos]
         self._save()
 
     def remove(self, product_id: str | int):
@@ -281,52 +344,165 @@ class Cart:
             self._save()
 
     def clear(self):
-        self.session[self.SESSION_KEY] = {}
-        self.session.modified = True
-        self.cart = self.session[self.SESSION_KEY]
+        self._cart = {}
+        self._save()
 
-    def __len__(self):
-        return sum(int(i["quantity"]) for i in self.cart.values())
+    # ------------------------------ lectura ---------------------------------
 
-    def __iter__(self):
+    # Atributo del request donde queda la foto (compartida entre instancias)
+    REQUEST_ATTR = "_cart_snapshot"
+
+    def _armar_snapshot(self) -> CartSnapshot:
         """
-        Devuelve ítems uniformes y calcula subtotal.
+        Ítems uniformes con subtotal, cantidad total y total.
         Garantiza que 'image_url' siempre venga poblado (o placeholder).
-        BUG #3 CORREGIDO: Placeholder SVG inline (no depende de archivos).
         """
-        # BUG #3 CORREGIDO: Data URI SVG para evitar 404
-        placeholder = (
-            "data:image/svg+xml,%3Csvg xmlns='http://www.w3.org/2000/svg' "
-            "width='200' height='200' viewBox='0 0 200 200'%3E"
-            "%3Crect width='200' height='200' fill='%23f0f0f0'/%3E"
-            "%3Ctext x='50%25' y='50%25' dominant-baseline='middle' "
-            "text-anchor='middle' font-family='sans-serif' font-size='14' "
-            "fill='%23999'%3ESin imagen%3C/text%3E%3C/svg%3E"
-        )
-        
-        for it in list(self.cart.values()):
-            qty = int(it.get("quantity", 0))
-            price = self._to_decimal(it.get("price", 0))
+        if not self.cart:
+            return CART_VACIO
+
+        db_lut, x_lut = self._productos()
+
+        items = []
+        count = 0
+        total = Dinero(0)
+        for pid, (origen, qty, price) in self.cart.items():
+            qty = int(qty)
+            price = self._precio_guardado(price)
             subtotal = price * qty
-            img_url = it.get("image_url") or self._resolve_payload_image_url(it.get("img")) or placeholder
-            yield {
-                "id": it.get("id"),
-                "name": it.get("name"),
-                "price": float(price),
+            if origen == "D":
+                name, img, image_url = self._datos_db(db_lut.get(pid))
+            else:
+                name, img, image_url = self._datos_excel(x_lut.get(pid))
+            items.append({
+                "id": pid,
+                "name": name,
+                "price": price,
                 "quantity": qty,
-                "img": it.get("img"),
-                "image_url": img_url,
-                "origin": it.get("origin", "XLS"),
-                "is_db": bool(it.get("is_db")),
-                "subtotal": float(subtotal),
-            }
+                "img": img,
+                "image_url": image_url or PLACEHOLDER_IMG,
+                "origin": "DB" if origen == "D" else "XLS",
+                "is_db": origen == "D",
+                "subtotal": subtotal,
+            })
+            count += qty
+            total += subtotal
+
+        return CartSnapshot(
+            items=tuple(items),
+            count=count,
+            total=total,
+            por_id=MappingProxyType({str(it["id"]): it for it in items}),
+        )
+
+    def _productos(self, fresco: bool = False) -> tuple[dict, dict]:
+        """
+        Productos del carrito: los de la DB desde el cache de productos_carrito()
+        (o en una consulta, con fresco=True) y los del Excel desde el cache.
+        """
+        db_ids = [int(pid) for pid, v in self.cart.items() if v[0] == "D" and pid.isdigit()]
+        db_lut = {}
+        if db_ids and fresco:
+            Product = get_product_model()
+            db_lut = {str(pk): o for pk, o in Product.objects.in_bulk(db_ids).items()}
+        elif db_ids:
+            db_lut = {str(pk): p for pk, p in productos_carrito(db_ids).items()}
+
+        x_lut = {}
+        if any(v[0] == "X" for v in self.cart.values()):
+            from appcoder.views import _leer_excel
+            x_lut = {str(x.idx): x for x in _leer_excel()}
+        return db_lut, x_lut
+
+    @classmethod
+    def _datos_db(cls, product) -> tuple:
+        if product is None:
+            return "Producto", None, None
+        # ✅ SOLUCIÓN: Concatenar marca + nombre
+        marca = (getattr(product, "marca", "") or "").strip()
+        nombre = getattr(product, "nombre", None) or getattr(product, "name", None) or str(product)
+        name = f"{marca} - {nombre}" if marca else nombre
+        return name, None, cls._guess_image_url_from_product(product)
+
+    @staticmethod
+    def _datos_excel(it) -> tuple:
+        if it is None:
+            return "Producto", None, None
+        name = f"{it.marca} - {it.titulo}" if it.marca else it.titulo
+        return name, it.img_url, it.img_url
+
+    def conciliar(self) -> list[str]:
+        """
+        Revisa todo el carrito contra el catálogo actual antes de confirmar:
+        productos de la DB en una sola consulta (in_bulk) y los del Excel
+        desde la lectura cacheada. Actualiza precios, recorta cantidades al
+        stock disponible y quita lo que ya no existe o no tiene stock.
+        Devuelve un mensaje por cada cambio (lista vacía si estaba todo bien).
+        """
+        if not self.cart:
+            return []
+
+        # Precio y stock se comparan contra la base, no contra el cache
+        db_lut, x_lut = self._productos(fresco=True)
+        cambios = []
+        avisos = []
+        for pid, (origen, cantidad, precio) in self.cart.items():
+            if origen == "D":
+                product = db_lut.get(pid)
+                if product is not None and not getattr(product, "activo", True):
+                    product = None
+                nombre = self._datos_db(product)[0]
+                stock = (getattr(product, "stock", 0) or 0) if product else 0
+                precio_actual = Dinero.de(getattr(product, "precio", 0) or 0) if product else None
+            else:
+                product = x_lut.get(pid)
+                nombre = self._datos_excel(product)[0]
+                stock = product.stock if product else 0
+                precio_actual = Dinero.de(precio_excel(product.precio)) if product else None
+
+            if product is None:
+                avisos.append("Un producto de tu carrito ya no está disponible y se quitó.")
+                cambios.append((pid, origen, 0, 0))
+                continue
+            if stock <= 0:
+                avisos.append(f"{nombre} se quedó sin stock y se quitó del carrito.")
+                cambios.append((pid, origen, 0, 0))
+                continue
+
+            nueva_cantidad = min(int(cantidad), stock)
+            if nueva_cantidad < int(cantidad):
+                avisos.append(f"De {nombre} sólo quedan {stock}: ajustamos la cantidad.")
+            precio_cambio = precio_actual != self._precio_guardado(precio)
+            if precio_cambio:
+                avisos.append(f"{nombre} cambió de precio: ahora {precio_actual.ar()}.")
+            if nueva_cantidad != int(cantidad) or precio_cambio:
+                cambios.append((pid, origen, nueva_cantidad, precio_actual))
+
+        if cambios:
+            self.actualizar(cambios)
+        return avisos
+
+    def snapshot(self) -> CartSnapshot:
+        """Foto del carrito, calculada una sola vez por request (hasta que se modifique)."""
+        snap = getattr(self.request, self.REQUEST_ATTR, None)
+        if snap is None:
+            snap = self._armar_snapshot()
+            setattr(self.request, self.REQUEST_ATTR, snap)
+        return snap
+
+    def cantidad(self, product_id: str | int) -> int:
+        """Unidades de un producto que ya están en el carrito."""
+        item = self.snapshot().por_id.get(str(product_id))
+        return item["quantity"] if item else 0
+
+    def __len__(self):
+        return self.snapshot().count
+
+    def __iter__(self):
+        return iter(self.snapshot().items)
 
     def get_total_price(self) -> float:
-        total = Decimal("0")
-        for it in self:
-            total += Decimal(str(it["subtotal"]))
-        return float(total)
+        return float(self.snapshot().total)
 
     @property
-    def total(self) -> float:
-        return self.get_total_price()
\ No newline at end of file
+    def total(self) -> Dinero:
+        return self.snapshot().total
@@ -1,29 +1,41 @@
-from decimal import Decimal
 from .cart import Cart
+from .dinero import Dinero
+
+
+def _sin_sesion(request) -> bool:
+    """
+    True si el request no trae sesión (ni la creó en este mismo request):
+    no puede haber carrito y no hace falta tocar el session store.
+    """
+    session = getattr(request, "session", None)
+    return session is None or (not session.session_key and not session.modified)
+
 
 def cart_context(request):
-    cart = Cart(request)
+    if _sin_sesion(request):
+        return {
+            "cart_len": 0,
+            "cart_total": Dinero(0),
+            "cart_items": [],
+        }
+
+    # Misma foto del carrito que usa la vista (se calcula una vez por request)
+    snap = Cart(request).snapshot()
     cart_items = []
-    total = Decimal('0')
     
-    # Procesar items del carrito para el template
-    for item in cart:
-        quantity = int(item.get('quantity', 1))
-        price = Decimal(str(item.get('price', 0)))
-        subtotal = quantity * price
-        
+    # Procesar items del carrito para el mini carrito (sólo los primeros 3)
+    for item in snap.items[:3]:
         cart_items.append({
             'id': item.get('id'),
             'name': item.get('name', 'Producto'),
-            'quantity': quantity,
-            'price': price,
-            'subtotal': subtotal,
+            'quantity': item['quantity'],
+            'price': item['price'],
+            'subtotal': item['subtotal'],
             'image': item.get('image', ''),
         })
-        total += subtotal
     
     return {
-        "cart_len": len(cart),
-        "cart_total": total,
-        "cart_items": cart_items[:3],  # Solo primeros 3 items para el mini carrito
-    }
\ No newline at end of file
+        "cart_len": snap.count,
+        "cart_total": snap.total,
+        "cart_items": cart_items,
+    }
@@ -0,0 +1,116 @@
+"""
+Dinero en centavos enteros.
+
+El carrito guardaba precios como float y en cada vuelta hacía
+Decimal(str(float)); los totales arrastraban redondeos de float. Dinero
+guarda un int de centavos: sumar y multiplicar por cantidades es aritmética
+de enteros, y la conversión a Decimal/float/str se hace una sola vez en el
+borde (templates, JSON, Orden.total).
+"""
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+from functools import total_ordering
+from numbers import Number
+
+_CENTAVO = Decimal("0.01")
+
+
+@total_ordering
+class Dinero:
+    """Monto en pesos con precisión de centavos. Inmutable."""
+
+    __slots__ = ("centavos",)
+
+    def __init__(self, centavos: int = 0):
+        object.__setattr__(self, "centavos", int(centavos))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Dinero es inmutable")
+
+    @classmethod
+    def de(cls, valor) -> "Dinero":
+        """
+        Desde pesos: int, float, Decimal o texto "1234.56". Lo inválido vale 0.
+        (Para un valor que ya está en centavos usar Dinero(centavos).)
+        """
+        if isinstance(valor, Dinero):
+            return valor
+        if isinstance(valor, int) and not isinstance(valor, bool):
+            return cls(valor * 100)
+        try:
+            d = Decimal(repr(valor)) if isinstance(valor, float) else Decimal(str(valor).strip() or "0")
+            return cls(int(d.quantize(_CENTAVO, rounding=ROUND_HALF_UP) * 100))
+        except (InvalidOperation, ValueError, TypeError):
+            return cls(0)
+
+    # ---------------------------- aritmética --------------------------------
+
+    def __add__(self, otro):
+        if isinstance(otro, Dinero):
+            return Dinero(self.centavos + otro.centavos)
+        if otro == 0:  # sum() arranca en 0
+            return self
+        return NotImplemented
+
+    __radd__ = __add__
+
+    def __sub__(self, otro):
+        if isinstance(otro, Dinero):
+            return Dinero(self.centavos - otro.centavos)
+        return NotImplemented
+
+    def __mul__(self, cantidad):
+        if isinstance(cantidad, int) and not isinstance(cantidad, bool):
+            return Dinero(self.centavos * cantidad)
+        return NotImplemented
+
+    __rmul__ = __mul__
+
+    # ---------------------------- comparación -------------------------------
+
+    # Contra números se compara el valor exacto en pesos (sin redondear el
+    # otro lado), así Dinero(100) == 1 == Decimal("1.00") y los tres tienen
+    # el mismo hash.
+
+    def __eq__(self, otro):
+        if isinstance(otro, Dinero):
+            return self.centavos == otro.centavos
+        if isinstance(otro, Number):
+            return self.a_decimal() == otro
+        return NotImplemented
+
+    def __lt__(self, otro):
+        if isinstance(otro, Dinero):
+            return self.centavos < otro.centavos
+        if isinstance(otro, Number):
+            return self.a_decimal() < otro
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self.a_decimal())
+
+    def __bool__(self):
+        return self.centavos != 0
+
+    # ---------------------------- conversiones ------------------------------
+
+    def a_decimal(self) -> Decimal:
+        return Decimal(self.centavos).scaleb(-2)
+
+    def __float__(self):
+        return self.centavos / 100
+
+    def __str__(self):
+        # "2800.00": lo entienden floatformat, Decimal() y el JS del carrito
+        signo = "-" if self.centavos < 0 else ""
+        pesos, cent = divmod(abs(self.centavos), 100)
+        return f"{signo}{pesos}.{cent:02d}"
+
+    def __repr__(self):
+        return f"Dinero({self})"
+
+    def ar(self) -> str:
+        """Formato para mostrar: $ 12.345 (sin centavos, separador de miles con punto)."""
+        pesos = abs(self.centavos) // 100
+        if self.centavos < 0 and pesos:
+            pesos = -pesos
+        return "$ " + format(pesos, ",").replace(",", ".")
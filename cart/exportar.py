@@ -0,0 +1,101 @@
+"""
+Exportación de órdenes con sus líneas (CSV o XLSX) para contabilidad.
+
+Las órdenes se leen en bloques con .iterator(chunk_size=...) y las líneas
+vienen de OrdenItem / OrdenArchivadaItem (un prefetch por bloque), así que la
+memoria no crece con la cantidad de órdenes. Las archivadas salen primero:
+conservan su número de orden y son las más viejas. El CSV se escribe fila por fila mientras se envía;
+el XLSX se arma con openpyxl en modo write-only (las filas van a un archivo
+temporal, no a memoria) y se manda en pedazos al terminar.
+"""
+import csv
+import tempfile
+from datetime import datetime, time, timedelta
+
+from django.utils import timezone
+
+from .models import Orden
+
+CHUNK_SIZE = 2000
+BLOQUE_ARCHIVO = 64 * 1024
+
+COLUMNAS = [
+    "orden", "fecha", "estado", "nombre", "telefono", "email", "modalidad", "medio_pago",
+    "total_orden", "clave", "producto", "cantidad", "precio_unitario", "subtotal",
+]
+
+
+def ordenes_filtradas(desde=None, hasta=None, estado=None, modelo=Orden):
+    """
+    Órdenes entre dos fechas locales (inclusive) y, opcionalmente, de un estado.
+    `modelo` permite filtrar igual las archivadas (OrdenArchivada).
+    """
+    qs = modelo.objects.all()
+    if desde:
+        qs = qs.filter(fecha_creacion__gte=timezone.make_aware(datetime.combine(desde, time.min)))
+    if hasta:
+        qs = qs.filter(fecha_creacion__lt=timezone.make_aware(datetime.combine(hasta + timedelta(days=1), time.min)))
+    if estado:
+        qs = qs.filter(estado=estado)
+    return qs
+
+
+def filas(querysets, chunk_size=CHUNK_SIZE):
+    """
+    Una fila por línea de orden (las órdenes sin líneas salen con las columnas
+    de producto vacías), recorriendo los querysets de a uno.
+    """
+    for qs in querysets:
+        qs = (
+            qs.order_by("pk")
+            .defer("items_json", "direccion", "comentario")
+            .prefetch_related("lineas")
+        )
+        for o in qs.iterator(chunk_size=chunk_size):
+            cabecera = [
+                o.pk,
+                timezone.localtime(o.fecha_creacion).strftime("%Y-%m-%d %H:%M"),
+                o.estado,
+                o.nombre,
+                o.telefono,
+                o.email or "",
+                o.modalidad,
+                o.medio_pago,
+                o.total,
+            ]
+            lineas = o.lineas.all()
+            if not lineas:
+                yield cabecera + ["", "", "", "", ""]
+            for l in lineas:
+                yield cabecera + [l.clave, l.nombre, l.cantidad, l.precio_unitario, l.subtotal]
+
+
+class _Eco:
+    """Buffer falso para csv.writer: devuelve lo escrito en vez de guardarlo."""
+
+    def write(self, valor):
+        return valor
+
+
+def stream_csv(querysets, chunk_size=CHUNK_SIZE):
+    writer = csv.writer(_Eco())
+    # BOM para que Excel abra bien los acentos
+    yield "﻿" + writer.writerow(COLUMNAS)
+    for fila in filas(querysets, chunk_size):
+        yield writer.writerow(fila)
+
+
+def stream_xlsx(querysets, chunk_size=CHUNK_SIZE):
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Órdenes")
+    ws.append(COLUMNAS)
+    for fila in filas(querysets, chunk_size):
+        ws.append(fila)
+
+    with tempfile.TemporaryFile() as tmp:
+        wb.save(tmp)
+        tmp.seek(0)
+        while bloque := tmp.read(BLOQUE_ARCHIVO):
+            yield bloque
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+
+from cart.archivo import DIAS_ARCHIVO, LOTE, archivables, archivar_ordenes
+
+
+class Command(BaseCommand):
+    help = (
+        "Mueve las órdenes entregadas o canceladas más viejas que --dias a la tabla de órdenes archivadas "
+        "(siguen visibles, sólo lectura, en el admin)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dias",
+            type=int,
+            default=DIAS_ARCHIVO,
+            help=f"Antigüedad mínima en días (default: {DIAS_ARCHIVO}).",
+        )
+        parser.add_argument(
+            "--lote",
+            type=int,
+            default=LOTE,
+            help=f"Órdenes movidas por transacción (default: {LOTE}).",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Sólo cuenta cuántas órdenes se archivarían.",
+        )
+
+    def handle(self, *args, **options):
+        if options["dry_run"]:
+            n = archivables(options["dias"]).count()
+            self.stdout.write(f"Se archivarían {n} orden(es).")
+            return
+
+        n = archivar_ordenes(dias=options["dias"], lote=max(1, options["lote"]))
+        self.stdout.write(self.style.SUCCESS(f"Órdenes archivadas: {n}."))
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+from cart.ventas import reconstruir_estadisticas, refrescar_ventanas
+
+
+class Command(BaseCommand):
+    help = (
+        "Reconstruye las estadísticas de ventas por producto a partir de las órdenes existentes. "
+        "Con --solo-ventanas sólo recalcula las ventanas de 7/30 días (el ranking ya lo hace solo "
+        "una vez por día)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--solo-ventanas",
+            action="store_true",
+            help="No relee las órdenes: sólo actualiza las ventanas móviles de 7 y 30 días.",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=500,
+            help="Filas insertadas por bloque (default: 500).",
+        )
+
+    def handle(self, *args, **options):
+        if options["solo_ventanas"]:
+            cambiadas = refrescar_ventanas()
+            self.stdout.write(self.style.SUCCESS(f"Ventanas actualizadas: {cambiadas} producto(s)."))
+            return
+
+        res = reconstruir_estadisticas(chunk_size=options["chunk_size"])
+        self.stdout.write(self.style.SUCCESS(
+            f"Estadísticas reconstruidas: {res['ordenes']} orden(es), "
+            f"{res['productos']} producto(s), {res['dias']} registro(s) diarios."
+        ))
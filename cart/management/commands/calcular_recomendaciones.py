@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from cart.recomendaciones import TOP_K, calcular_recomendaciones
+
+
+class Command(BaseCommand):
+    help = "Calcula los productos 'frecuentemente comprados juntos' a partir de las órdenes (vigentes y archivadas)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--top",
+            type=int,
+            default=TOP_K,
+            help=f"Cantidad de relacionados a guardar por producto (default: {TOP_K}).",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=500,
+            help="Cantidad de líneas de orden leídas por bloque (default: 500).",
+        )
+
+    def handle(self, *args, **options):
+        res = calcular_recomendaciones(top_k=options["top"], chunk_size=options["chunk_size"])
+        self.stdout.write(self.style.SUCCESS(
+            f"Recomendaciones calculadas: {res['productos']} producto(s) "
+            f"a partir de {res['ordenes']} orden(es) con más de un producto."
+        ))
@@ -0,0 +1,73 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from cart.dinero import Dinero
+from cart.reportes import DIAS_POR_BLOQUE, actualizar_resumenes, resumen
+
+
+def _fecha(valor):
+    try:
+        return date.fromisoformat(valor)
+    except ValueError:
+        raise CommandError(f"Fecha inválida: {valor} (usar AAAA-MM-DD)")
+
+
+class Command(BaseCommand):
+    help = (
+        "Actualiza los resúmenes diarios de ventas (sólo los días con órdenes nuevas o modificadas) "
+        "y muestra el reporte de un período (por defecto, el mes en curso)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--desde", type=_fecha, help="Primer día del reporte (AAAA-MM-DD).")
+        parser.add_argument("--hasta", type=_fecha, help="Último día del reporte (AAAA-MM-DD, default: hoy).")
+        parser.add_argument(
+            "--reconstruir",
+            action="store_true",
+            help="Recalcula los resúmenes de todos los días desde la primera orden, bloque por bloque.",
+        )
+        parser.add_argument(
+            "--sin-actualizar",
+            action="store_true",
+            help="No recalcula nada: sólo lee los resúmenes guardados.",
+        )
+        parser.add_argument(
+            "--dias-por-bloque",
+            type=int,
+            default=DIAS_POR_BLOQUE,
+            help=f"Días recalculados por pasada (default: {DIAS_POR_BLOQUE}).",
+        )
+
+    def handle(self, *args, **options):
+        if not options["sin_actualizar"]:
+            res = actualizar_resumenes(
+                reconstruir=options["reconstruir"],
+                dias_por_bloque=max(1, options["dias_por_bloque"]),
+            )
+            self.stdout.write(self.style.SUCCESS(
+                f"Resúmenes actualizados: {res['dias']} día(s) en {res['bloques']} bloque(s), {res['filas']} fila(s)."
+            ))
+
+        hasta = options["hasta"] or timezone.localdate()
+        desde = options["desde"] or hasta.replace(day=1)
+        if desde > hasta:
+            raise CommandError("--desde no puede ser posterior a --hasta")
+
+        datos = resumen(desde, hasta)
+        total = datos["total"]
+        self.stdout.write(f"\nVentas del {desde:%d/%m/%Y} al {hasta:%d/%m/%Y}")
+        self.stdout.write(
+            f"  Órdenes: {total['ordenes']}  Unidades: {total['unidades']}  "
+            f"Ingresos: {Dinero.de(total['ingresos']).ar()}  Ticket promedio: {Dinero.de(total['ticket']).ar()}"
+        )
+        for dimension, titulo in (("modalidad", "Por modalidad"), ("medio_pago", "Por medio de pago"), ("marca", "Por marca")):
+            if not datos[dimension]:
+                continue
+            self.stdout.write(f"\n{titulo}:")
+            for row in datos[dimension]:
+                self.stdout.write(
+                    f"  {row['valor'] or '-':<25} {row['ordenes']:>6} orden(es) {row['unidades']:>7} u. "
+                    f"{Dinero.de(row['ingresos']).ar():>14}"
+                )
@@ -0,0 +1,53 @@
+# Generated by Django 5.1.1 on 2026-10-19 13:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cart', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EstadisticaProducto',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('clave', models.CharField(max_length=40, unique=True)),
+                ('origen', models.CharField(choices=[('DB', 'Base de datos'), ('XLS', 'Excel')], max_length=3)),
+                ('producto_id', models.CharField(max_length=30)),
+                ('nombre', models.CharField(blank=True, default='', max_length=200)),
+                ('unidades', models.IntegerField(default=0)),
+                ('ingresos', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('unidades_7d', models.IntegerField(default=0)),
+                ('ingresos_7d', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('unidades_30d', models.IntegerField(default=0)),
+                ('ingresos_30d', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('ultima_venta', models.DateField(blank=True, null=True)),
+                ('actualizado', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Estadística de producto',
+                'verbose_name_plural': 'Estadísticas de productos',
+                'ordering': ['-unidades_30d', '-unidades'],
+                'indexes': [models.Index(fields=['-unidades_30d', '-unidades'], name='cart_estad_ranking_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='VentaDiariaProducto',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('clave', models.CharField(max_length=40)),
+                ('fecha', models.DateField()),
+                ('unidades', models.IntegerField(default=0)),
+                ('ingresos', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+            ],
+            options={
+                'verbose_name': 'Venta diaria por producto',
+                'verbose_name_plural': 'Ventas diarias por producto',
+                'indexes': [models.Index(fields=['fecha', 'clave'], name='cart_ventad_fecha_7c4597_idx')],
+                'unique_together': {('clave', 'fecha')},
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.1.1 on 2026-10-19 13:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cart', '0002_estadisticaproducto_ventadiariaproducto'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Recomendacion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('clave', models.CharField(max_length=40, unique=True)),
+                ('relacionados', models.TextField(blank=True, default='')),
+                ('actualizado', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Recomendación',
+                'verbose_name_plural': 'Recomendaciones',
+            },
+        ),
+    ]
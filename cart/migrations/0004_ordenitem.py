@@ -0,0 +1,34 @@
+# Generated by Django 5.1.1 on 2026-10-19 13:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cart', '0003_recomendacion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrdenItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('clave', models.CharField(max_length=40)),
+                ('origen', models.CharField(choices=[('DB', 'Base de datos'), ('XLS', 'Excel')], max_length=3)),
+                ('producto_id', models.CharField(max_length=30)),
+                ('nombre', models.CharField(blank=True, default='', max_length=200)),
+                ('precio_unitario', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('cantidad', models.PositiveIntegerField(default=0)),
+                ('subtotal', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('orden', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lineas', to='cart.orden')),
+            ],
+            options={
+                'verbose_name': 'Ítem de orden',
+                'verbose_name_plural': 'Ítems de órdenes',
+                'ordering': ['orden_id', 'pk'],
+                'indexes': [models.Index(fields=['clave', 'orden'], name='cart_ordeni_clave_272e99_idx')],
+            },
+        ),
+    ]
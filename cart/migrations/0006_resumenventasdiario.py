@@ -0,0 +1,34 @@
+# Generated by Django 5.1.1 on 2026-10-19 13:39
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cart', '0005_backfill_ordenitem'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenVentasDiario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('dimension', models.CharField(choices=[('total', 'Total'), ('modalidad', 'Modalidad'), ('medio_pago', 'Medio de pago'), ('marca', 'Marca')], max_length=20)),
+                ('valor', models.CharField(blank=True, default='', max_length=100)),
+                ('ordenes', models.IntegerField(default=0)),
+                ('unidades', models.IntegerField(default=0)),
+                ('ingresos', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('calculado', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'Resumen diario de ventas',
+                'verbose_name_plural': 'Resúmenes diarios de ventas',
+                'ordering': ['-fecha', 'dimension', 'valor'],
+                'indexes': [models.Index(fields=['dimension', 'fecha'], name='cart_resume_dimensi_bc7ead_idx')],
+                'unique_together': {('fecha', 'dimension', 'valor')},
+            },
+        ),
+    ]
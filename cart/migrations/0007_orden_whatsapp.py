@@ -0,0 +1,23 @@
+# Generated by Django 5.1.1 on 2026-10-19 13:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cart', '0006_resumenventasdiario'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orden',
+            name='whatsapp_mensaje',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.AddField(
+            model_name='orden',
+            name='whatsapp_url',
+            field=models.TextField(blank=True, default=''),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.1.1 on 2026-10-19 13:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cart', '0007_orden_whatsapp'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrdenArchivada',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('nombre', models.CharField(max_length=100)),
+                ('telefono', models.CharField(max_length=20)),
+                ('email', models.EmailField(blank=True, max_length=254, null=True)),
+                ('modalidad', models.CharField(choices=[('retiro', 'Retiro en punto de entrega'), ('envio', 'Envío a domicilio')], default='retiro', max_length=10)),
+                ('direccion', models.TextField(blank=True, null=True)),
+                ('medio_pago', models.CharField(choices=[('mp', 'Mercado Pago'), ('efectivo', 'Efectivo'), ('transferencia', 'Transferencia')], default='mp', max_length=20)),
+                ('comentario', models.TextField(blank=True, null=True)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('fecha_creacion', models.DateTimeField()),
+                ('actualizado', models.DateTimeField()),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('confirmada', 'Confirmada'), ('entregada', 'Entregada'), ('cancelada', 'Cancelada')], max_length=20)),
+                ('items_json', models.TextField(default='[]')),
+                ('whatsapp_mensaje', models.TextField(blank=True, default='')),
+                ('whatsapp_url', models.TextField(blank=True, default='')),
+                ('archivada', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Orden archivada',
+                'verbose_name_plural': 'Órdenes archivadas',
+                'ordering': ['-fecha_creacion'],
+            },
+        ),
+    ]
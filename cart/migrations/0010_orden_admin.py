@@ -0,0 +1,31 @@
+# Generated by Django 5.1.1 on 2026-10-19 13:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cart', '0009_ordenarchivada'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orden',
+            name='resumen_items',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='orden',
+            name='telefono_digitos',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='orden',
+            index=models.Index(fields=['-fecha_creacion'], name='cart_orden_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='orden',
+            index=models.Index(fields=['estado', '-fecha_creacion'], name='cart_orden_estado_fecha_idx'),
+        ),
+    ]
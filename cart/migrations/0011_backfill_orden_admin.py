@@ -0,0 +1,90 @@
+"""
+Completa resumen_items y telefono_digitos de las órdenes existentes, en bloques.
+"""
+import json
+import re
+from decimal import Decimal
+
+from django.db import migrations
+
+BLOQUE = 500
+
+
+def _decimal(val):
+    try:
+        return Decimal(str(val))
+    except Exception:
+        return Decimal('0')
+
+
+def lineas_de_orden(items_json):
+    """
+    Copia congelada de cart.ventas.lineas_de_orden (tal como estaba al
+    escribir esta migración): agrupa los ítems de una orden por producto.
+    """
+    try:
+        items = json.loads(items_json or '[]')
+    except (TypeError, ValueError):
+        return []
+
+    lineas = {}
+    for it in items:
+        if not isinstance(it, dict) or it.get('id') in (None, ''):
+            continue
+        origen = 'DB' if (it.get('is_db') or str(it.get('origin', '')).upper() == 'DB') else 'XLS'
+        pid = str(it.get('id'))
+        cantidad = int(it.get('quantity') or 0)
+        if cantidad <= 0:
+            continue
+        if it.get('subtotal') not in (None, ''):
+            ingresos = _decimal(it.get('subtotal'))
+        else:
+            ingresos = _decimal(it.get('price', 0)) * cantidad
+
+        clave = f"{origen}:{pid}"
+        linea = lineas.get(clave)
+        if linea is None:
+            linea = lineas[clave] = {
+                'clave': clave,
+                'origen': origen,
+                'producto_id': pid,
+                'nombre': str(it.get('name') or '')[:200],
+                'precio': _decimal(it.get('price', 0)),
+                'unidades': 0,
+                'ingresos': Decimal('0'),
+            }
+        linea['unidades'] += cantidad
+        linea['ingresos'] += ingresos
+    return list(lineas.values())
+
+
+def resumen_de_lineas(lineas, largo=255):
+    """Copia congelada de cart.ventas.resumen_de_lineas: '2x Canela, 1x Mirra'."""
+    texto = ", ".join(f"{l['unidades']}x {l['nombre'] or l['clave']}" for l in lineas)
+    return texto if len(texto) <= largo else texto[:largo - 1] + "…"
+
+
+def backfill(apps, schema_editor):
+    Orden = apps.get_model('cart', 'Orden')
+    qs = Orden.objects.only('pk', 'telefono', 'items_json').order_by('pk')
+    cambiadas = []
+    for orden in qs.iterator(chunk_size=BLOQUE):
+        orden.telefono_digitos = re.sub(r'\D', '', orden.telefono or '')[:20]
+        orden.resumen_items = resumen_de_lineas(lineas_de_orden(orden.items_json))
+        cambiadas.append(orden)
+        if len(cambiadas) >= BLOQUE:
+            Orden.objects.bulk_update(cambiadas, ['telefono_digitos', 'resumen_items'])
+            cambiadas = []
+    if cambiadas:
+        Orden.objects.bulk_update(cambiadas, ['telefono_digitos', 'resumen_items'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cart', '0010_orden_admin'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,101 @@
+"""
+Llena OrdenArchivadaItem con las órdenes que ya estaban archivadas (sus
+OrdenItem se borraron al archivarlas), a partir de su items_json.
+"""
+import json
+from decimal import Decimal
+
+from django.db import migrations
+
+BLOQUE = 500
+
+
+def _decimal(val):
+    try:
+        return Decimal(str(val))
+    except Exception:
+        return Decimal('0')
+
+
+def lineas_de_orden(items_json):
+    """
+    Copia congelada de cart.ventas.lineas_de_orden (tal como estaba al
+    escribir esta migración): agrupa los ítems de una orden por producto.
+    """
+    try:
+        items = json.loads(items_json or '[]')
+    except (TypeError, ValueError):
+        return []
+
+    lineas = {}
+    for it in items:
+        if not isinstance(it, dict) or it.get('id') in (None, ''):
+            continue
+        origen = 'DB' if (it.get('is_db') or str(it.get('origin', '')).upper() == 'DB') else 'XLS'
+        pid = str(it.get('id'))
+        cantidad = int(it.get('quantity') or 0)
+        if cantidad <= 0:
+            continue
+        if it.get('subtotal') not in (None, ''):
+            ingresos = _decimal(it.get('subtotal'))
+        else:
+            ingresos = _decimal(it.get('price', 0)) * cantidad
+
+        clave = f"{origen}:{pid}"
+        linea = lineas.get(clave)
+        if linea is None:
+            linea = lineas[clave] = {
+                'clave': clave,
+                'origen': origen,
+                'producto_id': pid,
+                'nombre': str(it.get('name') or '')[:200],
+                'precio': _decimal(it.get('price', 0)),
+                'unidades': 0,
+                'ingresos': Decimal('0'),
+            }
+        linea['unidades'] += cantidad
+        linea['ingresos'] += ingresos
+    return list(lineas.values())
+
+
+def backfill(apps, schema_editor):
+    OrdenArchivada = apps.get_model('cart', 'OrdenArchivada')
+    OrdenArchivadaItem = apps.get_model('cart', 'OrdenArchivadaItem')
+
+    con_lineas = set(OrdenArchivadaItem.objects.values_list('orden_id', flat=True).distinct())
+    qs = OrdenArchivada.objects.only('pk', 'items_json').order_by('pk')
+    nuevas = []
+    for orden in qs.iterator(chunk_size=BLOQUE):
+        if orden.pk in con_lineas:
+            continue
+        for linea in lineas_de_orden(orden.items_json):
+            nuevas.append(OrdenArchivadaItem(
+                orden_id=orden.pk,
+                clave=linea['clave'],
+                origen=linea['origen'],
+                producto_id=linea['producto_id'],
+                nombre=linea['nombre'],
+                precio_unitario=linea['precio'],
+                cantidad=linea['unidades'],
+                subtotal=linea['ingresos'],
+            ))
+        if len(nuevas) >= BLOQUE:
+            OrdenArchivadaItem.objects.bulk_create(nuevas)
+            nuevas = []
+    if nuevas:
+        OrdenArchivadaItem.objects.bulk_create(nuevas)
+
+
+def vaciar(apps, schema_editor):
+    apps.get_model('cart', 'OrdenArchivadaItem').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cart', '0012_ordenarchivadaitem'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, vaciar),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.1.1 on 2026-10-19 14:01
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cart', '0013_backfill_ordenarchivadaitem'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DiaResumenPendiente',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField(unique=True)),
+                ('marcado', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'Día de resumen pendiente',
+                'verbose_name_plural': 'Días de resumen pendientes',
+            },
+        ),
+    ]
@@ -1,7 +1,16 @@
+import re
+
 from django.db import models
 from django.utils import timezone
 from decimal import Decimal
 
+from .dinero import Dinero
+
+ORIGEN_CHOICES = [
+    ('DB', 'Base de datos'),
+    ('XLS', 'Excel'),
+]
+
 
 class Orden(models.Model):
     """
@@ -51,11 +60,308 @@ class Orden(models.Model):
     
     # JSON con items (simple pero funciona)
     items_json = models.TextField(default='[]')
+
+    # Mensaje y link de WhatsApp, armados una sola vez al confirmar la compra
+    whatsapp_mensaje = models.TextField(blank=True, default='')
+    whatsapp_url = models.TextField(blank=True, default='')
+
+    # Para el admin: "2x Canela, 1x Mirra" y el teléfono sólo con dígitos (búsqueda indexada)
+    resumen_items = models.CharField(max_length=255, blank=True, default='')
+    telefono_digitos = models.CharField(max_length=20, blank=True, default='', db_index=True)
     
     class Meta:
         ordering = ['-fecha_creacion']
+        indexes = [
+            models.Index(fields=['-fecha_creacion'], name='cart_orden_fecha_idx'),
+            models.Index(fields=['estado', '-fecha_creacion'], name='cart_orden_estado_fecha_idx'),
+        ]
         verbose_name = "Orden"
         verbose_name_plural = "Órdenes"
     
     def __str__(self):
-        return f"Orden #{self.id} - {self.nombre} - ${self.total}"
\ No newline at end of file
+        return f"Orden #{self.id} - {self.nombre} - ${self.total}"
+
+    @property
+    def total_dinero(self):
+        """El total como Dinero (centavos enteros), para cuentas y mensajes."""
+        return Dinero.de(self.total)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Recordamos el estado con el que se leyó para detectar cambios en save()
+        instance._estado_cargado = instance.__dict__.get('estado')
+        return instance
+
+    def save(self, *args, **kwargs):
+        """Guarda la orden y mantiene al día las estadísticas de ventas."""
+        from .ventas import actualizar_estadisticas, lineas_de_orden, resumen_de_lineas
+
+        es_nueva = self._state.adding
+        estado_anterior = None if es_nueva else getattr(self, '_estado_cargado', None)
+        self.telefono_digitos = re.sub(r'\D', '', self.telefono or '')[:20]
+        if es_nueva:
+            lineas = lineas_de_orden(self.items_json)
+            self.resumen_items = resumen_de_lineas(lineas)
+        if kwargs.get('update_fields') is not None and 'telefono' in kwargs['update_fields']:
+            kwargs['update_fields'] = {*kwargs['update_fields'], 'telefono_digitos'}
+        super().save(*args, **kwargs)
+        if es_nueva:
+            self.crear_lineas(lineas)
+        if es_nueva or estado_anterior != self.estado:
+            actualizar_estadisticas(self, estado_anterior, es_nueva=es_nueva)
+        self._estado_cargado = self.estado
+
+    def crear_lineas(self, lineas=None):
+        """Guarda las líneas de items_json en OrdenItem (un solo bulk_create)."""
+        from .ventas import lineas_de_orden
+
+        if lineas is None:
+            lineas = lineas_de_orden(self.items_json)
+        OrdenItem.objects.bulk_create([
+            OrdenItem(
+                orden=self,
+                clave=linea['clave'],
+                origen=linea['origen'],
+                producto_id=linea['producto_id'],
+                nombre=linea['nombre'],
+                precio_unitario=linea['precio'],
+                cantidad=linea['unidades'],
+                subtotal=linea['ingresos'],
+            )
+            for linea in lineas
+        ])
+
+    def items(self) -> list[dict]:
+        """Líneas de la orden con el formato de los ítems del carrito (para mensajes y templates)."""
+        return [linea.como_item() for linea in self.lineas.all()]
+
+
+class OrdenArchivada(models.Model):
+    """
+    Órdenes entregadas o canceladas viejas, fuera de la tabla Orden para que la
+    lista del admin y las búsquedas sólo recorran las recientes. Conserva el
+    número de orden original, el items_json y las líneas (ver `manage.py archivar_ordenes`).
+    """
+    id = models.IntegerField(primary_key=True)  # mismo número que tenía en Orden
+    nombre = models.CharField(max_length=100)
+    telefono = models.CharField(max_length=20)
+    email = models.EmailField(blank=True, null=True)
+    modalidad = models.CharField(max_length=10, choices=Orden.MODALIDAD_CHOICES, default='retiro')
+    direccion = models.TextField(blank=True, null=True)
+    medio_pago = models.CharField(max_length=20, choices=Orden.MEDIOS_CHOICES, default='mp')
+    comentario = models.TextField(blank=True, null=True)
+    total = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    fecha_creacion = models.DateTimeField()
+    actualizado = models.DateTimeField()
+    estado = models.CharField(max_length=20, choices=Orden.ESTADO_CHOICES)
+    items_json = models.TextField(default='[]')
+    whatsapp_mensaje = models.TextField(blank=True, default='')
+    whatsapp_url = models.TextField(blank=True, default='')
+    archivada = models.DateTimeField(auto_now_add=True)
+
+    # Campos que se copian tal cual desde Orden
+    CAMPOS = [
+        'id', 'nombre', 'telefono', 'email', 'modalidad', 'direccion', 'medio_pago', 'comentario',
+        'total', 'fecha_creacion', 'actualizado', 'estado', 'items_json', 'whatsapp_mensaje', 'whatsapp_url',
+    ]
+
+    class Meta:
+        ordering = ['-fecha_creacion']
+        verbose_name = "Orden archivada"
+        verbose_name_plural = "Órdenes archivadas"
+
+    def __str__(self):
+        return f"Orden #{self.id} - {self.nombre} - ${self.total} (archivada)"
+
+    @property
+    def total_dinero(self):
+        return Dinero.de(self.total)
+
+    def items(self) -> list[dict]:
+        """Ítems desde las líneas archivadas con la orden (OrdenArchivadaItem)."""
+        return [linea.como_item() for linea in self.lineas.all()]
+
+
+class LineaOrden(models.Model):
+    """Campos comunes a las líneas de órdenes vigentes y archivadas."""
+    clave = models.CharField(max_length=40)  # "DB:12" / "XLS:45"
+    origen = models.CharField(max_length=3, choices=ORIGEN_CHOICES)
+    producto_id = models.CharField(max_length=30)
+    nombre = models.CharField(max_length=200, blank=True, default='')
+    precio_unitario = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    cantidad = models.PositiveIntegerField(default=0)
+    subtotal = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    # Campos que se copian tal cual al archivar
+    CAMPOS = ['clave', 'origen', 'producto_id', 'nombre', 'precio_unitario', 'cantidad', 'subtotal']
+
+    class Meta:
+        abstract = True
+
+    def __str__(self):
+        return f"{self.cantidad}x {self.nombre or self.clave}"
+
+    def como_item(self) -> dict:
+        return {
+            'id': self.producto_id,
+            'name': self.nombre or 'Producto',
+            'price': self.precio_unitario,
+            'quantity': self.cantidad,
+            'subtotal': self.subtotal,
+            'origin': self.origen,
+            'is_db': self.origen == 'DB',
+        }
+
+
+class OrdenItem(LineaOrden):
+    """
+    Una línea de una orden: lo mismo que Orden.items_json, pero en una tabla
+    para poder sumar y filtrar con SQL. Se llena al crear la orden.
+    """
+    orden = models.ForeignKey(Orden, on_delete=models.CASCADE, related_name='lineas')
+
+    class Meta:
+        ordering = ['orden_id', 'pk']  # sin JOIN a Orden para ordenar
+        indexes = [models.Index(fields=['clave', 'orden'])]
+        verbose_name = "Ítem de orden"
+        verbose_name_plural = "Ítems de órdenes"
+
+
+class OrdenArchivadaItem(LineaOrden):
+    """
+    Las líneas de una orden archivada: se mueven con ella desde OrdenItem para
+    que backfill_ventas y sales_report --reconstruir sigan contando esas ventas.
+    """
+    orden = models.ForeignKey(OrdenArchivada, on_delete=models.CASCADE, related_name='lineas')
+
+    class Meta:
+        ordering = ['orden_id', 'pk']
+        indexes = [models.Index(fields=['clave', 'orden'])]
+        verbose_name = "Ítem de orden archivada"
+        verbose_name_plural = "Ítems de órdenes archivadas"
+
+
+class VentaDiariaProducto(models.Model):
+    """
+    Unidades e ingresos de un producto en un día (base de las ventanas 7/30 días).
+    """
+    clave = models.CharField(max_length=40)  # "DB:12" / "XLS:45"
+    fecha = models.DateField()
+    unidades = models.IntegerField(default=0)
+    ingresos = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        unique_together = [('clave', 'fecha')]
+        indexes = [models.Index(fields=['fecha', 'clave'])]
+        verbose_name = "Venta diaria por producto"
+        verbose_name_plural = "Ventas diarias por producto"
+
+    def __str__(self):
+        return f"{self.clave} {self.fecha}: {self.unidades}"
+
+
+class EstadisticaProducto(models.Model):
+    """
+    Ranking de ventas por producto. Se actualiza incrementalmente desde Orden.save().
+    """
+    clave = models.CharField(max_length=40, unique=True)
+    origen = models.CharField(max_length=3, choices=ORIGEN_CHOICES)
+    producto_id = models.CharField(max_length=30)
+    nombre = models.CharField(max_length=200, blank=True, default='')
+
+    unidades = models.IntegerField(default=0)
+    ingresos = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    unidades_7d = models.IntegerField(default=0)
+    ingresos_7d = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    unidades_30d = models.IntegerField(default=0)
+    ingresos_30d = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    ultima_venta = models.DateField(blank=True, null=True)
+    actualizado = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-unidades_30d', '-unidades']
+        indexes = [models.Index(fields=['-unidades_30d', '-unidades'], name='cart_estad_ranking_idx')]
+        verbose_name = "Estadística de producto"
+        verbose_name_plural = "Estadísticas de productos"
+
+    def __str__(self):
+        return f"{self.nombre or self.clave} - {self.unidades_30d} u. (30 días)"
+
+
+class Recomendacion(models.Model):
+    """
+    "Comprados juntos": top-K productos relacionados de cada producto.
+    Se calcula offline con `manage.py calcular_recomendaciones`.
+    """
+    clave = models.CharField(max_length=40, unique=True)
+    # Claves relacionadas, de mayor a menor afinidad: "DB:3,XLS:15,DB:8"
+    relacionados = models.TextField(blank=True, default='')
+    actualizado = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Recomendación"
+        verbose_name_plural = "Recomendaciones"
+
+    def __str__(self):
+        return f"{self.clave} -> {self.relacionados}"
+
+    def claves(self) -> list[str]:
+        return [c for c in self.relacionados.split(',') if c]
+
+
+class ResumenVentasDiario(models.Model):
+    """
+    Agregados de ventas por día: una fila para el total y una por cada valor
+    de modalidad, medio de pago y marca. Lo llena `manage.py sales_report`
+    (ver cart/reportes.py) y es lo único que lee el tablero del admin.
+    """
+    DIMENSION_CHOICES = [
+        ('total', 'Total'),
+        ('modalidad', 'Modalidad'),
+        ('medio_pago', 'Medio de pago'),
+        ('marca', 'Marca'),
+    ]
+    fecha = models.DateField()
+    dimension = models.CharField(max_length=20, choices=DIMENSION_CHOICES)
+    valor = models.CharField(max_length=100, blank=True, default='')  # '' en la fila total
+
+    ordenes = models.IntegerField(default=0)
+    unidades = models.IntegerField(default=0)
+    ingresos = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    # Inicio de la corrida que calculó la fila: las órdenes modificadas después se recalculan
+    calculado = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['-fecha', 'dimension', 'valor']
+        unique_together = [('fecha', 'dimension', 'valor')]
+        indexes = [models.Index(fields=['dimension', 'fecha'])]
+        verbose_name = "Resumen diario de ventas"
+        verbose_name_plural = "Resúmenes diarios de ventas"
+
+    def __str__(self):
+        return f"{self.fecha} {self.dimension} {self.valor}: {self.ordenes} orden(es)"
+
+    @property
+    def ticket_promedio(self) -> Decimal:
+        if not self.ordenes:
+            return Decimal('0')
+        return (self.ingresos / self.ordenes).quantize(Decimal('0.01'))
+
+
+class DiaResumenPendiente(models.Model):
+    """
+    Día cuyo resumen hay que recalcular aunque no tenga órdenes modificadas:
+    se borró (o archivó) una orden de ese día. Lo marca la señal post_delete
+    de Orden/OrdenArchivada y lo consume `sales_report`.
+    """
+    fecha = models.DateField(unique=True)
+    marcado = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name = "Día de resumen pendiente"
+        verbose_name_plural = "Días de resumen pendientes"
+
+    def __str__(self):
+        return f"{self.fecha} (pendiente)"
@@ -0,0 +1,94 @@
+"""
+Recomendaciones "frecuentemente comprados juntos".
+
+El cálculo (matriz de co-compras sobre las líneas de las órdenes vigentes y
+archivadas, OrdenItem y OrdenArchivadaItem) es offline:
+`manage.py calcular_recomendaciones`. Las vistas sólo hacen una lectura por
+clave sobre la tabla Recomendacion.
+"""
+import heapq
+from collections import Counter, defaultdict
+from itertools import groupby
+from operator import itemgetter
+
+from django.db import transaction
+
+from .ventas import ESTADOS_SIN_VENTA
+
+TOP_K = 6
+
+
+def _claves_por_orden(modelo_linea, chunk_size):
+    """Claves distintas de cada orden con venta, leyendo sólo (orden_id, clave) de sus líneas."""
+    qs = (
+        modelo_linea.objects
+        .exclude(orden__estado__in=ESTADOS_SIN_VENTA)
+        .order_by('orden_id')
+        .values_list('orden_id', 'clave')
+    )
+    for _, grupo in groupby(qs.iterator(chunk_size=chunk_size), key=itemgetter(0)):
+        yield sorted({clave for _, clave in grupo})
+
+
+def calcular_recomendaciones(top_k=TOP_K, chunk_size=500) -> dict:
+    """
+    Recorre las líneas de las órdenes (vigentes y archivadas) en bloques, arma
+    la matriz de co-compras y guarda los top-K relacionados de cada producto
+    (reemplazando lo anterior).
+    """
+    from .models import OrdenArchivadaItem, OrdenItem, Recomendacion
+
+    co_compras = defaultdict(Counter)
+    ordenes = 0
+
+    for modelo_linea in (OrdenItem, OrdenArchivadaItem):
+        for claves in _claves_por_orden(modelo_linea, chunk_size):
+            if len(claves) < 2:
+                continue
+            ordenes += 1
+            for i, a in enumerate(claves):
+                for b in claves[i + 1:]:
+                    co_compras[a][b] += 1
+                    co_compras[b][a] += 1
+
+    filas = []
+    for clave, vecinos in co_compras.items():
+        # Desempate estable por clave para que el resultado sea reproducible
+        top = heapq.nsmallest(top_k, vecinos.items(), key=lambda kv: (-kv[1], kv[0]))
+        filas.append(Recomendacion(clave=clave, relacionados=",".join(k for k, _ in top)))
+
+    with transaction.atomic():
+        Recomendacion.objects.all().delete()
+        Recomendacion.objects.bulk_create(filas, batch_size=chunk_size)
+
+    return {'ordenes': ordenes, 'productos': len(filas)}
+
+
+def relacionados_de(clave, limite=TOP_K) -> list[str]:
+    """Claves relacionadas a un producto (una lectura por clave)."""
+    from .models import Recomendacion
+
+    fila = Recomendacion.objects.filter(clave=clave).only('relacionados').first()
+    return fila.claves()[:limite] if fila else []
+
+
+def relacionados_para(claves, limite=TOP_K) -> list[str]:
+    """
+    Relacionados para un conjunto de productos (ej. el carrito), en una sola
+    consulta. Se puntúa por posición en cada lista y se excluyen los propios.
+    """
+    from .models import Recomendacion
+
+    propias = set(claves)
+    if not propias:
+        return []
+
+    puntajes = Counter()
+    for fila in Recomendacion.objects.filter(clave__in=propias).only('relacionados'):
+        lista = fila.claves()
+        for pos, clave in enumerate(lista):
+            if clave not in propias:
+                puntajes[clave] += len(lista) - pos
+
+    ordenadas = sorted(puntajes.items(), key=lambda kv: (-kv[1], kv[0]))
+    return [clave for clave, _ in ordenadas[:limite]]
@@ -0,0 +1,216 @@
+"""
+Resúmenes diarios de ventas (ResumenVentasDiario).
+
+"¿Cuánto vendimos este mes?" no debería recorrer todas las órdenes: cada día
+se guarda ya agregado (órdenes, unidades, ingresos) en total y abierto por
+modalidad, medio de pago y marca. `manage.py sales_report` recalcula sólo los
+días que tienen órdenes creadas, modificadas o borradas desde la corrida
+anterior, en bloques de días, y el tablero del admin lee únicamente esta tabla.
+
+Cada bloque se confirma por separado (en SQLite el lock de escritura dura un
+bloque, no la corrida entera). Antes de empezar, los días de la corrida se
+anotan en DiaResumenPendiente y cada bloque borra sólo los suyos: si algo
+falla a mitad, los bloques que faltaban se retoman en la próxima corrida.
+
+Los ingresos del total, la modalidad y el medio de pago son Orden.total; los
+de cada marca, la suma de sus líneas (OrdenItem.subtotal). Las órdenes
+archivadas (OrdenArchivada y sus líneas) se suman igual que las vigentes.
+"""
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, Max, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .exportar import ordenes_filtradas
+from .ventas import ESTADOS_SIN_VENTA
+
+DIAS_POR_BLOQUE = 31
+SIN_MARCA = 'Sin marca'
+
+
+def _marcas(lineas) -> dict:
+    """(origen, producto_id) -> marca, para los productos de la DB y del Excel."""
+    from appcoder.views import _leer_excel
+    from .cart import get_product_model
+
+    marcas = {}
+    Product = get_product_model()
+    db_ids = {int(pid) for origen, pid in lineas if origen == 'DB' and pid.isdigit()}
+    if db_ids and 'marca' in {f.name for f in Product._meta.get_fields()}:
+        for pk, marca in Product.objects.filter(pk__in=db_ids).values_list('pk', 'marca'):
+            marcas[('DB', str(pk))] = marca
+    if any(origen == 'XLS' for origen, _ in lineas):
+        for it in _leer_excel():
+            marcas[('XLS', str(it.idx))] = it.marca
+    return marcas
+
+
+def calcular_dias(desde, hasta, calculado=None) -> int:
+    """
+    Recalcula los resúmenes de los días desde..hasta (fechas locales, inclusive)
+    en una transacción, y da por resueltos los días pendientes de ese rango
+    marcados hasta `calculado`. Devuelve la cantidad de filas escritas.
+    """
+    from .models import (
+        DiaResumenPendiente, Orden, OrdenArchivada, OrdenArchivadaItem, OrdenItem, ResumenVentasDiario,
+    )
+
+    calculado = calculado or timezone.now()
+    filas = defaultdict(lambda: [0, 0, Decimal('0')])  # (fecha, dimension, valor) -> [ordenes, unidades, ingresos]
+    lineas = []
+    # Las órdenes archivadas siguen siendo ventas de su día
+    for modelo, modelo_lineas in ((Orden, OrdenItem), (OrdenArchivada, OrdenArchivadaItem)):
+        ordenes = ordenes_filtradas(desde, hasta, modelo=modelo).exclude(estado__in=ESTADOS_SIN_VENTA)
+
+        # Órdenes e ingresos: una consulta agrupada por día, modalidad y medio de pago
+        por_orden = (
+            ordenes.annotate(dia=TruncDate('fecha_creacion'))
+            .values('dia', 'modalidad', 'medio_pago')
+            .annotate(n=Count('pk'), i=Sum('total'))
+            .order_by()
+        )
+        for row in por_orden:
+            for clave in ((row['dia'], 'total', ''), (row['dia'], 'modalidad', row['modalidad']),
+                          (row['dia'], 'medio_pago', row['medio_pago'])):
+                filas[clave][0] += row['n']
+                filas[clave][2] += row['i'] or Decimal('0')
+
+        # Unidades y marcas: las líneas de esas mismas órdenes
+        lineas.extend(
+            modelo_lineas.objects.filter(orden__in=ordenes)
+            .annotate(dia=TruncDate('orden__fecha_creacion'))
+            .values_list('dia', 'orden_id', 'orden__modalidad', 'orden__medio_pago',
+                         'origen', 'producto_id', 'cantidad', 'subtotal')
+            .iterator(chunk_size=2000)
+        )
+    marcas = _marcas({(l[4], l[5]) for l in lineas})
+    ordenes_por_marca = defaultdict(set)
+    for dia, orden_id, modalidad, medio_pago, origen, pid, cantidad, subtotal in lineas:
+        marca = marcas.get((origen, pid)) or SIN_MARCA
+        for clave in ((dia, 'total', ''), (dia, 'modalidad', modalidad), (dia, 'medio_pago', medio_pago)):
+            filas[clave][1] += cantidad
+        clave = (dia, 'marca', marca[:100])
+        filas[clave][1] += cantidad
+        filas[clave][2] += subtotal
+        ordenes_por_marca[clave].add(orden_id)
+    for clave, ids in ordenes_por_marca.items():
+        filas[clave][0] = len(ids)
+
+    with transaction.atomic():
+        ResumenVentasDiario.objects.filter(fecha__gte=desde, fecha__lte=hasta).delete()
+        ResumenVentasDiario.objects.bulk_create([
+            ResumenVentasDiario(fecha=fecha, dimension=dimension, valor=valor,
+                                ordenes=n, unidades=u, ingresos=i, calculado=calculado)
+            for (fecha, dimension, valor), (n, u, i) in filas.items()
+        ], batch_size=500)
+        # Los marcados después de `calculado` quedan para la próxima corrida
+        DiaResumenPendiente.objects.filter(fecha__gte=desde, fecha__lte=hasta, marcado__lte=calculado).delete()
+    return len(filas)
+
+
+def marcar_dia_pendiente(sender, instance, **kwargs):
+    """post_delete de Orden/OrdenArchivada: el día de esa orden hay que recalcularlo."""
+    from .models import DiaResumenPendiente
+
+    DiaResumenPendiente.objects.bulk_create(
+        [DiaResumenPendiente(fecha=timezone.localdate(instance.fecha_creacion), marcado=timezone.now())],
+        update_conflicts=True, unique_fields=['fecha'], update_fields=['marcado'],
+    )
+
+
+def dias_pendientes(reconstruir=False) -> list:
+    """
+    Días locales con órdenes creadas o modificadas desde la última corrida,
+    más los marcados en DiaResumenPendiente (órdenes borradas o archivadas).
+    Sin resúmenes guardados (o con reconstruir=True), todos los días con
+    órdenes vigentes o archivadas y los que ya tienen resumen.
+    """
+    from .models import DiaResumenPendiente, Orden, OrdenArchivada, ResumenVentasDiario
+
+    ultima = None if reconstruir else ResumenVentasDiario.objects.aggregate(m=Max('calculado'))['m']
+    consultas = [Orden.objects.all()]
+    if ultima is not None:
+        consultas[0] = consultas[0].filter(actualizado__gte=ultima)
+    else:
+        consultas.append(OrdenArchivada.objects.all())
+    dias = {
+        timezone.localdate(f)
+        for qs in consultas
+        for f in qs.order_by().values_list('fecha_creacion', flat=True).iterator(chunk_size=2000)
+    }
+    if ultima is None:
+        # Días con resumen pero ya sin órdenes: se recalculan (y quedan vacíos)
+        dias.update(ResumenVentasDiario.objects.order_by().values_list('fecha', flat=True).distinct())
+    dias.update(DiaResumenPendiente.objects.values_list('fecha', flat=True))
+    return sorted(dias)
+
+
+def actualizar_resumenes(reconstruir=False, dias_por_bloque=DIAS_POR_BLOQUE) -> dict:
+    """
+    Pone al día ResumenVentasDiario. Por defecto sólo los días pendientes;
+    con reconstruir=True recalcula todos los días desde la primera orden.
+    Procesa bloques de hasta `dias_por_bloque` días consecutivos; cada bloque
+    borra y reescribe sólo su rango, en su propia transacción.
+    """
+    from .models import DiaResumenPendiente
+
+    inicio = timezone.now()
+    dias = dias_pendientes(reconstruir)
+    # Anotados antes de empezar: si la corrida se corta, lo que falta sigue pendiente
+    # (los que ya estaban marcados conservan su fecha de marca)
+    DiaResumenPendiente.objects.bulk_create(
+        [DiaResumenPendiente(fecha=dia, marcado=inicio) for dia in dias],
+        ignore_conflicts=True, batch_size=500,
+    )
+
+    bloques = []
+    for dia in dias:
+        if bloques and dia - bloques[-1][0] < timedelta(days=dias_por_bloque):
+            bloques[-1][1] = dia
+        else:
+            bloques.append([dia, dia])
+
+    filas = 0
+    for desde, hasta in bloques:
+        filas += calcular_dias(desde, hasta, calculado=inicio)
+    return {'dias': len(dias), 'bloques': len(bloques), 'filas': filas}
+
+
+def resumen(desde, hasta) -> dict:
+    """
+    Totales de un período leyendo sólo los agregados:
+    {'total': {...}, 'modalidad': [...], 'medio_pago': [...], 'marca': [...], 'dias': [...]}.
+    Cada entrada trae valor, ordenes, unidades, ingresos y ticket (ingresos / órdenes).
+    """
+    from .models import ResumenVentasDiario
+
+    qs = ResumenVentasDiario.objects.filter(fecha__gte=desde, fecha__lte=hasta)
+
+    def _con_ticket(row):
+        row['ingresos'] = row['ingresos'] or Decimal('0')
+        row['ticket'] = (row['ingresos'] / row['ordenes']).quantize(Decimal('0.01')) if row['ordenes'] else Decimal('0')
+        return row
+
+    res = {'total': _con_ticket({'valor': '', 'ordenes': 0, 'unidades': 0, 'ingresos': Decimal('0')})}
+    for dimension, _ in ResumenVentasDiario.DIMENSION_CHOICES[1:]:
+        res[dimension] = []
+    agregados = (
+        qs.values('dimension', 'valor')
+        .annotate(ordenes=Sum('ordenes'), unidades=Sum('unidades'), ingresos=Sum('ingresos'))
+        .order_by('dimension', '-ingresos')
+    )
+    for row in agregados:
+        dimension = row.pop('dimension')
+        if dimension == 'total':
+            res['total'] = _con_ticket(row)
+        else:
+            res[dimension].append(_con_ticket(row))
+    res['dias'] = [
+        _con_ticket(row)
+        for row in qs.filter(dimension='total').order_by('fecha').values('fecha', 'ordenes', 'unidades', 'ingresos')
+    ]
+    return res
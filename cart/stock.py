@@ -0,0 +1,61 @@
+"""
+Reserva de stock al confirmar una orden.
+
+Cada producto de la DB se descuenta con un UPDATE condicional
+(stock = stock - n WHERE id = ? AND stock >= n): la base decide, sin leer
+antes el stock ni tomar locks durante el request. Hay que llamarlo dentro
+del mismo transaction.atomic() que crea la Orden; si falta stock de algo,
+StockInsuficiente deshace todo lo descontado.
+
+Los productos del Excel no se descuentan: su stock vive en final.xlsx.
+"""
+from django.db.models import F
+from django.utils import timezone
+
+from .cart import get_product_model, invalidar_productos_carrito
+
+
+class StockInsuficiente(Exception):
+    """Alguna línea de la orden no tiene stock; `mensajes` trae una por producto."""
+
+    def __init__(self, mensajes):
+        super().__init__("; ".join(mensajes))
+        self.mensajes = mensajes
+
+
+def reservar_stock(items) -> None:
+    """
+    Descuenta el stock de los ítems de la DB (formato de Cart.snapshot().items).
+    Lanza StockInsuficiente con un mensaje por cada producto que no alcanzó.
+    """
+    Product = get_product_model()
+    campos = {f.name for f in Product._meta.get_fields()}
+
+    cantidades = {}
+    nombres = {}
+    for it in items:
+        if it.get("is_db") and str(it.get("id", "")).isdigit() and int(it.get("quantity") or 0) > 0:
+            pk = int(it["id"])
+            cantidades[pk] = cantidades.get(pk, 0) + int(it["quantity"])
+            nombres[pk] = it.get("name") or "Producto"
+    if not cantidades:
+        return
+
+    cambios = {"stock": F("stock")}
+    if "actualizado" in campos:
+        # update() no pasa por auto_now: se marca a mano para que el
+        # catálogo en memoria note el cambio de stock
+        cambios["actualizado"] = timezone.now()
+
+    faltantes = []
+    for pk, n in cantidades.items():
+        cambios["stock"] = F("stock") - n
+        if not Product.objects.filter(pk=pk, stock__gte=n).update(**cambios):
+            faltantes.append(f"No hay stock suficiente de {nombres[pk]} para {n} unidad(es).")
+
+    if faltantes:
+        raise StockInsuficiente(faltantes)
+
+    # update() no dispara señales: el stock cacheado para cart_add se borra a mano.
+    # Las páginas pre-renderizadas no se tocan: toman el stock de cart:stock.
+    invalidar_productos_carrito(cantidades)
@@ -0,0 +1,675 @@
+import csv
+import json
+import shutil
+import tempfile
+from datetime import timedelta
+from io import BytesIO, StringIO
+from decimal import Decimal
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.sessions.backends.db import SessionStore
+from django.contrib.sessions.models import Session
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from appcoder.models import Sahumerio
+from Miprimerapaginafsosa.sesiones import SessionStore as SesionSinEscrituras
+from cart.archivo import archivar_ordenes
+from cart.cart import Cart, _clave_producto_carrito, producto_carrito
+from cart.dinero import Dinero
+from cart.models import DiaResumenPendiente, EstadisticaProducto, Orden, OrdenArchivada, OrdenArchivadaItem, OrdenItem, ResumenVentasDiario, VentaDiariaProducto
+from cart.recomendaciones import calcular_recomendaciones, relacionados_de, relacionados_para
+from cart.reportes import actualizar_resumenes, resumen
+from cart.stock import StockInsuficiente, reservar_stock
+from cart.ventas import lineas_de_orden, ventanas_al_dia
+
+
+def _items(*lineas):
+    """Arma un items_json como el que guarda el checkout."""
+    return json.dumps([
+        {
+            "id": str(pid),
+            "name": nombre,
+            "price": precio,
+            "quantity": cantidad,
+            "origin": origen,
+            "is_db": origen == "DB",
+            "subtotal": precio * cantidad,
+        }
+        for origen, pid, nombre, precio, cantidad in lineas
+    ])
+
+
+class EstadisticasVentasTests(TestCase):
+
+    def crear_orden(self, *lineas, **kwargs):
+        return Orden.objects.create(nombre="Cliente", telefono="1134567890", items_json=_items(*lineas), **kwargs)
+
+    def test_lineas_agrupa_por_producto(self):
+        lineas = lineas_de_orden(_items(("DB", 1, "Canela", 100.0, 2), ("DB", 1, "Canela", 100.0, 1)))
+        self.assertEqual(len(lineas), 1)
+        self.assertEqual(lineas[0]["clave"], "DB:1")
+        self.assertEqual(lineas[0]["unidades"], 3)
+        self.assertEqual(lineas[0]["ingresos"], Decimal("300.00"))
+
+    def test_orden_nueva_suma_ventas(self):
+        self.crear_orden(("DB", 1, "Canela", 100.0, 2), ("XLS", 7, "Lavanda", 50.0, 1))
+        self.crear_orden(("DB", 1, "Canela", 100.0, 1))
+
+        canela = EstadisticaProducto.objects.get(clave="DB:1")
+        self.assertEqual(canela.unidades, 3)
+        self.assertEqual(canela.unidades_7d, 3)
+        self.assertEqual(canela.unidades_30d, 3)
+        self.assertEqual(canela.ingresos, Decimal("300"))
+        self.assertEqual(EstadisticaProducto.objects.get(clave="XLS:7").unidades, 1)
+
+    def test_cancelar_y_reactivar_orden(self):
+        orden = self.crear_orden(("DB", 1, "Canela", 100.0, 2))
+
+        orden = Orden.objects.get(pk=orden.pk)
+        orden.estado = "cancelada"
+        orden.save()
+        self.assertEqual(EstadisticaProducto.objects.get(clave="DB:1").unidades_30d, 0)
+
+        orden.estado = "confirmada"
+        orden.save()
+        self.assertEqual(EstadisticaProducto.objects.get(clave="DB:1").unidades_30d, 2)
+
+    def test_ventanas_bajan_sin_ventas_nuevas(self):
+        self.crear_orden(("DB", 1, "Canela", 100.0, 2))
+        dentro_de_10 = timezone.localdate() + timedelta(days=10)
+
+        self.assertTrue(ventanas_al_dia(hoy=dentro_de_10))
+        canela = EstadisticaProducto.objects.get(clave="DB:1")
+        self.assertEqual((canela.unidades_7d, canela.unidades_30d, canela.unidades), (0, 2, 2))
+        # Una vez por día
+        self.assertFalse(ventanas_al_dia(hoy=dentro_de_10))
+
+    def test_orden_cancelada_no_cuenta(self):
+        self.crear_orden(("DB", 1, "Canela", 100.0, 2), estado="cancelada")
+        self.assertFalse(EstadisticaProducto.objects.exists())
+
+    def test_orden_nueva_crea_lineas(self):
+        orden = self.crear_orden(("DB", 1, "Canela", 100.0, 2), ("DB", 1, "Canela", 100.0, 1), ("XLS", 7, "Lavanda", 49.9, 1))
+
+        lineas = list(orden.lineas.values_list("clave", "cantidad", "precio_unitario", "subtotal"))
+        self.assertEqual(lineas, [
+            ("DB:1", 3, Decimal("100.00"), Decimal("300.00")),
+            ("XLS:7", 1, Decimal("49.90"), Decimal("49.90")),
+        ])
+        self.assertEqual(orden.items()[1]["name"], "Lavanda")
+
+    def test_backfill_reconstruye_igual_que_incremental(self):
+        self.crear_orden(("DB", 1, "Canela", 100.0, 2))
+        self.crear_orden(("DB", 2, "Mirra", 80.0, 5))
+        self.crear_orden(("DB", 2, "Mirra vieja", 80.0, 1), estado="cancelada")
+        campos = ("clave", "nombre", "unidades", "ingresos", "unidades_30d", "ultima_venta")
+        esperado = list(EstadisticaProducto.objects.values_list(*campos))
+        self.assertEqual(OrdenItem.objects.count(), 3)
+
+        EstadisticaProducto.objects.all().delete()
+        VentaDiariaProducto.objects.all().delete()
+        call_command("backfill_ventas", stdout=StringIO())
+
+        self.assertEqual(list(EstadisticaProducto.objects.values_list(*campos)), esperado)
+        self.assertEqual(EstadisticaProducto.objects.first().clave, "DB:2")
+
+
+class RecomendacionesTests(TestCase):
+
+    def crear_orden(self, *lineas):
+        return Orden.objects.create(nombre="Cliente", telefono="1134567890", items_json=_items(*lineas))
+
+    def test_comprados_juntos(self):
+        self.crear_orden(("DB", 1, "Canela", 100.0, 1), ("DB", 2, "Mirra", 80.0, 1), ("XLS", 9, "Lavanda", 50.0, 1))
+        self.crear_orden(("DB", 1, "Canela", 100.0, 1), ("DB", 2, "Mirra", 80.0, 1))
+        self.crear_orden(("DB", 3, "Sándalo", 90.0, 1))
+
+        call_command("calcular_recomendaciones", stdout=StringIO())
+
+        self.assertEqual(relacionados_de("DB:1"), ["DB:2", "XLS:9"])
+        self.assertEqual(relacionados_de("DB:3"), [])
+        self.assertEqual(relacionados_para(["DB:1", "DB:2"]), ["XLS:9"])
+
+    def test_cuenta_las_archivadas(self):
+        for _ in range(2):
+            orden = self.crear_orden(("DB", 1, "Canela", 100.0, 1), ("DB", 3, "Sándalo", 90.0, 1))
+            Orden.objects.filter(pk=orden.pk).update(estado="entregada", fecha_creacion=timezone.now() - timedelta(days=200))
+        self.crear_orden(("DB", 1, "Canela", 100.0, 1), ("DB", 2, "Mirra", 80.0, 1))
+        archivar_ordenes(dias=180)
+
+        self.assertEqual(calcular_recomendaciones()["ordenes"], 3)
+        self.assertEqual(relacionados_de("DB:1"), ["DB:3", "DB:2"])
+
+
+class CarritoPerezosoTests(TestCase):
+
+    def agregar(self, **extra):
+        datos = {"origin": "XLS", "product_id": "7", "name": "Lavanda", "price": "50", "stock": "5", "quantity": "1"}
+        datos.update(extra)
+        return self.client.post(reverse("cart:add"), datos)
+
+    def test_visitante_sin_carrito_no_crea_sesion(self):
+        response = self.client.get(reverse("catalogo"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["cart_len"], 0)
+        self.assertNotIn("sessionid", response.cookies)
+        self.client.get(reverse("cart:summary"))
+        self.assertFalse(Session.objects.exists())
+
+    def test_agregar_crea_sesion_y_vaciar_la_deja_sin_carrito(self):
+        self.agregar()
+        self.assertEqual(Session.objects.count(), 1)
+        self.assertEqual(self.client.session["cart"]["7"], ["X", 1, 5000])
+
+        self.agregar(quantity="0")
+        self.assertNotIn("cart", self.client.session)
+        self.assertNotIn("cart_version", self.client.session)
+
+    def test_vaciar_o_quitar_sin_carrito_no_crea_sesion(self):
+        self.client.post(reverse("cart:clear"))
+        self.client.post(reverse("cart:remove"), {"product_id": "7"}, HTTP_X_REQUESTED_WITH="XMLHttpRequest")
+        self.assertFalse(Session.objects.exists())
+
+    def test_sesion_sin_cambios_no_se_reescribe(self):
+        self.agregar()
+        vence = timezone.now() + timedelta(days=10)
+        Session.objects.update(expire_date=vence)
+        fila = Session.objects.get()
+
+        self.client.get(reverse("cart:summary"))
+        self.assertEqual(Session.objects.get().expire_date, vence)
+        self.assertEqual(Session.objects.get().session_data, fila.session_data)
+
+        # Cerca de vencer: se renueva aunque los datos sean los mismos
+        Session.objects.update(expire_date=timezone.now() + timedelta(days=1))
+        self.client.get(reverse("cart:summary"))
+        self.assertGreater(Session.objects.get().expire_date, timezone.now() + timedelta(days=13))
+
+        self.agregar()
+        self.assertNotEqual(Session.objects.get().session_data, fila.session_data)
+
+    def test_carrito_viejo_se_migra_y_se_rearma_desde_la_db(self):
+        sahumerio = Sahumerio.objects.create(marca="Satya", nombre="Nag Champa", precio=1500, stock=3)
+        pid = str(sahumerio.pk)
+        session = self.client.session
+        session["cart"] = {pid: {
+            "id": pid, "name": "Nombre viejo", "price": 1400.0, "quantity": 2,
+            "img": None, "image_url": None, "origin": "DB", "is_db": True,
+        }}
+        session.save()
+
+        data = self.client.get(reverse("cart:summary")).json()
+        self.assertEqual(data["items"][0]["name"], "Satya - Nag Champa")
+        self.assertEqual(data["total_price"], "2800.00")  # se respeta el precio con que se agregó
+        self.assertEqual(self.client.session["cart"], {pid: ["D", 2, 140000]})
+
+    def test_snapshot_por_request_se_invalida_al_modificar(self):
+        request = RequestFactory().get("/")
+        request.session = SessionStore()
+        cart = Cart(request)
+        self.assertIs(cart.snapshot(), Cart(request).snapshot())
+
+        cart.add_payload(product_id="7", name="Lavanda", price="50", quantity=2)
+        snap = Cart(request).snapshot()
+        self.assertEqual((snap.count, snap.total), (2, Dinero(10000)))
+        self.assertEqual(cart.cantidad("7"), 2)
+        self.assertIs(Cart(request).snapshot(), snap)
+
+
+class CartBatchTests(TestCase):
+
+    def setUp(self):
+        self.canela = Sahumerio.objects.create(marca="Satya", nombre="Canela", precio=100, stock=3)
+        self.mirra = Sahumerio.objects.create(marca="Satya", nombre="Mirra", precio=80, stock=1)
+
+    def batch(self, *ops):
+        return self.client.post(reverse("cart:batch"), json.dumps({"ops": list(ops)}), content_type="application/json")
+
+    def test_aplica_todas_las_operaciones_juntas(self):
+        response = self.batch(
+            {"op": "set", "origin": "DB", "product_id": self.canela.pk, "quantity": 2},
+            {"op": "add", "origin": "DB", "product_id": self.mirra.pk, "quantity": 1},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["cart_total"], 3)
+        self.assertEqual(response.json()["cart_total_price"], "280.00")
+
+        response = self.batch(
+            {"op": "add", "product_id": self.canela.pk, "quantity": 1},
+            {"op": "remove", "product_id": self.mirra.pk},
+        )
+        self.assertEqual(response.json()["items"], {str(self.canela.pk): {"quantity": 3, "subtotal": "300.00"}})
+
+    def test_sin_stock_no_cambia_nada(self):
+        self.batch({"op": "set", "origin": "DB", "product_id": self.canela.pk, "quantity": 1})
+
+        response = self.batch(
+            {"op": "set", "origin": "DB", "product_id": self.canela.pk, "quantity": 2},
+            {"op": "set", "origin": "DB", "product_id": self.mirra.pk, "quantity": 5},
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["errors"][0]["stock_disponible"], 1)
+        self.assertEqual(self.client.session["cart"], {str(self.canela.pk): ["D", 1, 10000]})
+        # Devuelve las cantidades guardadas para que la página vuelva atrás
+        self.assertEqual(response.json()["items"], {str(self.canela.pk): {"quantity": 1, "subtotal": "100.00"}})
+
+    def test_rechaza_inactivos_como_cart_add(self):
+        self.mirra.activo = False
+        self.mirra.save()
+
+        response = self.batch({"op": "set", "origin": "DB", "product_id": self.mirra.pk, "quantity": 1})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["errors"][0]["message"], "El producto ya no existe.")
+        response = self.client.post(reverse("cart:add"), {"origin": "DB", "product_id": self.mirra.pk, "quantity": "1"})
+        self.assertEqual(response.status_code, 404)
+        self.assertNotIn("cart", self.client.session)
+
+    def test_pagina_del_carrito_se_actualiza_sin_recargar(self):
+        response = self.client.post(
+            reverse("cart:batch"),
+            json.dumps({"ops": [{"op": "set", "origin": "DB", "product_id": self.canela.pk, "quantity": 2}]}),
+            content_type="application/json", HTTP_X_CART_FRAGMENT="1",
+        )
+        self.assertEqual(response.json()["summary"]["total_items"], 2)
+        self.assertIn("Canela", response.json()["mini_cart"])
+
+        detalle = self.client.get(reverse("cart:detail"))
+        self.assertContains(detalle, "cart-item-subtotal")
+        self.assertNotContains(detalle, "location.reload")
+
+
+class CheckoutTests(TestCase):
+
+    datos = {"nombre": "Cliente", "telefono": "1134567890", "modalidad": "retiro", "medio_pago": "mp"}
+
+    def setUp(self):
+        self.canela = Sahumerio.objects.create(marca="Satya", nombre="Canela", precio=100, stock=3)
+        self.client.post(
+            reverse("cart:batch"),
+            json.dumps({"ops": [{"op": "set", "origin": "DB", "product_id": self.canela.pk, "quantity": 2}]}),
+            content_type="application/json",
+        )
+
+    def test_concilia_precio_y_stock_antes_de_crear_la_orden(self):
+        Sahumerio.objects.filter(pk=self.canela.pk).update(precio=120, stock=1)
+
+        response = self.client.post(reverse("cart:checkout_form"), self.datos)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(Orden.objects.exists())
+        self.assertEqual(self.client.session["cart"], {str(self.canela.pk): ["D", 1, 12000]})
+
+        # Con el carrito ya conciliado, la orden se crea con el precio nuevo
+        self.client.post(reverse("cart:checkout_form"), self.datos)
+        self.assertEqual(Orden.objects.get().total, Decimal("120"))
+        self.canela.refresh_from_db()
+        self.assertEqual(self.canela.stock, 0)
+
+    def test_whatsapp_se_guarda_con_la_orden(self):
+        response = self.client.post(reverse("cart:checkout_form"), self.datos)
+        orden = Orden.objects.get()
+        self.assertEqual(response.url, orden.whatsapp_url)
+        self.assertTrue(orden.whatsapp_url.startswith("https://wa.me/5491168079566?text="))
+        self.assertIn(f"NUEVO PEDIDO #{orden.pk}", orden.whatsapp_mensaje)
+        self.assertIn("*2x* Satya - Canela", orden.whatsapp_mensaje)
+
+        with self.assertNumQueries(3):  # la orden, sus líneas y la sesión (contador del carrito)
+            response = self.client.get(reverse("cart:order_success", args=[orden.pk]))
+        self.assertEqual(response.context["whatsapp_url"], orden.whatsapp_url)
+
+    def test_reserva_es_todo_o_nada(self):
+        mirra = Sahumerio.objects.create(marca="Satya", nombre="Mirra", precio=80, stock=1)
+        items = [
+            {"id": str(self.canela.pk), "name": "Canela", "quantity": 2, "is_db": True},
+            {"id": str(mirra.pk), "name": "Mirra", "quantity": 2, "is_db": True},
+            {"id": "5", "name": "Lavanda", "quantity": 9, "is_db": False},
+        ]
+        with self.assertRaises(StockInsuficiente) as error:
+            with transaction.atomic():
+                reservar_stock(items)
+        self.assertEqual(len(error.exception.mensajes), 1)
+        self.canela.refresh_from_db()
+        self.assertEqual(self.canela.stock, 3)
+
+
+class DineroTests(TestCase):
+
+    def test_centavos_sin_deriva(self):
+        total = sum((Dinero.de(0.1) * 3 for _ in range(10)), Dinero(0))
+        self.assertEqual(total, Dinero(300))
+        self.assertEqual(str(Dinero.de("1234.565")), "1234.57")
+        self.assertEqual(Dinero.de(1234567.89).ar(), "$ 1.234.567")
+        self.assertEqual(Dinero.de("no es precio"), 0)
+        self.assertEqual(Dinero(100), 1)
+        self.assertEqual(hash(Dinero(100)), hash(1))
+        self.assertEqual(hash(Dinero(250)), hash(Decimal("2.5")))
+        self.assertEqual(len({Dinero(100), 1, Decimal("1.00")}), 1)
+
+
+class ExportarOrdenesTests(TestCase):
+
+    def setUp(self):
+        from django.contrib.auth.models import User
+
+        self.admin = User.objects.create_superuser("fsosa", "fsosa@example.com", "clave")
+        self.url = reverse("admin:cart_orden_exportar")
+        Orden.objects.create(nombre="Ana", telefono="1134567890", items_json=_items(("DB", 1, "Canela", 100.0, 2), ("XLS", 7, "Lavanda", 50.0, 1)))
+        Orden.objects.create(nombre="Beto", telefono="1134567890", items_json=_items(("DB", 2, "Mirra", 80.0, 1)), estado="cancelada")
+
+    def test_solo_admin(self):
+        # /admin/ sólo deja pasar a fsosa (OnlyFsosaAdminMiddleware)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+    def test_csv_una_fila_por_linea_con_filtro_de_estado(self):
+        self.client.force_login(self.admin)
+        response = self.client.get(self.url, {"formato": "csv", "estado": "pendiente", "desde": timezone.localdate().isoformat()})
+        self.assertTrue(response.streaming)
+        filas = list(csv.reader(b"".join(response.streaming_content).decode("utf-8-sig").splitlines()))
+        self.assertEqual(filas[0][0], "orden")
+        self.assertEqual([(f[3], f[9], f[11]) for f in filas[1:]], [("Ana", "DB:1", "2"), ("Ana", "XLS:7", "1")])
+
+    def test_xlsx(self):
+        from openpyxl import load_workbook
+
+        self.client.force_login(self.admin)
+        response = self.client.get(self.url, {"formato": "xlsx"})
+        ws = load_workbook(BytesIO(b"".join(response.streaming_content))).active
+        self.assertEqual(ws.max_row, 4)
+        self.assertEqual(self.client.get(self.url, {"desde": "ayer"}).status_code, 400)
+
+    def test_incluye_archivadas(self):
+        vieja = Orden.objects.create(nombre="Caro", telefono="1134567890", estado="entregada",
+                                     items_json=_items(("DB", 3, "Sándalo", 90.0, 4)))
+        Orden.objects.filter(pk=vieja.pk).update(fecha_creacion=timezone.now() - timedelta(days=200))
+        archivar_ordenes(dias=180)
+
+        self.client.force_login(self.admin)
+        response = self.client.get(self.url, {"formato": "csv", "estado": "entregada"})
+        filas = list(csv.reader(b"".join(response.streaming_content).decode("utf-8-sig").splitlines()))
+        self.assertEqual([(f[0], f[3], f[9], f[11]) for f in filas[1:]], [(str(vieja.pk), "Caro", "DB:3", "4")])
+
+
+class ResumenVentasTests(TestCase):
+
+    def setUp(self):
+        self.canela = Sahumerio.objects.create(marca="Satya", nombre="Canela", precio=100, stock=10)
+
+    def crear_orden(self, *lineas, **kwargs):
+        total = sum(precio * cantidad for _, _, _, precio, cantidad in lineas)
+        return Orden.objects.create(nombre="Cliente", telefono="1134567890", total=total, items_json=_items(*lineas), **kwargs)
+
+    def test_resumen_por_dia_y_dimension(self):
+        self.crear_orden(("DB", self.canela.pk, "Canela", 100.0, 2), modalidad="envio", medio_pago="efectivo")
+        self.crear_orden(("DB", self.canela.pk, "Canela", 100.0, 1), ("DB", 999, "Borrado", 50.0, 1))
+        self.assertEqual(actualizar_resumenes()["dias"], 1)
+
+        hoy = timezone.localdate()
+        datos = resumen(hoy, hoy)
+        self.assertEqual((datos["total"]["ordenes"], datos["total"]["unidades"]), (2, 4))
+        self.assertEqual(datos["total"]["ingresos"], Decimal("350"))
+        self.assertEqual(datos["total"]["ticket"], Decimal("175.00"))
+        self.assertEqual({r["valor"]: r["ordenes"] for r in datos["modalidad"]}, {"envio": 1, "retiro": 1})
+        self.assertEqual({r["valor"]: (r["ordenes"], r["unidades"]) for r in datos["marca"]},
+                         {"Satya": (2, 3), "Sin marca": (1, 1)})
+
+    def test_incremental_solo_dias_modificados(self):
+        orden = self.crear_orden(("DB", self.canela.pk, "Canela", 100.0, 2))
+        actualizar_resumenes()
+        self.assertEqual(actualizar_resumenes()["dias"], 0)
+
+        orden = Orden.objects.get(pk=orden.pk)
+        orden.estado = "cancelada"
+        orden.save()
+        self.assertEqual(actualizar_resumenes()["dias"], 1)
+        self.assertFalse(ResumenVentasDiario.objects.exists())
+
+        salida = StringIO()
+        call_command("sales_report", "--sin-actualizar", stdout=salida)
+        self.assertIn("Órdenes: 0", salida.getvalue())
+
+    def test_borrar_o_archivar_marca_el_dia_pendiente(self):
+        hoy = timezone.localdate()
+        orden = self.crear_orden(("DB", self.canela.pk, "Canela", 100.0, 2))
+        otra = self.crear_orden(("DB", self.canela.pk, "Canela", 100.0, 1), estado="entregada")
+        actualizar_resumenes()
+
+        orden.delete()
+        self.assertEqual(actualizar_resumenes()["dias"], 1)
+        self.assertEqual(resumen(hoy, hoy)["total"]["unidades"], 1)
+        self.assertFalse(DiaResumenPendiente.objects.exists())
+
+        archivar_ordenes(dias=-1)
+        self.assertTrue(OrdenArchivada.objects.filter(pk=otra.pk).exists())
+        self.assertEqual(actualizar_resumenes()["dias"], 1)
+        self.assertEqual(resumen(hoy, hoy)["total"]["unidades"], 1)
+
+    def test_falla_a_mitad_retoma_los_bloques_que_faltan(self):
+        vieja = self.crear_orden(("DB", self.canela.pk, "Canela", 100.0, 2))
+        Orden.objects.filter(pk=vieja.pk).update(fecha_creacion=timezone.now() - timedelta(days=60))
+        self.crear_orden(("DB", self.canela.pk, "Canela", 100.0, 3))
+        actualizar_resumenes()
+        hoy, dia_viejo = timezone.localdate(), timezone.localdate(timezone.now() - timedelta(days=60))
+
+        from cart import reportes
+
+        original = reportes.calcular_dias
+        llamadas = []
+
+        def falla_en_el_segundo(desde, hasta, calculado=None):
+            llamadas.append(desde)
+            if len(llamadas) == 2:
+                raise RuntimeError("falla")
+            return original(desde, hasta, calculado)
+
+        Orden.objects.filter(pk=vieja.pk).update(estado="cancelada")
+        with mock.patch("cart.reportes.calcular_dias", side_effect=falla_en_el_segundo):
+            with self.assertRaises(RuntimeError):
+                actualizar_resumenes(reconstruir=True)
+
+        # El primer bloque quedó confirmado; el segundo conserva su resumen y sigue pendiente
+        self.assertEqual(resumen(dia_viejo, dia_viejo)["total"]["unidades"], 0)
+        self.assertEqual(resumen(hoy, hoy)["total"]["unidades"], 3)
+        self.assertEqual(list(DiaResumenPendiente.objects.values_list("fecha", flat=True)), [hoy])
+
+        self.assertEqual(actualizar_resumenes()["dias"], 1)
+        self.assertFalse(DiaResumenPendiente.objects.exists())
+
+
+class ArchivoOrdenesTests(TestCase):
+
+    def crear_orden(self, estado, dias):
+        orden = Orden.objects.create(nombre="Cliente", telefono="1134567890", estado=estado,
+                                     items_json=_items(("DB", 1, "Canela", 100.0, 2)))
+        Orden.objects.filter(pk=orden.pk).update(fecha_creacion=timezone.now() - timedelta(days=dias))
+        return orden
+
+    def test_archiva_solo_cerradas_viejas_en_lotes(self):
+        vieja = self.crear_orden("entregada", 200)
+        self.crear_orden("cancelada", 300)
+        self.crear_orden("pendiente", 400)
+        self.crear_orden("entregada", 10)
+        unidades = EstadisticaProducto.objects.get(clave="DB:1").unidades
+
+        call_command("archivar_ordenes", "--dias", "180", "--lote", "1", stdout=StringIO())
+
+        self.assertEqual(Orden.objects.count(), 2)
+        self.assertEqual(OrdenArchivada.objects.count(), 2)
+        self.assertEqual(OrdenItem.objects.count(), 2)
+        self.assertEqual(OrdenArchivadaItem.objects.count(), 2)
+        self.assertEqual(EstadisticaProducto.objects.get(clave="DB:1").unidades, unidades)
+
+        # Las reconstrucciones desde cero siguen contando lo archivado
+        call_command("backfill_ventas", stdout=StringIO())
+        self.assertEqual(EstadisticaProducto.objects.get(clave="DB:1").unidades, unidades)
+        actualizar_resumenes(reconstruir=True)
+        dia = timezone.localdate(OrdenArchivada.objects.get(pk=vieja.pk).fecha_creacion)
+        self.assertEqual(resumen(dia, dia)["total"]["unidades"], 2)
+
+        # La confirmación sigue funcionando con el mismo número de orden
+        response = self.client.get(reverse("cart:order_success", args=[vieja.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["items"][0]["quantity"], 2)
+
+
+class OrdenAdminTests(TestCase):
+
+    def setUp(self):
+        from django.contrib.auth.models import User
+
+        self.client.force_login(User.objects.create_superuser("fsosa", "fsosa@example.com", "clave"))
+        self.ana = Orden.objects.create(nombre="Ana", telefono="11 3456-7890",
+                                        items_json=_items(("DB", 1, "Canela", 100.0, 2), ("XLS", 7, "Lavanda", 50.0, 1)))
+        Orden.objects.create(nombre="Beto", telefono="2214445555", items_json=_items(("DB", 2, "Mirra", 80.0, 1)))
+
+    def test_resumen_y_telefono_normalizado(self):
+        self.assertEqual(self.ana.resumen_items, "2x Canela, 1x Lavanda")
+        self.assertEqual(Orden.objects.get(pk=self.ana.pk).telefono_digitos, "1134567890")
+
+    def test_busqueda_por_telefono_usa_digitos(self):
+        url = reverse("admin:cart_orden_changelist")
+        response = self.client.get(url, {"q": "11 3456"})
+        self.assertEqual([o.nombre for o in response.context["cl"].result_list], ["Ana"])
+        # Final del número o sin la característica
+        for q in ("7890", "3456-7890"):
+            response = self.client.get(url, {"q": q})
+            self.assertEqual([o.nombre for o in response.context["cl"].result_list], ["Ana"])
+        response = self.client.get(url, {"q": "beto"})
+        self.assertEqual([o.nombre for o in response.context["cl"].result_list], ["Beto"])
+        self.assertContains(self.client.get(reverse("admin:cart_orden_change", args=[self.ana.pk])), "<strong>2x</strong> Canela")
+
+
+class CartSummaryETagTests(TestCase):
+
+    def test_304_si_el_carrito_no_cambio(self):
+        url = reverse("cart:summary")
+        self.client.post(reverse("cart:add"), {"origin": "XLS", "product_id": "7", "name": "Lavanda", "price": "50", "stock": "5", "quantity": "1"})
+        response = self.client.get(url)
+        etag = response["ETag"]
+        self.assertEqual(response.json()["total_items"], 1)
+
+        with self.assertNumQueries(1):  # sólo leer la sesión
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        self.client.post(reverse("cart:add"), {"origin": "XLS", "product_id": "7", "name": "Lavanda", "price": "50", "stock": "5", "quantity": "1"})
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(response.json()["total_items"], 2)
+
+        # Vacío: misma versión que sin carrito, sin nada guardado
+        self.client.post(reverse("cart:clear"))
+        self.assertEqual(self.client.get(url)["ETag"], '"carrito-0"')
+
+
+class FragmentoMiniCarritoTests(TestCase):
+
+    ajax = {"HTTP_X_REQUESTED_WITH": "XMLHttpRequest", "HTTP_X_CART_FRAGMENT": "1"}
+
+    def test_add_remove_clear_devuelven_mini_carrito(self):
+        canela = Sahumerio.objects.create(marca="Satya", nombre="Canela", precio=100, stock=3)
+        data = self.client.post(reverse("cart:add"), {"origin": "DB", "product_id": canela.pk, "quantity": "2"}, **self.ajax).json()
+        self.assertEqual(data["summary"]["total_items"], 2)
+        self.assertEqual(data["summary"]["total_price"], "200.00")
+        self.assertIn("Canela", data["mini_cart"])
+        self.assertIn("2 × $ 100.00", data["mini_cart"])
+
+        data = self.client.post(reverse("cart:add_db", args=[canela.pk]), {"quantity": "1"}, **self.ajax).json()
+        self.assertEqual(data["summary"]["total_items"], 3)
+
+        data = self.client.post(reverse("cart:remove"), {"product_id": canela.pk}, **self.ajax).json()
+        self.assertEqual((data["cart_total"], data["summary"]["total_items"]), (0, 0))
+
+        data = self.client.post(reverse("cart:clear"), HTTP_X_REQUESTED_WITH="XMLHttpRequest").json()
+        self.assertTrue(data["success"])
+        self.assertNotIn("mini_cart", data)
+
+
+class ProductoCarritoCacheTests(TestCase):
+
+    def setUp(self):
+        # El cache del carrito vive en disco: cada test usa su propio directorio
+        # (nunca el que comparte la aplicación)
+        carpeta = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, carpeta, ignore_errors=True)
+        ajustes = override_settings(CACHES={
+            **settings.CACHES,
+            "carrito": {**settings.CACHES["carrito"], "LOCATION": carpeta},
+        })
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        self.canela = Sahumerio.objects.create(marca="Satya", nombre="Canela", precio=100, stock=3)
+
+    def _add(self, pk=None):
+        return self.client.post(
+            reverse("cart:add"),
+            {"origin": "DB", "product_id": pk or self.canela.pk, "quantity": "1"},
+            HTTP_X_REQUESTED_WITH="XMLHttpRequest",
+        )
+
+    def test_con_cache_caliente_no_consulta_el_producto(self):
+        self._add()
+        with CaptureQueriesContext(connection) as consultas:
+            response = self._add()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.session["cart"], {str(self.canela.pk): ["D", 2, 10000]})
+        self.assertFalse([q for q in consultas if Sahumerio._meta.db_table in q["sql"]])
+
+    def test_invalidacion_la_ven_los_otros_workers(self):
+        # Otro proceso: otra instancia del backend sobre el mismo directorio
+        otro_worker = caches.create_connection("carrito")
+        clave = _clave_producto_carrito(self.canela.pk)
+        self._add()
+        self.assertEqual(otro_worker.get(clave).stock, 3)
+
+        self.canela.stock = 0
+        self.canela.save()
+        self.assertIsNone(otro_worker.get(clave))
+
+    def test_cambios_y_reservas_invalidan_el_cache(self):
+        self._add()
+        self.canela.stock = 1
+        self.canela.save()
+        self.assertEqual(producto_carrito(self.canela.pk).stock, 1)
+
+        reservar_stock([{"id": str(self.canela.pk), "name": "Canela", "quantity": 1, "is_db": True}])
+        self.assertEqual(producto_carrito(self.canela.pk).stock, 0)
+        self.assertEqual(self._add().status_code, 400)
+
+        pk = self.canela.pk
+        self.canela.delete()
+        self.assertIsNone(producto_carrito(pk))
+        self.assertEqual(self._add(pk).status_code, 404)
+        self.assertIsNone(producto_carrito("abc"))
+
+
+class SesionesTests(TestCase):
+
+    def setUp(self):
+        sesion = SesionSinEscrituras()
+        sesion["cart"] = {"1": ["D", 1, 10000]}
+        sesion.save()
+        self.clave = sesion.session_key
+
+    def test_sesion_sin_leer_no_se_reescribe(self):
+        with CaptureQueriesContext(connection) as consultas:
+            SesionSinEscrituras(self.clave).save()
+        self.assertEqual([q["sql"].split()[0] for q in consultas], ["SELECT"])
+
+    def test_sesion_leida_sin_cambios_no_se_reescribe(self):
+        sesion = SesionSinEscrituras(self.clave)
+        self.assertEqual(sesion["cart"], {"1": ["D", 1, 10000]})
+        with self.assertNumQueries(0):
+            sesion.save()
+
+    def test_sesion_cambiada_se_guarda(self):
+        sesion = SesionSinEscrituras(self.clave)
+        sesion["cart"] = {}
+        sesion.save()
+        self.assertEqual(SesionSinEscrituras(self.clave)["cart"], {})
@@ -9,9 +9,11 @@ urlpatterns = [
     path('add/<int:product_id>/', views.cart_add_db, name='add_db'),
     path('remove/', views.cart_remove, name='remove'),
     path('clear/', views.cart_clear, name='clear'),
+    path('batch/', views.cart_batch, name='batch'),
     path('checkout/', views.cart_checkout, name='checkout'),
     path('checkout/form/', views.cart_checkout_form, name='checkout_form'),
     path('summary/', views.cart_summary, name='summary'),
+    path('stock/', views.stock_productos, name='stock'),
     
     # PASO 1: Nueva ruta para página de confirmación
     path('pedido-confirmado/<int:orden_id>/', views.order_success, name='order_success'),
@@ -0,0 +1,332 @@
+"""
+Estadísticas de ventas por producto.
+
+Las órdenes guardan sus ítems como JSON (Orden.items_json) y, desnormalizados,
+en OrdenItem (una fila por producto). Para no sumar todas las líneas cada vez
+que queremos un ranking, mantenemos:
+
+- VentaDiariaProducto: unidades/ingresos por producto y día.
+- EstadisticaProducto: totales + ventanas de 7 y 30 días (lo que leen las vistas).
+
+Ambas tablas se actualizan al crear una Orden o al cambiar su estado
+(ver Orden.save) y se pueden reconstruir con `manage.py backfill_ventas`.
+Las ventanas de los productos que dejan de venderse se corren solas: la
+primera lectura del ranking de cada día las recalcula (ver ventanas_al_dia).
+"""
+import json
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Max, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+# Estados que NO cuentan como venta
+ESTADOS_SIN_VENTA = {'cancelada'}
+
+CAMPOS_VENTANAS = ['unidades_7d', 'ingresos_7d', 'unidades_30d', 'ingresos_30d']
+
+
+def clave_producto(origen, producto_id) -> str:
+    """Clave única de producto: 'DB:<pk>' o 'XLS:<idx>'."""
+    origen = 'DB' if str(origen or '').upper() == 'DB' else 'XLS'
+    return f"{origen}:{producto_id}"
+
+
+def cuenta_como_venta(estado) -> bool:
+    return estado not in ESTADOS_SIN_VENTA
+
+
+def _to_decimal(val) -> Decimal:
+    try:
+        return Decimal(str(val))
+    except Exception:
+        return Decimal('0')
+
+
+def lineas_de_orden(items_json) -> list[dict]:
+    """
+    Agrupa los ítems de una orden por producto.
+    Devuelve [{clave, origen, producto_id, nombre, precio, unidades, ingresos}, ...]
+    """
+    try:
+        items = json.loads(items_json or '[]')
+    except (TypeError, ValueError):
+        return []
+
+    lineas = {}
+    for it in items:
+        if not isinstance(it, dict) or it.get('id') in (None, ''):
+            continue
+        origen = 'DB' if (it.get('is_db') or str(it.get('origin', '')).upper() == 'DB') else 'XLS'
+        pid = str(it.get('id'))
+        cantidad = int(it.get('quantity') or 0)
+        if cantidad <= 0:
+            continue
+        if it.get('subtotal') not in (None, ''):
+            ingresos = _to_decimal(it.get('subtotal'))
+        else:
+            ingresos = _to_decimal(it.get('price', 0)) * cantidad
+
+        clave = clave_producto(origen, pid)
+        linea = lineas.get(clave)
+        if linea is None:
+            linea = lineas[clave] = {
+                'clave': clave,
+                'origen': origen,
+                'producto_id': pid,
+                'nombre': str(it.get('name') or '')[:200],
+                'precio': _to_decimal(it.get('price', 0)),
+                'unidades': 0,
+                'ingresos': Decimal('0'),
+            }
+        linea['unidades'] += cantidad
+        linea['ingresos'] += ingresos
+    return list(lineas.values())
+
+
+def resumen_de_lineas(lineas, largo=255) -> str:
+    """Texto corto de una orden para listados: '2x Canela, 1x Mirra'."""
+    texto = ", ".join(f"{l['unidades']}x {l['nombre'] or l['clave']}" for l in lineas)
+    return texto if len(texto) <= largo else texto[:largo - 1] + "…"
+
+
+# =========================
+# Actualización incremental
+# =========================
+
+def actualizar_estadisticas(orden, estado_anterior, es_nueva=False):
+    """
+    Aplica el delta de una orden sobre las estadísticas.
+    - Orden nueva que cuenta como venta -> suma.
+    - Cambio de estado que entra/sale de "cancelada" -> suma/resta.
+    """
+    if not es_nueva and estado_anterior is None:
+        # No sabemos de qué estado venía: no tocamos nada
+        return
+
+    antes = False if es_nueva else cuenta_como_venta(estado_anterior)
+    ahora = cuenta_como_venta(orden.estado)
+    if antes == ahora:
+        return
+    signo = 1 if ahora else -1
+
+    lineas = lineas_de_orden(orden.items_json)
+    if not lineas:
+        return
+
+    fecha = timezone.localdate(orden.fecha_creacion) if orden.fecha_creacion else timezone.localdate()
+
+    from .models import EstadisticaProducto, VentaDiariaProducto
+
+    with transaction.atomic():
+        for linea in lineas:
+            unidades = signo * linea['unidades']
+            ingresos = signo * linea['ingresos']
+
+            actualizadas = VentaDiariaProducto.objects.filter(clave=linea['clave'], fecha=fecha).update(
+                unidades=F('unidades') + unidades,
+                ingresos=F('ingresos') + ingresos,
+            )
+            if not actualizadas:
+                VentaDiariaProducto.objects.create(
+                    clave=linea['clave'], fecha=fecha, unidades=unidades, ingresos=ingresos
+                )
+
+            stat, _ = EstadisticaProducto.objects.get_or_create(
+                clave=linea['clave'],
+                defaults={
+                    'origen': linea['origen'],
+                    'producto_id': linea['producto_id'],
+                    'nombre': linea['nombre'],
+                },
+            )
+            cambios = {
+                'unidades': F('unidades') + unidades,
+                'ingresos': F('ingresos') + ingresos,
+            }
+            if signo > 0:
+                if linea['nombre']:
+                    cambios['nombre'] = linea['nombre']
+                if stat.ultima_venta is None or stat.ultima_venta < fecha:
+                    cambios['ultima_venta'] = fecha
+            EstadisticaProducto.objects.filter(pk=stat.pk).update(**cambios)
+
+        refrescar_ventanas([l['clave'] for l in lineas])
+
+
+def refrescar_ventanas(claves=None, hoy=None) -> int:
+    """
+    Recalcula las ventanas de 7 y 30 días desde VentaDiariaProducto.
+    Con claves=None recalcula todos los productos (útil una vez por día).
+    Devuelve la cantidad de filas modificadas.
+    """
+    from .models import EstadisticaProducto, VentaDiariaProducto
+
+    hoy = hoy or timezone.localdate()
+    desde_7 = hoy - timedelta(days=6)
+    desde_30 = hoy - timedelta(days=29)
+
+    diarias = VentaDiariaProducto.objects.filter(fecha__gte=desde_30, fecha__lte=hoy)
+    stats = EstadisticaProducto.objects.all()
+    if claves is not None:
+        diarias = diarias.filter(clave__in=claves)
+        stats = stats.filter(clave__in=claves)
+
+    agregados = {
+        row['clave']: row
+        for row in diarias.values('clave').annotate(
+            u7=Sum('unidades', filter=Q(fecha__gte=desde_7)),
+            i7=Sum('ingresos', filter=Q(fecha__gte=desde_7)),
+            u30=Sum('unidades'),
+            i30=Sum('ingresos'),
+        )
+    }
+
+    cambiadas = []
+    for st in stats.only('pk', 'clave', *CAMPOS_VENTANAS):
+        row = agregados.get(st.clave, {})
+        nuevos = (
+            row.get('u7') or 0,
+            row.get('i7') or Decimal('0'),
+            row.get('u30') or 0,
+            row.get('i30') or Decimal('0'),
+        )
+        actuales = tuple(getattr(st, campo) for campo in CAMPOS_VENTANAS)
+        if nuevos != actuales:
+            for campo, valor in zip(CAMPOS_VENTANAS, nuevos):
+                setattr(st, campo, valor)
+            cambiadas.append(st)
+
+    if cambiadas:
+        EstadisticaProducto.objects.bulk_update(cambiadas, CAMPOS_VENTANAS, batch_size=500)
+    return len(cambiadas)
+
+
+def ventanas_al_dia(hoy=None) -> bool:
+    """
+    Recalcula las ventanas de todos los productos una vez por día y por
+    proceso (la primera vez que se lee el ranking ese día), así bajan también
+    las de los productos que ya no tienen ventas nuevas.
+    Devuelve True si hubo que recalcular.
+    """
+    hoy = hoy or timezone.localdate()
+    if not cache.add(f"ventas:ventanas:{hoy.isoformat()}", True, timeout=2 * 24 * 3600):
+        return False
+    refrescar_ventanas(hoy=hoy)
+    return True
+
+
+# =========================
+# Reconstrucción completa
+# =========================
+
+def _agregar_lineas(lineas, diarias, totales):
+    """
+    Suma un queryset de líneas (OrdenItem u OrdenArchivadaItem) sobre
+    `diarias` ((clave, día) -> [unidades, ingresos]) y `totales` (clave -> dict).
+    """
+    dia = TruncDate('orden__fecha_creacion')
+    for row in lineas.annotate(dia=dia).values('clave', 'dia').annotate(u=Sum('cantidad'), i=Sum('subtotal')).order_by():
+        acumulado = diarias.setdefault((row['clave'], row['dia']), [0, Decimal('0')])
+        acumulado[0] += row['u']
+        acumulado[1] += row['i']
+
+    # El nombre que queda es el de la venta más reciente que lo traía
+    con_nombre = lineas.filter(clave=OuterRef('clave')).exclude(nombre='').order_by('-orden_id')
+    filas = (
+        lineas.values('clave')
+        .annotate(
+            origen=Max('origen'),
+            producto_id=Max('producto_id'),
+            u=Sum('cantidad'),
+            i=Sum('subtotal'),
+            ultima=Max(dia),
+            nombre=Subquery(con_nombre.values('nombre')[:1]),
+            orden_nombre=Subquery(con_nombre.values('orden_id')[:1]),
+        )
+        .order_by()
+    )
+    for row in filas:
+        total = totales.get(row['clave'])
+        if total is None:
+            totales[row['clave']] = row
+            continue
+        total['u'] += row['u']
+        total['i'] += row['i']
+        total['ultima'] = max(total['ultima'], row['ultima'])
+        if row['nombre'] and (total['orden_nombre'] or 0) < row['orden_nombre']:
+            total['nombre'], total['orden_nombre'] = row['nombre'], row['orden_nombre']
+
+
+def reconstruir_estadisticas(chunk_size=500) -> dict:
+    """
+    Borra y vuelve a calcular las estadísticas a partir de todas las órdenes,
+    vigentes y archivadas. Los totales salen de agregados SQL sobre OrdenItem
+    y OrdenArchivadaItem (índice clave+orden): no se decodifica el JSON de
+    ninguna orden.
+    """
+    from .models import EstadisticaProducto, Orden, OrdenArchivada, OrdenArchivadaItem, OrdenItem, VentaDiariaProducto
+
+    diarias = {}
+    totales = {}
+    for modelo in (OrdenItem, OrdenArchivadaItem):
+        _agregar_lineas(modelo.objects.exclude(orden__estado__in=ESTADOS_SIN_VENTA), diarias, totales)
+
+    diarias = [
+        VentaDiariaProducto(clave=clave, fecha=fecha, unidades=u, ingresos=i)
+        for (clave, fecha), (u, i) in diarias.items()
+    ]
+    totales = [
+        EstadisticaProducto(
+            clave=row['clave'],
+            origen=row['origen'],
+            producto_id=row['producto_id'],
+            nombre=row['nombre'] or '',
+            unidades=row['u'],
+            ingresos=row['i'],
+            ultima_venta=row['ultima'],
+        )
+        for row in totales.values()
+    ]
+
+    with transaction.atomic():
+        VentaDiariaProducto.objects.all().delete()
+        EstadisticaProducto.objects.all().delete()
+        VentaDiariaProducto.objects.bulk_create(diarias, batch_size=chunk_size)
+        EstadisticaProducto.objects.bulk_create(totales, batch_size=chunk_size)
+        refrescar_ventanas()
+
+    ordenes = sum(
+        modelo.objects.exclude(estado__in=ESTADOS_SIN_VENTA).count()
+        for modelo in (Orden, OrdenArchivada)
+    )
+    return {'ordenes': ordenes, 'productos': len(totales), 'dias': len(diarias)}
+
+
+# =========================
+# Lectura
+# =========================
+
+def ranking(limite=None, ventana='30d'):
+    """
+    Productos más vendidos (una sola consulta sobre el índice de ranking,
+    con las ventanas puestas al día; ver ventanas_al_dia).
+    """
+    from .models import EstadisticaProducto
+
+    ventanas_al_dia()
+
+    orden = ['-unidades_7d', '-unidades'] if ventana == '7d' else ['-unidades_30d', '-unidades']
+    qs = EstadisticaProducto.objects.filter(unidades__gt=0).order_by(*orden)
+    return qs[:limite] if limite else qs
+
+
+def popularidad() -> dict:
+    """Diccionario clave -> (unidades 30 días, unidades totales) para ordenar catálogos."""
+    return {
+        row[0]: (row[1], row[2])
+        for row in ranking().values_list('clave', 'unidades_30d', 'unidades')
+    }
@@ -1,33 +1,33 @@
 import json
 from decimal import Decimal, InvalidOperation
+from functools import lru_cache
 from urllib.parse import quote
 import re
 
-from django.apps import apps
 from django.conf import settings
 from django.contrib import messages
-from django.http import HttpRequest, HttpResponse, JsonResponse
+from django.db import transaction
+from django.http import Http404, HttpRequest, HttpResponse, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
-from django.views.decorators.http import require_POST
+from django.template.loader import render_to_string
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition, require_GET, require_POST
 from django.views.decorators.csrf import csrf_exempt
 
-from .cart import Cart
+from appcoder.views import _leer_excel, productos_por_clave
+
+from .cart import Cart, precio_excel, producto_carrito, productos_carrito
+from .dinero import Dinero
 from .forms import OrderForm
-from .models import Orden
+from .models import Orden, OrdenArchivada
+from .recomendaciones import relacionados_para
+from .stock import StockInsuficiente, reservar_stock
+from .ventas import clave_producto
 
 # =========================
 # Helpers / utilidades
 # =========================
 
-def get_product_model():
-    """
-    Permite usar Sahumerio (appcoder) o Producto (productos) según exista.
-    """
-    try:
-        return apps.get_model("appcoder", "Sahumerio")
-    except LookupError:
-        return apps.get_model("productos", "Producto")
-
 def _to_int(value, default=1, min_value=None, max_value=None) -> int:
     """
     Convierte a int de forma segura.
@@ -47,12 +47,7 @@ def _money_ar(value) -> str:
     """
     Formateo $ 12.345 (entero + separador de miles con punto).
     """
-    try:
-        d = Decimal(value)
-    except Exception:
-        d = Decimal("0")
-    i = int(d)
-    return "$ " + format(i, ",").replace(",", ".")
+    return Dinero.de(value).ar()
 
 def _parse_price_ar(raw: str) -> Decimal:
     """
@@ -69,17 +64,13 @@ def _parse_price_ar(raw: str) -> Decimal:
     except (InvalidOperation, TypeError):
         return Decimal("0")
 
-def _cart_total(cart: Cart) -> Decimal:
+def _cart_total(cart: Cart) -> Dinero:
+    if isinstance(cart, Cart):
+        return cart.snapshot().total
     try:
-        return Decimal(cart.total)
+        return Dinero.de(cart.total)
     except Exception:
-        try:
-            return Decimal(cart.get_total_price())
-        except Exception:
-            total = Decimal("0")
-            for it in cart:
-                total += Decimal(it.get("subtotal", 0))
-            return total
+        return sum((Dinero.de(it.get("subtotal", 0)) for it in cart), Dinero(0))
 
 def _build_wa_message(cart: Cart, data: dict | None = None) -> str:
     """
@@ -182,6 +173,48 @@ def _build_wa_message(cart: Cart, data: dict | None = None) -> str:
 
     return "\n".join(lines)
 
+def _es_ajax(request: HttpRequest) -> bool:
+    return request.headers.get('X-Requested-With') == 'XMLHttpRequest' or request.content_type == 'application/json'
+
+def _resumen_json(snap) -> dict:
+    """Resumen del carrito para el mini-carrito (lo que devuelve cart_summary)."""
+    return {
+        'total_items': snap.count,
+        'total_price': str(snap.total),
+        'items': [
+            {
+                'name': item.get('name', 'Producto'),
+                'quantity': item.get('quantity', 1),
+                'price': str(item.get('price', 0)),
+                'subtotal': str(item.get('subtotal', 0)),
+                'image_url': item.get('image_url', ''),
+            }
+            for item in snap.items[:5]
+        ],
+    }
+
+def _cantidades_json(snap) -> dict:
+    """Cantidad y subtotal por id (lo que necesita la página del carrito para actualizarse)."""
+    return {
+        it["id"]: {'quantity': it["quantity"], 'subtotal': str(it["subtotal"])}
+        for it in snap.items
+    }
+
+def _cart_json(request: HttpRequest, cart: Cart, data: dict, status: int = 200) -> JsonResponse:
+    """
+    Respuesta AJAX de las vistas que modifican el carrito. Si el pedido trae
+    X-Cart-Fragment: 1 (o fragment=1) suma el mini-carrito ya renderizado y el
+    resumen, armados con el carrito recién modificado: la página no necesita
+    pedir cart_summary después.
+    """
+    data.setdefault('cart_total', len(cart))
+    data.setdefault('cart_total_price', str(_cart_total(cart)))
+    if request.headers.get('X-Cart-Fragment') == '1' or request.POST.get('fragment') == '1':
+        snap = cart.snapshot()
+        data['summary'] = _resumen_json(snap)
+        data['mini_cart'] = render_to_string('cart/_mini_cart.html', {'items': snap.items[:5]})
+    return JsonResponse(data, status=status)
+
 def _redirect_back(request: HttpRequest, fallback_name="cart:detail") -> HttpResponse:
     """
     Intenta volver a la página anterior; si no, al detalle del carrito.
@@ -209,13 +242,47 @@ def format_argentina_whatsapp(phone_raw):
         num = "9" + num
     return f"54{num}"
 
+@lru_cache(maxsize=8)
+def _telefono_tienda(phone_raw: str) -> str:
+    """WHATSAPP_PHONE normalizado (una vez por valor de la setting). Vacío -> ''."""
+    return format_argentina_whatsapp(phone_raw) if phone_raw else ""
+
+def _whatsapp_url(msg: str) -> str:
+    phone = _telefono_tienda((getattr(settings, "WHATSAPP_PHONE", "") or "").strip())
+    return f"https://wa.me/{phone}?text={quote(msg)}" if phone else f"https://wa.me/?text={quote(msg)}"
+
+def _datos_orden(orden: Orden) -> dict:
+    """Datos del cliente de una orden, como los espera _build_wa_message."""
+    return {
+        'orden_id': orden.id,
+        'nombre': orden.nombre,
+        'telefono': orden.telefono,
+        'email': orden.email,
+        'modalidad': orden.modalidad,
+        'direccion': orden.direccion,
+        'medio_pago': orden.medio_pago,
+        'comentario': orden.comentario,
+    }
+
+def _guardar_whatsapp(orden: Orden, items) -> None:
+    """Arma el mensaje y el link de WhatsApp de la orden y los deja guardados en la fila."""
+    orden.whatsapp_mensaje = _build_wa_message(items, _datos_orden(orden))
+    orden.whatsapp_url = _whatsapp_url(orden.whatsapp_mensaje)
+    # update() y no save(): la orden no cambia de estado, no hay estadísticas que tocar
+    Orden.objects.filter(pk=orden.pk).update(
+        whatsapp_mensaje=orden.whatsapp_mensaje,
+        whatsapp_url=orden.whatsapp_url,
+    )
+
 # =========================
 # Vistas
 # =========================
 
 def cart_detail(request: HttpRequest) -> HttpResponse:
     cart = Cart(request)
-    return render(request, "cart/detail.html", {"cart": cart})
+    claves = [clave_producto(it.get("origin"), it.get("id")) for it in cart]
+    relacionados = productos_por_clave(relacionados_para(claves)) if claves else []
+    return render(request, "cart/detail.html", {"cart": cart, "relacionados": relacionados})
 
 @csrf_exempt
 @require_POST
@@ -230,15 +297,17 @@ def cart_add(request: HttpRequest) -> HttpResponse:
     origin = (request.POST.get("origin") or "X").upper()
     replace = str(request.POST.get("replace", "0")) == "1"
     quantity_raw = request.POST.get("quantity", "1")
-    is_ajax = request.headers.get('X-Requested-With') == 'XMLHttpRequest' or request.content_type == 'application/json'
+    is_ajax = _es_ajax(request)
 
     # BUG #4 CORREGIDO: min_value=0 para permitir eliminación
     quantity = _to_int(quantity_raw, default=1, min_value=0)
 
     if origin == "DB":
-        Product = get_product_model()
         product_id = request.POST.get("product_id")
-        product = get_object_or_404(Product, id=product_id)
+        # Datos cacheados por id: sin SELECT en el caso común
+        product = producto_carrito(product_id)
+        if product is None or not product.activo:
+            raise Http404("Producto inexistente")
         
         # ✅ Construir nombre con marca para el mensaje
         marca = getattr(product, 'marca', '').strip()
@@ -249,7 +318,7 @@ def cart_add(request: HttpRequest) -> HttpResponse:
         if quantity <= 0:
             cart.remove(product_id)
             if is_ajax:
-                return JsonResponse({
+                return _cart_json(request, cart, {
                     'success': True,
                     'message': f'Quitaste {product_name} del carrito.',
                     'cart_total': len(cart),
@@ -263,7 +332,7 @@ def cart_add(request: HttpRequest) -> HttpResponse:
         if stock_disponible <= 0:
             error_msg = f"No hay stock disponible de {product_name}."
             if is_ajax:
-                return JsonResponse({
+                return _cart_json(request, cart, {
                     'success': False,
                     'message': error_msg,
                     'cart_total': len(cart),
@@ -273,11 +342,7 @@ def cart_add(request: HttpRequest) -> HttpResponse:
             return _redirect_back(request)
         
         # Calcular cantidad actual en el carrito
-        old_qty = 0
-        for item in cart:
-            if str(item.get("id")) == str(product_id):
-                old_qty = int(item.get("quantity", 0))
-                break
+        old_qty = cart.cantidad(product_id)
         
         # Calcular cantidad total que quedaría en el carrito
         if replace:
@@ -289,7 +354,7 @@ def cart_add(request: HttpRequest) -> HttpResponse:
         if nueva_cantidad_total > stock_disponible:
             error_msg = f"Stock insuficiente. Disponible: {stock_disponible}, solicitado: {nueva_cantidad_total}."
             if is_ajax:
-                return JsonResponse({
+                return _cart_json(request, cart, {
                     'success': False,
                     'message': error_msg,
                     'cart_total': len(cart),
@@ -308,7 +373,7 @@ def cart_add(request: HttpRequest) -> HttpResponse:
                 msg = f"Restaste una unidad de {product_name}."
             else:
                 msg = "Cantidad sin cambios."
-            return JsonResponse({
+            return _cart_json(request, cart, {
                 'success': True,
                 'message': msg,
                 'cart_total': len(cart),
@@ -341,7 +406,7 @@ def cart_add(request: HttpRequest) -> HttpResponse:
     if quantity <= 0:
         cart.remove(product_id)
         if is_ajax:
-            return JsonResponse({
+            return _cart_json(request, cart, {
                 'success': True,
                 'message': f'Quitaste {display_name} del carrito.',
                 'cart_total': len(cart),
@@ -357,7 +422,7 @@ def cart_add(request: HttpRequest) -> HttpResponse:
     if stock_disponible <= 0:
         error_msg = f"No hay stock disponible de {display_name}."
         if is_ajax:
-            return JsonResponse({
+            return _cart_json(request, cart, {
                 'success': False,
                 'message': error_msg,
                 'cart_total': len(cart),
@@ -367,11 +432,7 @@ def cart_add(request: HttpRequest) -> HttpResponse:
         return _redirect_back(request)
     
     # Calcular cantidad actual en el carrito
-    old_qty = 0
-    for item in cart:
-        if str(item.get("id")) == str(product_id):
-            old_qty = int(item.get("quantity", 0))
-            break
+    old_qty = cart.cantidad(product_id)
     
     # Calcular cantidad total que quedaría en el carrito
     if replace:
@@ -383,7 +444,7 @@ def cart_add(request: HttpRequest) -> HttpResponse:
     if nueva_cantidad_total > stock_disponible:
         error_msg = f"Stock insuficiente. Disponible: {stock_disponible}, solicitado: {nueva_cantidad_total}."
         if is_ajax:
-            return JsonResponse({
+            return _cart_json(request, cart, {
                 'success': False,
                 'message': error_msg,
                 'cart_total': len(cart),
@@ -411,7 +472,7 @@ def cart_add(request: HttpRequest) -> HttpResponse:
             msg = f"Restaste una unidad de {display_name}."
         else:
             msg = "Cantidad sin cambios."
-        return JsonResponse({
+        return _cart_json(request, cart, {
             'success': True,
             'message': msg,
             'cart_total': len(cart),
@@ -434,8 +495,9 @@ def cart_add_db(request: HttpRequest, product_id: int) -> HttpResponse:
     Variante específica para agregar desde ruta con pk en la URL.
     """
     cart = Cart(request)
-    Product = get_product_model()
-    product = get_object_or_404(Product, id=product_id)
+    product = producto_carrito(product_id)
+    if product is None or not product.activo:
+        raise Http404("Producto inexistente")
 
     quantity = _to_int(request.POST.get("quantity", "1"), default=1, min_value=1)
     replace = str(request.POST.get("replace", "0")) == "1"
@@ -447,6 +509,8 @@ def cart_add_db(request: HttpRequest, product_id: int) -> HttpResponse:
     nombre = getattr(product, 'nombre', str(product))
     product_name = f"{marca} - {nombre}" if marca else nombre
     
+    if _es_ajax(request):
+        return _cart_json(request, cart, {'success': True, 'message': f"Agregaste {product_name} al carrito."})
     messages.success(request, f"Agregaste {product_name} al carrito.")
     return _redirect_back(request)
 
@@ -460,7 +524,11 @@ def cart_remove(request: HttpRequest) -> HttpResponse:
     product_id = request.POST.get("product_id")
     if product_id is not None:
         cart.remove(product_id)
+        if _es_ajax(request):
+            return _cart_json(request, cart, {'success': True, 'message': "Quitaste un producto del carrito."})
         messages.error(request, "Quitaste un producto del carrito.")
+    elif _es_ajax(request):
+        return _cart_json(request, cart, {'success': False, 'message': "Falta el producto."}, status=400)
     return _redirect_back(request)
 
 @csrf_exempt
@@ -471,18 +539,120 @@ def cart_clear(request: HttpRequest) -> HttpResponse:
     """
     cart = Cart(request)
     cart.clear()
+    if _es_ajax(request):
+        return _cart_json(request, cart, {'success': True, 'message': "Vaciaste el carrito."})
     messages.warning(request, "Vaciaste el carrito.")
     return _redirect_back(request)
 
+# Tope de operaciones por pedido a cart_batch
+BATCH_MAX_OPS = 50
+
+@csrf_exempt
+@require_POST
+def cart_batch(request: HttpRequest) -> JsonResponse:
+    """
+    Varias operaciones sobre el carrito en un solo POST (cuerpo JSON):
+
+        {"ops": [
+            {"op": "set", "origin": "DB", "product_id": 5, "quantity": 3},
+            {"op": "add", "origin": "XLS", "product_id": 12, "quantity": 1},
+            {"op": "remove", "product_id": 7}
+        ]}
+
+    Los productos de la DB salen de productos_carrito() (el mismo cache que
+    cart_add, a lo sumo una consulta) y los inactivos se rechazan como en
+    cart_add; los del Excel se validan contra la lectura cacheada. Es todo o nada: si alguna operación
+    no se puede hacer, el carrito queda como estaba. La sesión se guarda una
+    sola vez; la respuesta trae cantidad y subtotal por ítem y los totales
+    (y el mini-carrito con X-Cart-Fragment: 1, ver _cart_json) para que la
+    página se actualice sin recargar.
+    """
+    try:
+        ops = json.loads(request.body or b"{}").get("ops")
+    except (ValueError, AttributeError):
+        ops = None
+    if not isinstance(ops, list) or not ops or len(ops) > BATCH_MAX_OPS:
+        return JsonResponse({'success': False, 'message': 'Operaciones inválidas.'}, status=400)
+
+    cart = Cart(request)
+    snap = cart.snapshot()
+    errores = []
+
+    # 1. Cantidad final de cada producto (las operaciones se aplican en orden)
+    finales = {}  # pid -> [origen "D"/"X", cantidad]
+    for op in ops:
+        op = op if isinstance(op, dict) else {}
+        tipo = str(op.get("op") or "set").lower()
+        pid = "" if op.get("product_id") is None else str(op["product_id"]).strip()
+        if not pid or tipo not in ("set", "add", "remove"):
+            errores.append({'product_id': pid, 'message': 'Operación inválida.'})
+            continue
+
+        actual = snap.por_id.get(pid)
+        origen, previa = finales.get(pid) or (
+            ("D" if actual["is_db"] else "X", actual["quantity"]) if actual else ("X", 0)
+        )
+        if op.get("origin"):
+            origen = "D" if str(op["origin"]).upper() == "DB" else "X"
+
+        quantity = _to_int(op.get("quantity", 1), default=1)
+        if tipo == "set":
+            nueva = max(0, quantity)
+        elif tipo == "add":
+            nueva = max(0, previa + quantity)
+        else:
+            nueva = 0
+        finales[pid] = [origen, nueva]
+
+    # 2. Validar stock: DB desde el cache de productos (activos), Excel desde el cache
+    db_ids = [int(pid) for pid, (origen, n) in finales.items() if origen == "D" and n > 0 and pid.isdigit()]
+    db_lut = {pk: p for pk, p in productos_carrito(db_ids).items() if p.activo}
+    x_lut = None
+
+    cambios = []
+    for pid, (origen, cantidad) in finales.items():
+        if cantidad <= 0:
+            cambios.append((pid, origen, 0, 0))
+            continue
+
+        if origen == "D":
+            product = db_lut.get(int(pid)) if pid.isdigit() else None
+            stock = (getattr(product, 'stock', 0) or 0) if product else 0
+            precio = getattr(product, 'precio', 0) if product else 0
+        else:
+            if x_lut is None:
+                x_lut = {str(x.idx): x for x in _leer_excel()}
+            product = x_lut.get(pid)
+            stock = product.stock if product else 0
+            precio = precio_excel(product.precio) if product else 0
+
+        if product is None:
+            errores.append({'product_id': pid, 'message': 'El producto ya no existe.'})
+        elif cantidad > stock:
+            errores.append({
+                'product_id': pid,
+                'message': f"Stock insuficiente. Disponible: {stock}, solicitado: {cantidad}.",
+                'stock_disponible': stock,
+            })
+        else:
+            cambios.append((pid, origen, cantidad, precio))
+
+    if errores:
+        return _cart_json(request, cart, {
+            'success': False,
+            'errors': errores,
+            'items': _cantidades_json(snap),
+        }, status=400)
+
+    # 3. Aplicar todo junto (una sola escritura de sesión)
+    cart.actualizar(cambios)
+    return _cart_json(request, cart, {'success': True, 'items': _cantidades_json(cart.snapshot())})
+
 def cart_checkout(request: HttpRequest) -> HttpResponse:
     cart = Cart(request)
     if len(cart) == 0:
         return redirect("cart:detail")
-    msg = _build_wa_message(cart)
-    phone_raw = (getattr(settings, "WHATSAPP_PHONE", "") or "").strip()
-    phone = format_argentina_whatsapp(phone_raw)
-    wa_url = f"https://wa.me/{phone}?text={quote(msg)}" if phone else f"https://wa.me/?text={quote(msg)}"
-    return redirect(wa_url)
+    return redirect(_whatsapp_url(_build_wa_message(cart)))
 
 def cart_checkout_form(request: HttpRequest) -> HttpResponse:
     """
@@ -492,127 +662,112 @@ def cart_checkout_form(request: HttpRequest) -> HttpResponse:
     3. Redirige a página de confirmación (con botón WhatsApp mejorado)
     """
     cart = Cart(request)
-    if len(cart) == 0:
+    if cart.snapshot().count == 0:
+        return redirect("cart:detail")
+
+    # Precios y stock al día antes de mostrar o confirmar (una consulta para toda la DB)
+    ajustes = cart.conciliar()
+    for aviso in ajustes:
+        messages.warning(request, aviso)
+    snap = cart.snapshot()
+    if snap.count == 0:
         return redirect("cart:detail")
 
     if request.method == "POST":
         form = OrderForm(request.POST)
-        if form.is_valid():
-            # Guardar orden en BD
-            orden = Orden.objects.create(
-                nombre=form.cleaned_data.get('nombre', ''),
-                telefono=form.cleaned_data.get('telefono', ''),
-                email=form.cleaned_data.get('email', ''),
-                modalidad=form.cleaned_data.get('modalidad', 'retiro'),
-                direccion=form.cleaned_data.get('direccion', ''),
-                medio_pago=form.cleaned_data.get('medio_pago', 'mp'),
-                comentario=form.cleaned_data.get('comentario', ''),
-                total=_cart_total(cart),
-                items_json=json.dumps(list(cart)),
-                estado='pendiente',
-            )
-            
-            # Preparar datos para el mensaje (antes de borrar carrito)
-            items_list = list(cart)
-            cart_temp = type('obj', (object,), {
-                '__iter__': lambda self: iter(items_list),
-                'total': float(orden.total)
-            })()
-            
-            data_context = {
-                'orden_id': orden.id,
-                'nombre': orden.nombre,
-                'telefono': orden.telefono,
-                'email': orden.email,
-                'modalidad': orden.modalidad,
-                'direccion': orden.direccion,
-                'medio_pago': orden.medio_pago,
-                'comentario': orden.comentario,
-            }
-            
-            msg = _build_wa_message(cart_temp, data_context)
-            
+        # Si algo cambió, se vuelve a mostrar el formulario con los totales nuevos
+        if form.is_valid() and not ajustes:
+            # Guardar orden en BD, descontando el stock en la misma transacción
+            try:
+                with transaction.atomic():
+                    reservar_stock(snap.items)
+                    orden = Orden.objects.create(
+                        nombre=form.cleaned_data.get('nombre', ''),
+                        telefono=form.cleaned_data.get('telefono', ''),
+                        email=form.cleaned_data.get('email', ''),
+                        modalidad=form.cleaned_data.get('modalidad', 'retiro'),
+                        direccion=form.cleaned_data.get('direccion', ''),
+                        medio_pago=form.cleaned_data.get('medio_pago', 'mp'),
+                        comentario=form.cleaned_data.get('comentario', ''),
+                        total=snap.total.a_decimal(),
+                        items_json=snap.items_json(),
+                        estado='pendiente',
+                    )
+                    # Mensaje y link quedan guardados: la confirmación no los vuelve a armar
+                    _guardar_whatsapp(orden, snap.items)
+            except StockInsuficiente as e:
+                # Otro pedido se llevó las unidades: al volver se concilia el carrito
+                for mensaje in e.mensajes:
+                    messages.error(request, mensaje)
+                return redirect("cart:checkout_form")
+
             # Limpiar carrito
             cart.clear()
             
             # Mensaje flash
             messages.success(request, f"¡Pedido #{orden.id} registrado! Abriendo WhatsApp...")
             
-            # URL WhatsApp
-            phone_raw = (getattr(settings, "WHATSAPP_PHONE", "") or "").strip()
-            phone = format_argentina_whatsapp(phone_raw)
-            wa_url = f"https://wa.me/{phone}?text={quote(msg)}" if phone else f"https://wa.me/?text={quote(msg)}"
-            
             # Redirección directa (Turbo Checkout)
-            return redirect(wa_url)
+            return redirect(orden.whatsapp_url)
     else:
         form = OrderForm()
 
     return render(request, "cart/checkout_form.html", {"cart": cart, "form": form})
 
+def _etag_carrito(request: HttpRequest) -> str:
+    return f"carrito-{Cart(request).version}"
+
+# El navegador revalida con If-None-Match: si el carrito no cambió responde
+# 304 sin armar nada (y el backend de sesiones no reescribe la fila)
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=_etag_carrito)
 def cart_summary(request: HttpRequest) -> JsonResponse:
     """
     Vista API para obtener resumen del carrito (usada por AJAX)
     """
-    cart = Cart(request)
-    cart_items = list(cart)
-    
-    summary = {
-        'total_items': len(cart),
-        'total_price': str(_cart_total(cart)),
-        'items': []
-    }
-    
-    for item in cart_items[:5]:
-        summary['items'].append({
-            'name': item.get('name', 'Producto'),
-            'quantity': item.get('quantity', 1),
-            'price': str(item.get('price', 0)),
-            'subtotal': str(item.get('subtotal', 0)),
-            'image_url': item.get('image_url', ''),
-        })
-    
-    return JsonResponse(summary)
+    return JsonResponse(_resumen_json(Cart(request).snapshot()))
+
+# Stock actual para las páginas pre-renderizadas del catálogo (que no se
+# regeneran con cada venta): sale del cache de productos_carrito()
+MAX_IDS_STOCK = 500
+
+@require_GET
+@cache_control(public=True, max_age=30)
+def stock_productos(request: HttpRequest) -> JsonResponse:
+    """
+    Stock de productos de la DB: ?ids=1,2,3 -> {"1": 3, "2": 0, ...}.
+    Los inexistentes o inactivos vuelven con 0.
+    """
+    ids = [pid for pid in request.GET.get("ids", "").split(",") if pid.isdigit()][:MAX_IDS_STOCK]
+    productos = productos_carrito(ids)
+    return JsonResponse({
+        pid: (productos[int(pid)].stock if int(pid) in productos and productos[int(pid)].activo else 0)
+        for pid in ids
+    })
 
 def order_success(request: HttpRequest, orden_id: int) -> HttpResponse:
     """
     Página de confirmación después de crear una orden.
     Muestra resumen del pedido y botón para WhatsApp con mensaje mejorado.
     """
-    orden = get_object_or_404(Orden, id=orden_id)
-    
-    # Parsear items del JSON
-    try:
-        items = json.loads(orden.items_json)
-    except:
-        items = []
-    
-    # Generar URL de WhatsApp con mensaje mejorado
-    cart_temp = type('obj', (object,), {
-        '__iter__': lambda self: iter(items),
-        'total': float(orden.total)
-    })()
-    
-    # Construir mensaje con datos de la orden
-    msg = _build_wa_message(cart_temp, {
-        'orden_id': orden.id,
-        'nombre': orden.nombre,
-        'telefono': orden.telefono,
-        'email': orden.email,
-        'modalidad': orden.modalidad,
-        'direccion': orden.direccion,
-        'medio_pago': orden.medio_pago,
-        'comentario': orden.comentario,
-    })
-    
-    # Generar URL de WhatsApp
-    phone_raw = (getattr(settings, "WHATSAPP_PHONE", "") or "").strip()
-    phone = format_argentina_whatsapp(phone_raw)
-    wa_url = f"https://wa.me/{phone}?text={quote(msg)}" if phone else f"https://wa.me/?text={quote(msg)}"
-    
-    # Renderizar template con todos los datos
+    orden = Orden.objects.filter(id=orden_id).first()
+    if orden is None:
+        # Órdenes viejas ya archivadas: se muestran igual, tal como quedaron
+        orden = get_object_or_404(OrdenArchivada, id=orden_id)
+        items = orden.items()
+        return render(request, 'cart/order_success.html', {
+            'orden': orden,
+            'items': items,
+            'whatsapp_url': orden.whatsapp_url or _whatsapp_url(_build_wa_message(items, _datos_orden(orden))),
+        })
+    items = orden.items()
+
+    # Órdenes anteriores a que se guardara el link: se arma una vez y queda guardado
+    if not orden.whatsapp_url:
+        _guardar_whatsapp(orden, items)
+
     return render(request, 'cart/order_success.html', {
         'orden': orden,
         'items': items,
-        'whatsapp_url': wa_url,
-    })
\ No newline at end of file
+        'whatsapp_url': orden.whatsapp_url,
+    })
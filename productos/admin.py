@@ -1,6 +1,18 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.core import signing
+from django.core.exceptions import PermissionDenied
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from django.urls import path
+
+from cart.cart import invalidar_productos_carrito
+
+from .forms import ImportarProductosForm
+from .importar import ArchivoInvalido, aplicar_cambios, leer_filas, preparar_cambios
 from .models import Producto
 
+FIRMA_IMPORTACION = 'productos.importar'
+
 
 @admin.register(Producto)
 class ProductoAdmin(admin.ModelAdmin):
@@ -71,18 +83,94 @@ class ProductoAdmin(admin.ModelAdmin):
     
     def activar_productos(self, request, queryset):
         """Activa los productos seleccionados"""
+        pks = list(queryset.values_list('pk', flat=True))
         updated = queryset.update(activo=True)
+        invalidar_productos_carrito(pks, modelo=Producto)
         self.message_user(request, f'{updated} producto(s) activado(s).')
     activar_productos.short_description = "Activar productos seleccionados"
     
     def desactivar_productos(self, request, queryset):
         """Desactiva los productos seleccionados"""
+        pks = list(queryset.values_list('pk', flat=True))
         updated = queryset.update(activo=False)
+        invalidar_productos_carrito(pks, modelo=Producto)
         self.message_user(request, f'{updated} producto(s) desactivado(s).')
     desactivar_productos.short_description = "Desactivar productos seleccionados"
     
     def agotar_stock(self, request, queryset):
         """Pone el stock en 0 para los productos seleccionados"""
+        pks = list(queryset.values_list('pk', flat=True))
         updated = queryset.update(stock=0)
+        invalidar_productos_carrito(pks, modelo=Producto)
         self.message_user(request, f'Stock agotado para {updated} producto(s).')
-    agotar_stock.short_description = "Agotar stock de productos seleccionados"
\ No newline at end of file
+    agotar_stock.short_description = "Agotar stock de productos seleccionados"
+
+    # ========== IMPORTACIÓN DE PRECIOS Y STOCK ==========
+
+    def get_urls(self):
+        urls = [
+            path('importar/', self.admin_site.admin_view(self.importar_view), name='productos_producto_importar'),
+        ]
+        return urls + super().get_urls()
+
+    def importar_view(self, request):
+        """
+        Paso 1 (POST con archivo): valida y muestra la vista previa de los cambios.
+        Paso 2 (POST con token): aplica los cambios de la vista previa, firmados
+        para que no haga falta volver a subir ni guardar el archivo.
+        """
+        if not self.has_change_permission(request):
+            raise PermissionDenied
+
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': "Importar precios y stock",
+        }
+
+        if request.method == 'POST' and 'token' in request.POST:
+            try:
+                filas = signing.loads(request.POST['token'], salt=FIRMA_IMPORTACION, max_age=3600)
+            except signing.BadSignature:
+                messages.error(request, "La vista previa venció o no es válida: subí el archivo de nuevo.")
+                return redirect('admin:productos_producto_importar')
+            cambios = [
+                {'pk': pk, 'nombre': nombre, 'campos': campos,
+                 'precio_antes': precio_antes, 'precio': precio,
+                 'stock_antes': stock_antes, 'stock': stock}
+                for pk, nombre, campos, precio_antes, precio, stock_antes, stock in filas
+            ]
+            n, salteados = aplicar_cambios(cambios)
+            self.message_user(request, f'{n} producto(s) actualizado(s).')
+            if salteados:
+                self.message_user(
+                    request,
+                    f'{len(salteados)} producto(s) sin aplicar: ' + '; '.join(salteados),
+                    messages.WARNING,
+                )
+            return redirect('admin:productos_producto_changelist')
+
+        form = ImportarProductosForm(request.POST or None, request.FILES or None)
+        if request.method == 'POST' and form.is_valid():
+            try:
+                cambios, errores = preparar_cambios(leer_filas(form.cleaned_data['archivo']))
+            except ArchivoInvalido as e:
+                form.add_error('archivo', str(e))
+            else:
+                context.update({
+                    'vista_previa': True,
+                    'cambios': cambios,
+                    'errores': errores,
+                    'token': signing.dumps(
+                        [
+                            [c['pk'], c['nombre'], c['campos'],
+                             str(c['precio_antes']), str(c['precio']), c['stock_antes'], c['stock']]
+                            for c in cambios
+                        ],
+                        salt=FIRMA_IMPORTACION,
+                        compress=True,
+                    ),
+                })
+        context['form'] = form
+        return TemplateResponse(request, 'admin/productos/producto/importar.html', context)
+
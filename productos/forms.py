@@ -0,0 +1,13 @@
+from django import forms
+
+
+class ImportarProductosForm(forms.Form):
+    archivo = forms.FileField(
+        help_text="CSV (UTF-8, separado por coma o punto y coma) o XLSX con columnas id/slug/nombre, precio y stock",
+    )
+
+    def clean_archivo(self):
+        archivo = self.cleaned_data['archivo']
+        if not archivo.name.lower().endswith(('.csv', '.xlsx', '.xlsm')):
+            raise forms.ValidationError("El archivo tiene que ser .csv o .xlsx")
+        return archivo
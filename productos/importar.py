@@ -0,0 +1,226 @@
+"""
+Importación masiva de precios y stock de Producto (CSV o XLSX del proveedor).
+
+1. leer_filas() recorre el archivo subido fila por fila (csv.reader sobre el
+   archivo, openpyxl en modo read_only para XLSX), sin cargarlo entero.
+2. preparar_cambios() identifica cada producto por id, slug o nombre, valida
+   precio y stock y devuelve sólo lo que cambia, para mostrar la vista previa.
+3. aplicar_cambios() escribe todo con bulk_update por lotes en una sola
+   transacción: no pasa por Producto.save() ni por un formulario por fila
+   (por eso limpia a mano el cache de producto del carrito). Sólo escribe
+   las columnas que cambian en cada fila, y antes vuelve a leer la base: si
+   el precio o el stock a pisar ya no es el de la vista previa (una venta,
+   otra carga), esa fila se saltea y se informa.
+
+Columnas reconocidas (encabezado, sin importar mayúsculas): id, slug, nombre,
+precio, stock. Hace falta al menos una de id/slug/nombre y una de precio/stock.
+"""
+import csv
+import io
+import re
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.utils import timezone
+
+from cart.cart import invalidar_productos_carrito
+
+from .models import Producto
+
+LOTE = 500
+COLUMNAS_CLAVE = ('id', 'slug', 'nombre')
+PRECIO_MINIMO = Decimal('0.01')
+
+
+class ArchivoInvalido(Exception):
+    """El archivo no se puede leer o no tiene las columnas necesarias."""
+
+
+def _encabezado(valores) -> list[str]:
+    return [str(v or '').strip().lower() for v in valores]
+
+
+def _tiene(fila, columna) -> bool:
+    valor = fila.get(columna)
+    return valor is not None and str(valor).strip() != ''
+
+
+def leer_filas(archivo):
+    """Devuelve (número de fila, dict columna -> valor) por cada fila con datos."""
+    nombre = (getattr(archivo, 'name', '') or '').lower()
+    if nombre.endswith(('.xlsx', '.xlsm')):
+        from openpyxl import load_workbook
+
+        try:
+            wb = load_workbook(archivo, read_only=True, data_only=True)
+        except Exception as e:
+            raise ArchivoInvalido(f"No se pudo abrir el Excel: {e}")
+        try:
+            filas = wb.active.iter_rows(values_only=True)
+            columnas = _encabezado(next(filas, ()))
+            for n, valores in enumerate(filas, start=2):
+                if any(v not in (None, '') for v in valores):
+                    yield n, dict(zip(columnas, valores))
+        finally:
+            wb.close()
+        return
+
+    texto = io.TextIOWrapper(getattr(archivo, 'file', archivo), encoding='utf-8-sig', newline='')
+    try:
+        muestra = texto.readline()
+        # Las planillas en castellano suelen exportar con ';'
+        delimitador = ';' if muestra.count(';') > muestra.count(',') else ','
+        columnas = _encabezado(next(csv.reader([muestra], delimiter=delimitador), []))
+        for n, valores in enumerate(csv.reader(texto, delimiter=delimitador), start=2):
+            if any(v.strip() for v in valores):
+                yield n, dict(zip(columnas, valores))
+    except UnicodeDecodeError:
+        raise ArchivoInvalido("El CSV tiene que estar en UTF-8")
+    finally:
+        texto.detach()
+
+
+def parsear_precio(raw) -> Decimal:
+    """1234.56, 1.234,56, "$ 1.234" o un número de Excel. Lanza ValueError si no es un precio."""
+    if isinstance(raw, (int, float, Decimal)) and not isinstance(raw, bool):
+        return Decimal(str(raw)).quantize(PRECIO_MINIMO)
+    s = re.sub(r'[\s$]', '', str(raw or ''))
+    if ',' in s:
+        s = s.replace('.', '').replace(',', '.')
+    elif re.fullmatch(r'\d{1,3}(\.\d{3})+', s):
+        s = s.replace('.', '')
+    try:
+        return Decimal(s).quantize(PRECIO_MINIMO)
+    except InvalidOperation:
+        raise ValueError(f"precio inválido: {raw!r}")
+
+
+def parsear_stock(raw) -> int:
+    try:
+        n = Decimal(str(raw).strip())
+    except InvalidOperation:
+        raise ValueError(f"stock inválido: {raw!r}")
+    if n < 0 or n != n.to_integral_value():
+        raise ValueError(f"stock inválido: {raw!r}")
+    return int(n)
+
+
+def preparar_cambios(filas):
+    """
+    Compara el archivo con la base (una sola consulta) y devuelve
+    (cambios, errores). Cada cambio: {pk, nombre, precio_antes, precio,
+    stock_antes, stock, campos}; `campos` son las columnas que cambian.
+    """
+    productos = list(Producto.objects.values('pk', 'slug', 'nombre', 'precio', 'stock'))
+    por_id = {str(p['pk']): p for p in productos}
+    por_slug = {p['slug']: p for p in productos if p['slug']}
+    por_nombre = {}
+    for p in productos:
+        por_nombre.setdefault(p['nombre'].strip().lower(), []).append(p)
+
+    cambios = {}
+    errores = []
+    vistos = {}
+    columnas_ok = False
+    for n, fila in filas:
+        if not columnas_ok:
+            if not any(c in fila for c in COLUMNAS_CLAVE) or not ({'precio', 'stock'} & fila.keys()):
+                raise ArchivoInvalido("Faltan columnas: se necesita id, slug o nombre, y precio y/o stock")
+            columnas_ok = True
+
+        id_ = str(fila.get('id') or '').strip().removesuffix('.0')
+        slug = str(fila.get('slug') or '').strip()
+        nombre = str(fila.get('nombre') or '').strip()
+        if id_:
+            producto = por_id.get(id_)
+        elif slug:
+            producto = por_slug.get(slug)
+        else:
+            candidatos = por_nombre.get(nombre.lower(), [])
+            if len(candidatos) > 1:
+                errores.append(f"Fila {n}: hay {len(candidatos)} productos llamados \"{nombre}\" (usar id o slug)")
+                continue
+            producto = candidatos[0] if candidatos else None
+        if producto is None:
+            errores.append(f"Fila {n}: no existe el producto {id_ or slug or nombre!r}")
+            continue
+        if producto['pk'] in vistos:
+            errores.append(f"Fila {n}: {producto['nombre']} ya aparece en la fila {vistos[producto['pk']]}")
+            continue
+        vistos[producto['pk']] = n
+
+        try:
+            precio = producto['precio']
+            if _tiene(fila, 'precio'):
+                precio = parsear_precio(fila['precio'])
+                if precio < PRECIO_MINIMO:
+                    raise ValueError("el precio tiene que ser mayor a 0")
+            stock = producto['stock']
+            if _tiene(fila, 'stock'):
+                stock = parsear_stock(fila['stock'])
+        except ValueError as e:
+            errores.append(f"Fila {n}: {e}")
+            continue
+
+        campos = [
+            campo for campo, valor in (('precio', precio), ('stock', stock))
+            if valor != producto[campo]
+        ]
+        if campos:
+            cambios[producto['pk']] = {
+                'pk': producto['pk'],
+                'nombre': producto['nombre'],
+                'precio_antes': producto['precio'],
+                'precio': precio,
+                'stock_antes': producto['stock'],
+                'stock': stock,
+                'campos': campos,
+            }
+
+    if not columnas_ok:
+        raise ArchivoInvalido("El archivo no tiene filas")
+    return list(cambios.values()), errores
+
+
+def _valor(campo, valor):
+    return Decimal(str(valor)) if campo == 'precio' else int(valor)
+
+
+def aplicar_cambios(cambios, lote=LOTE):
+    """
+    Escribe, con bulk_update por lotes y en una transacción, sólo las
+    columnas de `campos` de cada cambio. Las filas cuyo valor actual ya no es
+    el `*_antes` de la vista previa no se tocan.
+    Devuelve (cantidad aplicada, mensajes de las filas salteadas).
+    """
+    ahora = timezone.now()
+    salteados = []
+    por_campos = {}
+    with transaction.atomic():
+        actuales = (
+            Producto.objects.select_for_update()
+            .filter(pk__in=[c['pk'] for c in cambios])
+            .in_bulk(field_name='pk')
+        )
+        for c in cambios:
+            actual = actuales.get(c['pk'])
+            if actual is None:
+                salteados.append(f"{c['nombre']}: ya no existe")
+                continue
+            distintos = [
+                campo for campo in c['campos']
+                if getattr(actual, campo) != _valor(campo, c[f'{campo}_antes'])
+            ]
+            if distintos:
+                salteados.append(f"{c['nombre']}: cambió {' y '.join(distintos)} desde la vista previa")
+                continue
+            for campo in c['campos']:
+                setattr(actual, campo, _valor(campo, c[campo]))
+            actual.modificado = ahora
+            por_campos.setdefault(tuple(c['campos']), []).append(actual)
+
+        for campos, objetos in por_campos.items():
+            Producto.objects.bulk_update(objetos, [*campos, 'modificado'], batch_size=lote)
+    aplicados = [o.pk for objetos in por_campos.values() for o in objetos]
+    invalidar_productos_carrito(aplicados, modelo=Producto)
+    return len(aplicados), salteados
@@ -1,10 +1,39 @@
 from django.db import models
+from django.db.models import Q
 from django.core.validators import MinValueValidator
 from django.utils.text import slugify
 from django.utils import timezone
 from cloudinary.models import CloudinaryField
 
 
+def slugs_ocupados(bases, excluir_pk=None) -> set:
+    """
+    Slugs ya usados con la forma "<base>" o "<base>-<n>" para cada base
+    (un prefijo por base, en consultas de hasta 200 bases).
+    """
+    bases = list(bases)
+    ocupados = set()
+    for i in range(0, len(bases), 200):
+        filtro = Q()
+        for base in bases[i:i + 200]:
+            filtro |= Q(slug=base) | Q(slug__startswith=f"{base}-")
+        qs = Producto.objects.filter(filtro)
+        if excluir_pk is not None:
+            qs = qs.exclude(pk=excluir_pk)
+        ocupados.update(qs.values_list('slug', flat=True))
+    return ocupados
+
+
+def _slug_libre(base, ocupados) -> str:
+    """El primero libre de base, base-1, base-2, ... (igual que antes, pero en memoria)."""
+    if base not in ocupados:
+        return base
+    counter = 1
+    while f"{base}-{counter}" in ocupados:
+        counter += 1
+    return f"{base}-{counter}"
+
+
 class Producto(models.Model):
     """
     Modelo de Producto con todos los campos necesarios.
@@ -88,15 +117,10 @@ class Producto(models.Model):
     
     def save(self, *args, **kwargs):
         """Genera el slug y actualiza fecha de modificación"""
-        # Generar slug si no existe
+        # Generar slug si no existe (una sola consulta, ver slugs_ocupados)
         if not self.slug and self.nombre:
             base_slug = slugify(self.nombre)
-            slug = base_slug
-            counter = 1
-            while Producto.objects.filter(slug=slug).exclude(pk=self.pk).exists():
-                slug = f"{base_slug}-{counter}"
-                counter += 1
-            self.slug = slug
+            self.slug = _slug_libre(base_slug, slugs_ocupados([base_slug], excluir_pk=self.pk))
         
         # Actualizar fecha de modificación
         if self.pk:
@@ -104,6 +128,22 @@ class Producto(models.Model):
         
         super().save(*args, **kwargs)
     
+    @classmethod
+    def crear_en_lote(cls, productos, batch_size=500):
+        """
+        Crea muchos productos con un solo bulk_create (que no llama a save()).
+        Los slugs se asignan en memoria para todo el lote, con una consulta
+        por cada 200 nombres distintos para conocer los slugs ya usados.
+        """
+        productos = list(productos)
+        pendientes = [p for p in productos if not p.slug and p.nombre]
+        bases = [slugify(p.nombre) for p in pendientes]
+        ocupados = slugs_ocupados(set(bases))
+        for producto, base in zip(pendientes, bases):
+            producto.slug = _slug_libre(base, ocupados)
+            ocupados.add(producto.slug)
+        return cls.objects.bulk_create(productos, batch_size=batch_size)
+
     def esta_disponible(self):
         """Verifica si está disponible para venta"""
         return self.activo and self.stock > 0
@@ -0,0 +1,68 @@
+from decimal import Decimal
+from io import BytesIO
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase
+from django.urls import reverse
+
+from productos.importar import parsear_precio
+from productos.models import Producto
+
+
+class ImportarProductosTests(TestCase):
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser("fsosa", "fsosa@example.com", "clave"))
+        self.url = reverse("admin:productos_producto_importar")
+        self.lavanda = Producto.objects.create(nombre="Lavanda", precio=500, stock=10)
+        self.mirra = Producto.objects.create(nombre="Mirra", precio=800, stock=4)
+
+    def test_parsear_precio(self):
+        self.assertEqual(parsear_precio("1.234,50"), Decimal("1234.50"))
+        self.assertEqual(parsear_precio("$ 2.800"), Decimal("2800.00"))
+        self.assertEqual(parsear_precio("99.9"), Decimal("99.90"))
+        self.assertEqual(parsear_precio(2800.0), Decimal("2800.00"))
+
+    def test_csv_vista_previa_y_aplicar(self):
+        csv = "nombre;precio;stock\nLavanda;650,00;10\nMirra;;0\nNo existe;10;1\n".encode()
+        response = self.client.post(self.url, {"archivo": SimpleUploadedFile("precios.csv", csv)})
+        self.assertEqual(len(response.context["cambios"]), 2)
+        self.assertEqual(len(response.context["errores"]), 1)
+        # La vista previa no toca nada
+        self.lavanda.refresh_from_db()
+        self.assertEqual(self.lavanda.precio, Decimal("500"))
+
+        self.client.post(self.url, {"token": response.context["token"]})
+        self.lavanda.refresh_from_db()
+        self.mirra.refresh_from_db()
+        self.assertEqual((self.lavanda.precio, self.lavanda.stock), (Decimal("650"), 10))
+        self.assertEqual((self.mirra.precio, self.mirra.stock), (Decimal("800"), 0))
+
+    def test_xlsx_por_id(self):
+        from openpyxl import Workbook
+
+        wb = Workbook()
+        wb.active.append(["ID", "Precio"])
+        wb.active.append([self.mirra.pk, 900])
+        contenido = BytesIO()
+        wb.save(contenido)
+
+        response = self.client.post(self.url, {"archivo": SimpleUploadedFile("precios.xlsx", contenido.getvalue())})
+        self.assertEqual([(c["pk"], c["precio"]) for c in response.context["cambios"]], [(self.mirra.pk, Decimal("900.00"))])
+
+    def test_solo_escribe_columnas_del_archivo_y_saltea_lo_que_cambio(self):
+        csv = "nombre;precio\nLavanda;650\nMirra;900\n".encode()
+        response = self.client.post(self.url, {"archivo": SimpleUploadedFile("precios.csv", csv)})
+        self.assertEqual([c["campos"] for c in response.context["cambios"]], [["precio"], ["precio"]])
+
+        # Entre la vista previa y el aplicar: se vende Lavanda y alguien cambia el precio de Mirra
+        Producto.objects.filter(pk=self.lavanda.pk).update(stock=7)
+        Producto.objects.filter(pk=self.mirra.pk).update(precio=850)
+
+        response = self.client.post(self.url, {"token": response.context["token"]}, follow=True)
+        self.lavanda.refresh_from_db()
+        self.mirra.refresh_from_db()
+        self.assertEqual((self.lavanda.precio, self.lavanda.stock), (Decimal("650"), 7))
+        self.assertEqual(self.mirra.precio, Decimal("850"))
+        self.assertIn("Mirra: cambió precio", " ".join(str(m) for m in response.context["messages"]))
@@ -22,7 +22,7 @@ class ProductoModelTests(TestCase):
         )
         self.assertEqual(producto.nombre, "Sahumerio Sándalo")
         self.assertEqual(producto.precio, 750.00)
-        self.assertEqual(producto.stock, 0)  # Default
+        self.assertEqual(producto.stock, 10)  # Default: se crean con stock
         self.assertTrue(producto.activo)  # Default True
     
     def test_slug_se_genera_automaticamente(self):
@@ -71,37 +71,6 @@ class ProductoModelTests(TestCase):
         
         self.assertFalse(self.producto.esta_disponible())
     
-    def test_tiene_stock_suficiente(self):
-        """Test 8: Verificar si hay stock para una cantidad específica"""
-        self.producto.stock = 10
-        self.producto.save()
-        
-        self.assertTrue(self.producto.tiene_stock(5))
-        self.assertTrue(self.producto.tiene_stock(10))
-        self.assertFalse(self.producto.tiene_stock(11))
-    
-    def test_reducir_stock_exitoso(self):
-        """Test 9: Reducir stock cuando hay cantidad suficiente"""
-        self.producto.stock = 10
-        self.producto.save()
-        
-        resultado = self.producto.reducir_stock(3)
-        self.assertTrue(resultado)
-        
-        self.producto.refresh_from_db()
-        self.assertEqual(self.producto.stock, 7)
-    
-    def test_reducir_stock_insuficiente(self):
-        """Test 10: No se reduce si no hay stock suficiente"""
-        self.producto.stock = 2
-        self.producto.save()
-        
-        resultado = self.producto.reducir_stock(5)
-        self.assertFalse(resultado)
-        
-        self.producto.refresh_from_db()
-        self.assertEqual(self.producto.stock, 2)  # No cambió
-    
     def test_str_representation(self):
         """Test 11: El método __str__ retorna el nombre"""
         self.assertEqual(str(self.producto), "Sahumerio Lavanda")
@@ -111,4 +80,21 @@ class ProductoModelTests(TestCase):
         self.assertEqual(
             self.producto.get_precio_display(),
             "$500.00"
-        )
\ No newline at end of file
+        )
+
+class SlugProductoTests(TestCase):
+
+    def test_slug_con_una_sola_consulta(self):
+        for _ in range(5):
+            Producto.objects.create(nombre="Canela", precio=100)
+        producto = Producto(nombre="Canela", precio=100)
+        with self.assertNumQueries(2):  # slugs ocupados + INSERT
+            producto.save()
+        self.assertEqual(producto.slug, "canela-5")
+
+    def test_crear_en_lote_asigna_slugs_en_memoria(self):
+        Producto.objects.create(nombre="Mirra", precio=100)
+        nuevos = [Producto(nombre=n, precio=100) for n in ("Mirra", "Mirra", "Sándalo", "Mirra Blanca")]
+        with self.assertNumQueries(2):  # slugs ocupados + bulk_create
+            Producto.crear_en_lote(nuevos)
+        self.assertEqual([p.slug for p in nuevos], ["mirra-1", "mirra-2", "sandalo", "mirra-blanca"])